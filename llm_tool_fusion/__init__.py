@@ -1,5 +1,15 @@
-from ._core import ToolCaller, process_tool_calls, process_tool_calls_async
+from ._core import ToolCaller, process_tool_calls, process_tool_calls_async, resume_tool_calls, resume_tool_calls_async, process_tool_calls_batch
+from ._results import OutputPolicy, ToolResultStore, encode_tabular
+from ._hedging import HedgingPolicy
+from ._llm import HedgedLLMCall, CachedLLMCall, MemoryResponseCache, SQLiteResponseCache
+from ._scheduling import PriorityScheduler
+from ._limits import AdaptiveLimit
+from ._context import ContextBudget, json_extract
+from ._codec import JsonCodec, ResultEncoders, benchmark_codecs
+from ._history import CompactMessage, ConversationLog
+from ._checkpoint import FileCheckpointStore, SQLiteCheckpointStore
+from ._retry import RetryPolicy
 
-__all__ = ["ToolCaller", "process_tool_calls", "process_tool_calls_async"]
+__all__ = ["ToolCaller", "process_tool_calls", "process_tool_calls_async", "OutputPolicy", "ToolResultStore", "encode_tabular", "HedgingPolicy", "HedgedLLMCall", "CachedLLMCall", "MemoryResponseCache", "SQLiteResponseCache", "PriorityScheduler", "AdaptiveLimit", "ContextBudget", "json_extract", "JsonCodec", "ResultEncoders", "benchmark_codecs", "CompactMessage", "ConversationLog", "FileCheckpointStore", "SQLiteCheckpointStore", "resume_tool_calls", "resume_tool_calls_async", "process_tool_calls_batch", "RetryPolicy"]
 
 __version__ = "0.0.2"
\ No newline at end of file
@@ -0,0 +1,92 @@
+import asyncio
+import inspect
+import weakref
+from typing import Callable, Any, Dict, List
+
+
+class MicroBatcher:
+    """
+    Agrupa chamadas concorrentes de uma mesma ferramenta em uma única chamada em lote.
+
+    As chamadas são acumuladas por até `max_wait_ms` milissegundos ou até `max_batch_size`
+    itens (o que ocorrer primeiro). Chamadas de sessões diferentes que rodam no mesmo event loop
+    compartilham o mesmo lote.
+
+    Args:
+        batch_fn: função (sync ou async) que recebe uma lista de argumentos (um dict por chamada)
+            e retorna uma lista de resultados na mesma ordem. Um item do tipo Exception é
+            repassado apenas para a chamada correspondente.
+        max_batch_size: número máximo de itens por lote
+        max_wait_ms: tempo máximo de espera (ms) antes de disparar um lote incompleto
+    """
+
+    def __init__(self, batch_fn: Callable, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be greater than or equal to 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be greater than or equal to 0")
+
+        self._batch_fn = batch_fn
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000
+        # Um lote pendente por event loop (asyncio.run cria um loop novo a cada chamada)
+        self._pending = weakref.WeakKeyDictionary()
+        self._timers = weakref.WeakKeyDictionary()
+        self._running = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, args: Dict[str, Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        pending = self._pending.setdefault(loop, [])
+        pending.append((args, future))
+
+        if len(pending) >= self._max_batch_size:
+            self._flush(loop)
+        elif len(pending) == 1:
+            self._timers[loop] = loop.call_later(self._max_wait, self._flush, loop)
+
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        timer = self._timers.pop(loop, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(loop, None)
+        if batch:
+            task = loop.create_task(self._run_batch(batch))
+            # Mantém referência forte até o fim do lote
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: List[tuple]):
+        self.batches += 1
+        self.items += len(batch)
+        args_list = [args for args, _ in batch]
+
+        try:
+            if inspect.iscoroutinefunction(self._batch_fn):
+                results = await self._batch_fn(args_list)
+            else:
+                results = await asyncio.to_thread(self._batch_fn, args_list)
+
+            results = list(results)
+            if len(results) != len(batch):
+                raise ValueError(f"Batch function returned {len(results)} results for {len(batch)} calls")
+
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
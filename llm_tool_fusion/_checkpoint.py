@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional
+from ._history import _compact_assistant_message
+
+
+class FileCheckpointStore:
+    """
+    Guarda os checkpoints de process_tool_calls em arquivos JSON (um por run_id) em um diretório.
+    A gravação é atômica: um checkpoint interrompido no meio nunca substitui o anterior.
+
+    Args:
+        directory: diretório dos arquivos de checkpoint
+    """
+
+    def __init__(self, directory: str):
+        self._directory = directory
+        os.makedirs(self._directory, exist_ok=True)
+
+    def _path(self, run_id: str) -> str:
+        if not run_id or os.path.basename(run_id) != run_id or run_id in (".", ".."):
+            raise ValueError(f"Invalid run_id '{run_id}' for a file checkpoint")
+        return os.path.join(self._directory, f"{run_id}.json")
+
+    def save(self, run_id: str, data: str):
+        path = self._path(run_id)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+
+    def load(self, run_id: str) -> Optional[str]:
+        try:
+            with open(self._path(run_id), encoding="utf-8") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, run_id: str):
+        try:
+            os.remove(self._path(run_id))
+        except FileNotFoundError:
+            pass
+
+
+class SQLiteCheckpointStore:
+    """
+    Guarda os checkpoints de process_tool_calls em um banco SQLite (uma linha por run_id).
+
+    Args:
+        path: caminho do arquivo do banco
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints (run_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Uma conexão por operação: o store pode ser usado por várias threads ao mesmo tempo
+        return sqlite3.connect(self._path, timeout=30)
+
+    def save(self, run_id: str, data: str):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, data, updated_at) VALUES (?, ?, ?)",
+                (run_id, data, time.time())
+            )
+
+    def load(self, run_id: str) -> Optional[str]:
+        with self._connect() as connection:
+            row = connection.execute("SELECT data FROM checkpoints WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def delete(self, run_id: str):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+
+
+def _serializable_messages(messages: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Mensagens como dicts: mensagens do provedor (ex: response.message do Ollama) viram dicts com
+    conteúdo e chamadas de ferramentas.
+    """
+    serializable = []
+    for message in messages:
+        if isinstance(message, dict):
+            serializable.append(message)
+        elif isinstance(message, Mapping):
+            serializable.append(dict(message))
+        else:
+            serializable.append(_compact_assistant_message(message).to_dict())
+    return serializable
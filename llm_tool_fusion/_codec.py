@@ -0,0 +1,292 @@
+import base64
+import dataclasses
+import datetime
+import enum
+import json
+import time
+import uuid
+from decimal import Decimal
+from pathlib import PurePath
+from typing import Callable, Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+_BACKENDS = ["orjson", "msgspec", "json"]
+
+# Erros dos backends rápidos para valores fora do que suportam (ex: inteiros acima de 64 bits no
+# orjson, chaves de dicionário que não são str nem números no msgspec); orjson.JSONEncodeError é TypeError
+_FAST_ENCODE_ERRORS = (TypeError, ValueError, OverflowError) + ((msgspec.EncodeError,) if msgspec is not None else ())
+
+
+def _available_backends() -> List[str]:
+    return [
+        backend for backend in _BACKENDS
+        if backend == "json"
+        or (backend == "orjson" and orjson is not None)
+        or (backend == "msgspec" and msgspec is not None)
+    ]
+
+
+def _encode_dataclass(value: Any) -> Dict[str, Any]:
+    # Cópia rasa: os campos aninhados voltam a passar pelos encoders (mais rápido que dataclasses.asdict)
+    return {field.name: getattr(value, field.name) for field in dataclasses.fields(value)}
+
+
+def _encode_bytes(value: bytes) -> str:
+    try:
+        return bytes(value).decode("utf-8")
+    except UnicodeDecodeError:
+        return base64.b64encode(value).decode("ascii")
+
+
+def _encode_enum(value: enum.Enum) -> Any:
+    return value.value
+
+
+def _encode_table(value: Any) -> Dict[str, Any]:
+    # DataFrames (pandas e compatíveis): cabeçalho + linhas, sem repetir as colunas em cada linha
+    table = value.to_dict(orient="split")
+    return {"columns": table["columns"], "data": table["data"]}
+
+
+class ResultEncoders:
+    """
+    Registro de encoders por tipo usado na serialização dos resultados das ferramentas para tipos
+    que o JSON não suporta diretamente. O encoder de uma classe vale para as suas subclasses.
+
+    Além dos tipos registrados, reconhece por duck typing: dataclasses, arrays e escalares NumPy
+    (tolist), modelos Pydantic (model_dump) e DataFrames (colunas + linhas).
+
+    EXEMPLO:
+
+    manager.register_result_encoder(Money, lambda money: f"{money.amount} {money.currency}")
+
+    Args:
+        defaults: se True, registra os encoders padrão (datetime, date, time, timedelta, Decimal,
+            bytes, UUID, Enum, caminhos, set, frozenset)
+    """
+
+    def __init__(self, defaults: bool = True):
+        self._encoders = {}
+        self._resolved = {}
+        self._overridden = {}
+        if defaults:
+            self.register(datetime.datetime, datetime.datetime.isoformat)
+            self.register(datetime.date, datetime.date.isoformat)
+            self.register(datetime.time, datetime.time.isoformat)
+            self.register(datetime.timedelta, datetime.timedelta.total_seconds)
+            self.register(Decimal, str)
+            self.register(bytes, _encode_bytes)
+            self.register(bytearray, _encode_bytes)
+            self.register(memoryview, lambda value: _encode_bytes(value.tobytes()))
+            self.register(uuid.UUID, str)
+            self.register(enum.Enum, _encode_enum)
+            self.register(PurePath, str)
+            self.register(set, list)
+            self.register(frozenset, list)
+
+    def register(self, type_: type, encoder: Callable[[Any], Any]):
+        """
+        Registra encoder(value) -> valor serializável em JSON para type_ e suas subclasses.
+        """
+        self._encoders[type_] = encoder
+        self._resolved.clear()
+        self._overridden.clear()
+
+    def copy(self) -> "ResultEncoders":
+        encoders = ResultEncoders(defaults=False)
+        encoders._encoders = dict(self._encoders)
+        return encoders
+
+    def _resolve(self, cls: type) -> Optional[Callable[[Any], Any]]:
+        for base in cls.__mro__:
+            if base in self._encoders:
+                return self._encoders[base]
+        if dataclasses.is_dataclass(cls):
+            return _encode_dataclass
+        if hasattr(cls, "tolist") and hasattr(cls, "dtype"):
+            # NumPy: conversão vetorizada do array inteiro em listas Python
+            return lambda value: value.tolist()
+        if hasattr(cls, "model_dump"):
+            return lambda value: value.model_dump()
+        if hasattr(cls, "to_dict") and hasattr(cls, "columns"):
+            return _encode_table
+        return None
+
+    def get(self, value: Any) -> Optional[Callable[[Any], Any]]:
+        cls = type(value)
+        # Cache por classe concreta: a busca no MRO e o duck typing rodam uma vez por tipo
+        if cls not in self._resolved:
+            self._resolved[cls] = self._resolve(cls)
+        return self._resolved[cls]
+
+    def overrides(self, backend: str) -> bool:
+        """
+        True se algum encoder registrado deve prevalecer sobre uma conversão que o backend faz sozinho.
+        """
+        if backend not in self._overridden:
+            native = _NATIVE_ENCODERS.get(backend, {})
+            self._overridden[backend] = any(
+                (issubclass(type_, base) and encoder is not equivalent)
+                for type_, encoder in self._encoders.items()
+                for base, equivalent in native.items()
+            ) or (backend == "msgspec" and any(dataclasses.is_dataclass(type_) for type_ in self._encoders))
+        return self._overridden[backend]
+
+    def handles(self, value: Any) -> bool:
+        return self.get(value) is not None
+
+    def default(self, value: Any) -> Any:
+        """
+        Hook `default` dos codecs JSON: converte value ou levanta TypeError.
+        """
+        encoder = self.get(value)
+        if encoder is None:
+            raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+        return encoder(value)
+
+
+# Tipos que cada backend rápido serializa sem chamar os encoders -> encoder com a mesma saída (None =
+# saída diferente da dos encoders padrão). Com OPT_PASSTHROUGH_DATACLASS e OPT_PASSTHROUGH_DATETIME o
+# orjson entrega dataclasses e datas aos encoders; o msgspec não tem opção equivalente
+_NATIVE_ENCODERS = {
+    "orjson": {uuid.UUID: str, enum.Enum: _encode_enum},
+    "msgspec": {
+        uuid.UUID: str, enum.Enum: _encode_enum, Decimal: str, set: list, frozenset: list,
+        datetime.datetime: None, datetime.date: None, datetime.time: None, datetime.timedelta: None,
+        bytes: None, bytearray: None, memoryview: None,
+    },
+}
+
+_PLAIN_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+class JsonCodec:
+    """
+    Codificador JSON usado pelo ToolCaller para ler os argumentos das chamadas e serializar os
+    resultados das ferramentas.
+
+    Com backend="auto" usa o mais rápido disponível (orjson, msgspec, ou o json da biblioteca padrão).
+    orjson e msgspec sempre geram JSON compacto e em UTF-8 (sem escapes \\uXXXX); o json padrão segue
+    a opção compact. Tipos sem suporte nativo no JSON são convertidos pelos encoders (ResultEncoders).
+    Chaves não-str (int, float, bool, None) viram texto como no json padrão; valores que o backend
+    rápido não aceita são serializados pelo json padrão. NaN e infinito viram null no orjson e no
+    msgspec (o json padrão gera NaN/Infinity, que não são JSON válido).
+
+    Os encoders registrados sempre decidem a saída, inclusive para tipos que orjson e msgspec
+    serializam sozinhos (dataclasses, datas, bytes, UUID, Enum): quando algum encoder difere da
+    conversão nativa do backend, os valores são convertidos pelos encoders antes da serialização
+    (uma passada em Python; com os encoders padrão isso acontece sempre no msgspec e nunca no orjson).
+
+    EXEMPLO:
+
+    manager = ToolCaller(json_codec=JsonCodec(backend="auto", compact=True))
+
+    Args:
+        backend: "auto", "orjson", "msgspec" ou "json"
+        compact: se True, serializa com separadores compactos
+        encoders: ResultEncoders usados para tipos sem suporte nativo (padrão: encoders padrão)
+    """
+
+    def __init__(self, backend: str = "auto", compact: bool = False, encoders: Optional[ResultEncoders] = None):
+        available = _available_backends()
+        if backend == "auto":
+            backend = available[0]
+        elif backend not in _BACKENDS:
+            raise ValueError(f"Invalid JSON backend. Use one of the following: auto, {', '.join(_BACKENDS)}")
+        elif backend not in available:
+            raise ValueError(f"JSON backend '{backend}' is not installed")
+        self.backend = backend
+        self.compact = compact
+        self.encoders = encoders if encoders is not None else ResultEncoders()
+
+    def _apply_encoders(self, value: Any) -> Any:
+        cls = type(value)
+        if cls in _PLAIN_TYPES:
+            return value
+        if cls is dict:
+            return {key: self._apply_encoders(item) for key, item in value.items()}
+        if cls is list or cls is tuple:
+            return [self._apply_encoders(item) for item in value]
+        encoder = self.encoders.get(value)
+        return value if encoder is None else self._apply_encoders(encoder(value))
+
+    def _fast_dumps(self, value: Any) -> str:
+        if self.encoders.overrides(self.backend):
+            value = self._apply_encoders(value)
+        if self.backend == "orjson":
+            options = (
+                orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME
+            )
+            return orjson.dumps(value, default=self.encoders.default, option=options).decode("utf-8")
+        return msgspec.json.encode(value, enc_hook=self.encoders.default).decode("utf-8")
+
+    def dumps(self, value: Any, compact: bool = False) -> str:
+        if self.backend != "json":
+            try:
+                return self._fast_dumps(value)
+            except _FAST_ENCODE_ERRORS:
+                # Mesmo formato do backend rápido: compacto e UTF-8
+                return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=self.encoders.default)
+        if self.compact or compact:
+            return json.dumps(value, separators=(",", ":"), default=self.encoders.default)
+        return json.dumps(value, default=self.encoders.default)
+
+    def loads(self, text: Any) -> Any:
+        if self.backend == "orjson":
+            return orjson.loads(text)
+        if self.backend == "msgspec":
+            return msgspec.json.decode(text)
+        return json.loads(text)
+
+    def __repr__(self) -> str:
+        return f"JsonCodec(backend={self.backend!r}, compact={self.compact!r})"
+
+
+# Codec padrão: json da biblioteca padrão, mantendo o formato das mensagens das versões anteriores
+DEFAULT_CODEC = JsonCodec(backend="json")
+
+
+def benchmark_codecs(payload: Any, iterations: int = 1000) -> Dict[str, Dict[str, float]]:
+    """
+    Compara os codecs disponíveis serializando e lendo payload.
+
+    EXEMPLO:
+
+    print(benchmark_codecs({"rows": [{"id": i, "name": f"item {i}"} for i in range(1000)]}, iterations=100))
+
+    Args:
+        payload: valor serializável em JSON (ex: um resultado típico de ferramenta)
+        iterations: número de repetições de cada operação
+    Returns:
+        Por codec: segundos por dumps, segundos por loads e tamanho (caracteres) do JSON gerado
+    """
+    results = {}
+    codecs = [JsonCodec(backend="json"), JsonCodec(backend="json", compact=True)]
+    codecs += [JsonCodec(backend=backend) for backend in _available_backends() if backend != "json"]
+
+    for codec in codecs:
+        name = f"{codec.backend} (compact)" if codec.backend == "json" and codec.compact else codec.backend
+        encoded = codec.dumps(payload)
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            codec.dumps(payload)
+        dumps_time = (time.perf_counter() - start_time) / iterations
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            codec.loads(encoded)
+        loads_time = (time.perf_counter() - start_time) / iterations
+
+        results[name] = {"dumps": dumps_time, "loads": loads_time, "size": len(encoded)}
+    return results
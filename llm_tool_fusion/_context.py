@@ -0,0 +1,293 @@
+import hashlib
+import inspect
+import json
+from collections import OrderedDict
+from typing import Callable, Any, Dict, List, Optional
+from ._utils import _estimate_tokens
+
+
+def _message_field(message: Any, field: str) -> Any:
+    # As mensagens podem ser dicts ou objetos do framework (ex: response.message do Ollama)
+    if isinstance(message, dict):
+        return message.get(field)
+    return getattr(message, field, None)
+
+
+class ContextBudget:
+    """
+    Orçamento de tokens das mensagens enviadas ao LLM a cada chamada de process_tool_calls.
+
+    Quando o histórico excede max_tokens, uma cópia reduzida é enviada (a lista messages não é
+    alterada): primeiro os resultados de ferramentas mais antigos são substituídos por um aviso
+    curto; se ainda não couber, os turnos mais antigos são descartados (janela deslizante). As
+    mensagens de sistema iniciais, a primeira mensagem do usuário e o turno mais recente são sempre
+    mantidos, e um turno é descartado junto com os resultados de ferramentas que o seguem, mantendo
+    o pareamento assistant/tool válido para OpenAI e Ollama.
+
+    Com um compactor, os resultados de ferramentas antigos são antes substituídos por resumos
+    quando o histórico passa de compact_threshold. Os resumos ficam em cache pelo hash do conteúdo,
+    então o mesmo resultado nunca é resumido duas vezes. Em process_tool_calls_async o compactor
+    também pode ser assíncrono (ex: um resumo feito por um modelo menor).
+
+    EXEMPLO:
+
+    budget = ContextBudget(max_tokens=8000, token_estimator=lambda text: len(encoding.encode(text)))
+    final_response = process_tool_calls(..., context_budget=budget)
+
+    budget = ContextBudget(max_tokens=8000, compactor=json_extract, compact_threshold=4000)
+
+    Args:
+        max_tokens: limite de tokens estimados das mensagens enviadas
+        token_estimator: função text -> número de tokens (padrão: ~4 caracteres por token)
+        message_overhead: tokens adicionais contados por mensagem (papel, separadores)
+        elision_marker: texto que substitui um resultado de ferramenta removido ({tokens} = tokens removidos)
+        compactor: função compactor(content, tool_name) -> resumo aplicada aos resultados de ferramentas antigos
+        compact_threshold: tokens estimados do histórico a partir dos quais o compactor é usado (padrão: max_tokens)
+        min_compact_tokens: tamanho mínimo (tokens) de um resultado para ser resumido
+        max_cached_summaries: número máximo de resumos mantidos em cache (LRU)
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        token_estimator: Optional[Callable[[str], int]] = None,
+        message_overhead: int = 4,
+        elision_marker: str = "[Tool result elided to fit the context budget ({tokens} tokens)]",
+        compactor: Optional[Callable[[str, Optional[str]], Any]] = None,
+        compact_threshold: Optional[int] = None,
+        min_compact_tokens: int = 200,
+        max_cached_summaries: int = 1024
+    ):
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be greater than or equal to 1")
+        self.max_tokens = max_tokens
+        self.token_estimator = token_estimator or _estimate_tokens
+        self.message_overhead = message_overhead
+        self.elision_marker = elision_marker
+        self.compactor = compactor
+        self.compact_threshold = compact_threshold if compact_threshold is not None else max_tokens
+        self.min_compact_tokens = min_compact_tokens
+        self._max_cached_summaries = max_cached_summaries
+        self._summaries = OrderedDict()
+        self.elided = 0
+        self.dropped = 0
+        self.compacted = 0
+        self.summaries_computed = 0
+
+    def message_tokens(self, message: Any) -> int:
+        tokens = self.message_overhead
+        content = _message_field(message, "content")
+        if content:
+            tokens += self.token_estimator(content if isinstance(content, str) else str(content))
+        tool_calls = _message_field(message, "tool_calls")
+        if tool_calls:
+            tokens += self.token_estimator(str(tool_calls))
+        return tokens
+
+    def estimate(self, messages: List[Any]) -> int:
+        return sum(self.message_tokens(message) for message in messages)
+
+    @staticmethod
+    def _turns(messages: List[Any]) -> List[List[int]]:
+        """
+        Agrupa os índices das mensagens em turnos: cada mensagem que não é 'tool' inicia um turno e
+        as mensagens 'tool' seguintes pertencem a ele.
+        """
+        turns = []
+        for i, message in enumerate(messages):
+            if _message_field(message, "role") == "tool" and turns:
+                turns[-1].append(i)
+            else:
+                turns.append([i])
+        return turns
+
+    def _pinned_turns(self, messages: List[Any], turns: List[List[int]]) -> int:
+        """
+        Número de turnos iniciais que nunca são descartados: mensagens de sistema iniciais e a
+        primeira mensagem do usuário.
+        """
+        pinned = 0
+        while pinned < len(turns) and _message_field(messages[turns[pinned][0]], "role") == "system":
+            pinned += 1
+        if pinned < len(turns) and _message_field(messages[turns[pinned][0]], "role") == "user":
+            pinned += 1
+        return pinned
+
+    @staticmethod
+    def _content_key(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _cached_summary(self, key: str) -> Optional[str]:
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+        return summary
+
+    def _store_summary(self, key: str, summary: Any) -> str:
+        summary = summary if isinstance(summary, str) else str(summary)
+        self._summaries[key] = summary
+        self.summaries_computed += 1
+        while len(self._summaries) > self._max_cached_summaries:
+            self._summaries.popitem(last=False)
+        return summary
+
+    def _compaction_targets(self, messages: List[Any], sizes: List[int], candidates: List[List[int]]) -> List[int]:
+        """
+        Índices dos resultados de ferramentas antigos que devem ser resumidos.
+        """
+        if self.compactor is None or sum(sizes) <= self.compact_threshold:
+            return []
+        return [
+            i for turn in candidates for i in turn[1:]
+            if isinstance(messages[i], dict)
+            and isinstance(messages[i].get("content"), str)
+            and sizes[i] - self.message_overhead >= self.min_compact_tokens
+        ]
+
+    def _replace_content(self, trimmed: List[Any], sizes: List[int], i: int, content: str) -> int:
+        """
+        Substitui o conteúdo da mensagem i se o resultado for menor. Retorna os tokens economizados.
+        """
+        replaced = {**trimmed[i], "content": content}
+        replaced_size = self.message_tokens(replaced)
+        if replaced_size >= sizes[i]:
+            return 0
+        saved = sizes[i] - replaced_size
+        trimmed[i] = replaced
+        sizes[i] = replaced_size
+        return saved
+
+    def _prepare(self, messages: List[Any]) -> Optional[tuple]:
+        sizes = [self.message_tokens(message) for message in messages]
+        if sum(sizes) <= min(self.max_tokens, self.compact_threshold if self.compactor else self.max_tokens):
+            return None
+        turns = self._turns(messages)
+        # O turno mais recente é sempre enviado por inteiro
+        candidates = turns[self._pinned_turns(messages, turns):-1]
+        return sizes, candidates, self._compaction_targets(messages, sizes, candidates)
+
+    def apply(self, messages: List[Any]) -> List[Any]:
+        """
+        Retorna as mensagens que cabem no orçamento (a própria lista quando já cabe).
+        """
+        prepared = self._prepare(messages)
+        if prepared is None:
+            return messages
+        sizes, candidates, targets = prepared
+
+        summaries = {}
+        for i in targets:
+            content = messages[i]["content"]
+            key = self._content_key(content)
+            summary = self._cached_summary(key)
+            if summary is None:
+                summary = self._store_summary(key, self.compactor(content, messages[i].get("name")))
+            summaries[i] = summary
+        return self._fit(messages, sizes, candidates, summaries)
+
+    async def apply_async(self, messages: List[Any]) -> List[Any]:
+        """
+        Versão assíncrona de apply: aceita compactors assíncronos.
+        """
+        prepared = self._prepare(messages)
+        if prepared is None:
+            return messages
+        sizes, candidates, targets = prepared
+
+        summaries = {}
+        for i in targets:
+            content = messages[i]["content"]
+            key = self._content_key(content)
+            summary = self._cached_summary(key)
+            if summary is None:
+                summary = self.compactor(content, messages[i].get("name"))
+                if inspect.isawaitable(summary):
+                    summary = await summary
+                summary = self._store_summary(key, summary)
+            summaries[i] = summary
+        return self._fit(messages, sizes, candidates, summaries)
+
+    def _fit(self, messages: List[Any], sizes: List[int], candidates: List[List[int]], summaries: Dict[int, str]) -> List[Any]:
+        trimmed = list(messages)
+        total = sum(sizes)
+
+        # 1) Troca resultados de ferramentas antigos pelos resumos do compactor
+        for i, summary in summaries.items():
+            saved = self._replace_content(trimmed, sizes, i, summary)
+            if saved:
+                total -= saved
+                self.compacted += 1
+
+        if total <= self.max_tokens:
+            return trimmed
+
+        # 2) Substitui resultados de ferramentas antigos por um aviso curto
+        for turn in candidates:
+            for i in turn[1:]:
+                if total <= self.max_tokens:
+                    break
+                if not isinstance(messages[i], dict):
+                    continue
+                marker = self.elision_marker.format(tokens=sizes[i] - self.message_overhead)
+                saved = self._replace_content(trimmed, sizes, i, marker)
+                if saved:
+                    total -= saved
+                    self.elided += 1
+
+        if total <= self.max_tokens:
+            return trimmed
+
+        # 3) Descarta os turnos mais antigos inteiros (mensagem + resultados de ferramentas)
+        dropped = set()
+        for turn in candidates:
+            if total <= self.max_tokens:
+                break
+            dropped.update(turn)
+            total -= sum(sizes[i] for i in turn)
+            self.dropped += 1
+
+        return [message for i, message in enumerate(trimmed) if i not in dropped]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "elided": self.elided,
+            "dropped": self.dropped,
+            "compacted": self.compacted,
+            "summaries_computed": self.summaries_computed,
+            "cached_summaries": len(self._summaries),
+        }
+
+
+def json_extract(content: str, tool_name: Optional[str] = None, max_items: int = 3, max_string: int = 80) -> str:
+    """
+    Compactor padrão: extrai a estrutura de um resultado JSON (chaves, tamanhos das listas e os
+    primeiros itens, com strings longas encurtadas). Conteúdo que não é JSON é encurtado.
+
+    Args:
+        content: conteúdo da mensagem de ferramenta
+        tool_name: nome da ferramenta (não utilizado)
+        max_items: número de itens mantidos de cada lista
+        max_string: número máximo de caracteres de cada string
+    Returns:
+        Resumo do conteúdo
+    """
+    def shorten(text: str) -> str:
+        return text if len(text) <= max_string else f"{text[:max_string]}... ({len(text)} chars)"
+
+    def extract(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: extract(item) for key, item in value.items()}
+        if isinstance(value, list):
+            items = [extract(item) for item in value[:max_items]]
+            if len(value) > max_items:
+                items.append(f"... {len(value) - max_items} more items")
+            return items
+        if isinstance(value, str):
+            return shorten(value)
+        return value
+
+    try:
+        value = json.loads(content)
+    except (TypeError, ValueError):
+        return f"[Summary] {shorten(content)}"
+    return f"[Summary] {json.dumps(extract(value), ensure_ascii=False, separators=(',', ':'))}"
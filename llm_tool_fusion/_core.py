@@ -1,17 +1,57 @@
 from functools import wraps
-from typing import Callable, Optional,Any, List, Dict
+from typing import Callable, Optional,Any, List, Dict, Iterable, AsyncIterator
+from concurrent.futures import Executor, ThreadPoolExecutor
 import asyncio
+import inspect
 import time
-import json
-from ._utils import _extract_docstring, _poll_fuction_async
+from ._utils import _extract_docstring, _poll_fuction_async, _run_async_tool, _canonical_schema, _tools_fingerprint
+from ._batching import MicroBatcher
+from ._results import OutputPolicy, ToolResultStore, _format_tool_content, _make_read_tool_result
+from ._jobs import JobManager, _make_check_job
+from ._llm import HedgedLLMCall
+from ._retry import RetryPolicy
+from ._hedging import LatencyStats, HedgingPolicy, _run_hedged
+from ._limits import AdaptiveLimit
+from ._context import ContextBudget
+from ._codec import JsonCodec
+from ._checkpoint import _serializable_messages
+from ._history import ContentInterner, CompactMessage, _accepts_conversation_log, _dedupe_tool_results, _compact_assistant_message, _materialize
+from ._scheduling import ToolResources, PriorityScheduler, ALL_RESOURCES, _conflicts, _call_dependencies, _run_dag, _run_dag_async
 
 class ToolCaller:
-    def __init__(self, framework: Optional[str] = None):
+    def __init__(
+        self,
+        framework: Optional[str] = None,
+        output_policy: Optional[OutputPolicy] = None,
+        result_store: Optional[ToolResultStore] = None,
+        job_manager: Optional[JobManager] = None,
+        scheduler: Optional[PriorityScheduler] = None,
+        json_codec: Optional[JsonCodec] = None,
+        canonical_tools: bool = False
+    ):
         self._list_tools = []
         self._async_list_tools = []
         self._tools = []
         self._list_supported_framework = ["openai", "ollama"]
         self._framework = framework
+        self._output_policy = output_policy
+        self._output_policies = {}
+        self._result_store = result_store if result_store is not None else ToolResultStore()
+        self._read_tool_result = _make_read_tool_result(self._result_store)
+        self._deferred_tools = set()
+        self._job_manager = job_manager
+        self._check_job = None
+        # Ferramentas de status: o resultado muda entre chamadas com os mesmos argumentos
+        self._volatile_tools = {"check_job"}
+        self._job_resources = {}
+        self._tool_resources = {}
+        self._latency_stats = {}
+        self._hedging_policies = {}
+        self._scheduler = scheduler
+        self._concurrency_limits = {}
+        self._json_codec = json_codec or JsonCodec(backend="json")
+        self._canonical_tools = canonical_tools
+        self._canonical_cache = None
 
         if self._framework == None:
             self._framework = "openai"
@@ -34,8 +74,73 @@ class ToolCaller:
         self._async_list_tools.append(wrapper)
         return wrapper
 
+    def batch_tool(self, func: Optional[Callable] = None, *, max_batch_size: int = 32, max_wait_ms: float = 5.0) -> Callable:
+        """
+        Registra uma ferramenta com micro-batching: chamadas concorrentes (inclusive de sessões
+        diferentes de process_tool_calls_async) são agrupadas em uma única chamada ao backend.
+
+        A função decorada recebe uma lista de argumentos (um dict por chamada) e retorna a lista de
+        resultados na mesma ordem. A docstring deve descrever os parâmetros de uma única chamada,
+        que é o que o modelo enxerga. A ferramenta é registrada como assíncrona.
+
+        EXEMPLO:
+
+        @manager.batch_tool(max_batch_size=64, max_wait_ms=10)
+        async def embed(calls: list[dict]) -> list:
+            # docstring descreve o parâmetro de uma chamada: text (str)
+            return await backend.embed([call["text"] for call in calls])
+
+        Args:
+            func: função em lote (sync ou async)
+            max_batch_size: número máximo de chamadas por lote
+            max_wait_ms: tempo máximo de espera (ms) para completar um lote
+        """
+        def decorator(func: Callable) -> Callable:
+            batcher = MicroBatcher(func, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+            @wraps(func)
+            async def wrapper(**kwargs):
+                return await batcher.submit(kwargs)
+            wrapper.batcher = batcher
+            self._async_list_tools.append(wrapper)
+            return wrapper
+
+        if func is None:
+            return decorator
+        return decorator(func)
+
+    def deferred_tool(self, func: Callable) -> Callable:
+        """
+        Registra uma ferramenta demorada que roda em segundo plano.
+
+        Ao ser chamada, a ferramenta é iniciada em um JobManager e o modelo recebe imediatamente um
+        handle, podendo continuar usando outras ferramentas. O resultado pode ser consultado com a
+        ferramenta check_job(handle), registrada automaticamente, e é enviado ao modelo em uma
+        mensagem de sistema assim que o job termina. Aceita funções síncronas e assíncronas.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+        if inspect.iscoroutinefunction(func) or inspect.isasyncgenfunction(func):
+            self._async_list_tools.append(wrapper)
+        else:
+            self._list_tools.append(wrapper)
+        self._deferred_tools.add(wrapper.__name__)
+
+        if self._job_manager is None:
+            self._job_manager = JobManager()
+        if self._check_job is None:
+            self._check_job = _make_check_job(self._job_manager)
+        return wrapper
+
     def get_tools(self) -> list[str]:
-        tools = self._list_tools + self._async_list_tools
+        tools = self._list_tools + self._async_list_tools + self._get_builtin_tools()
+        if self._canonical_tools:
+            schemas = self._get_canonical_tools(tools)[0]
+            # register_tool acrescenta em self._tools: uma cópia preserva a lista em cache
+            self._tools = list(schemas)
+            return schemas
         self._tools = []
         for tool in tools:
             tool_info = _extract_docstring(tool)
@@ -45,14 +150,86 @@ class ToolCaller:
             })
         return self._tools
 
+    def _get_canonical_tools(self, tools: List[Callable]) -> tuple:
+        """
+        Schemas ordenados pelo nome da ferramenta, com chaves em ordem estável, e o fingerprint da
+        lista. Ficam em cache até o conjunto de ferramentas mudar.
+        """
+        key = tuple(tools)
+        if self._canonical_cache is None or self._canonical_cache[0] != key:
+            schemas = [_canonical_schema({"type": "function", "function": _extract_docstring(tool)}) for tool in tools]
+            schemas.sort(key=lambda schema: schema["function"]["name"])
+            self._canonical_cache = (key, schemas, _tools_fingerprint(schemas))
+        return self._canonical_cache[1], self._canonical_cache[2]
+
+    def set_canonical_tools(self, enabled: bool):
+        """
+        Ativa o modo canônico de get_tools(): ferramentas ordenadas pelo nome (e não pela ordem de
+        registro), chaves dos schemas em ordem alfabética e a mesma lista reutilizada enquanto as
+        ferramentas não mudam. O bloco de ferramentas fica idêntico byte a byte entre requisições,
+        o que permite ao provedor reaproveitar o cache de prompt.
+        """
+        self._canonical_tools = enabled
+        self._canonical_cache = None
+
+    def get_tools_fingerprint(self) -> str:
+        """
+        Hash SHA-256 do bloco de ferramentas: muda somente quando os schemas enviados ao modelo mudam.
+        """
+        tools = self._list_tools + self._async_list_tools + self._get_builtin_tools()
+        if self._canonical_tools:
+            return self._get_canonical_tools(tools)[1]
+        return _tools_fingerprint(self.get_tools())
+
     def get_name_async_tools(self) -> set[str]:
         return {f"{func.__name__}" for func in self._async_list_tools}
     
+    def get_name_deferred_tools(self) -> set[str]:
+        return set(self._deferred_tools)
+
+    def get_name_volatile_tools(self) -> set[str]:
+        return set(self._volatile_tools)
+
+    def set_tool_volatile(self, tool_name: str, volatile: bool = True):
+        """
+        Marca uma ferramenta cujo resultado muda entre chamadas com os mesmos argumentos (ex: uma
+        consulta de status). Ferramentas voláteis nunca reutilizam o resultado anterior
+        (reuse_repeated_results) nem contam como repetição (repeat_threshold). check_job já é volátil.
+
+        EXEMPLO:
+
+        manager.set_tool_volatile("get_order_status")
+        """
+        if volatile:
+            self._volatile_tools.add(tool_name)
+        else:
+            self._volatile_tools.discard(tool_name)
+
     def get_name_tools(self) -> set[str]:
-        return {f"{func.__name__}" for func in self._list_tools}
+        return {f"{func.__name__}" for func in self._list_tools + self._get_builtin_tools()}
     
     def get_map_tools(self) -> dict[str, Callable]:
-        return {f"{func.__name__}": func for func in self._list_tools + self._async_list_tools}
+        return {f"{func.__name__}": func for func in self._list_tools + self._async_list_tools + self._get_builtin_tools()}
+
+    def _get_builtin_tools(self) -> list[Callable]:
+        """
+        Ferramentas registradas automaticamente conforme as funcionalidades habilitadas. Uma
+        ferramenta do usuário com o mesmo nome de uma delas gera erro em vez de ser substituída.
+        """
+        builtin_tools = []
+        policies = [self._output_policy, *self._output_policies.values()]
+        if any(policy is not None and policy.paginate for policy in policies):
+            builtin_tools.append(self._read_tool_result)
+        if self._deferred_tools:
+            builtin_tools.append(self._check_job)
+
+        user_names = {func.__name__ for func in self._list_tools + self._async_list_tools}
+        for builtin in builtin_tools:
+            if builtin.__name__ in user_names:
+                raise ValueError(
+                    f"Tool name '{builtin.__name__}' is reserved by a built-in tool; rename your tool"
+                )
+        return builtin_tools
     
     def register_tool(self, function: Callable):
         self._list_tools.append(function)
@@ -86,7 +263,905 @@ class ToolCaller:
 
     def get_framework(self) -> str:
         return self._framework
+
+    def set_output_policy(self, policy: Optional[OutputPolicy], tool_name: Optional[str] = None):
+        """
+        Define a política de tamanho do conteúdo das mensagens de ferramenta.
+
+        Args:
+            policy: instância de OutputPolicy (None remove a política)
+            tool_name: se informado, a política vale apenas para esta ferramenta e substitui só os campos
+                que define (diferentes do padrão) da política global; caso contrário é a política global
+        """
+        if tool_name is None:
+            self._output_policy = policy
+        elif policy is None:
+            self._output_policies.pop(tool_name, None)
+        else:
+            self._output_policies[tool_name] = policy
+
+    def get_output_policy(self, tool_name: Optional[str] = None) -> Optional[OutputPolicy]:
+        """
+        Política efetiva de tool_name: a política da ferramenta aplicada sobre a global (ver OutputPolicy).
+        """
+        if tool_name is not None and tool_name in self._output_policies:
+            return self._output_policies[tool_name].merged(self._output_policy)
+        return self._output_policy
+
+    def set_tool_resources(self, tool_name: str, reads: Optional[List[str]] = None, writes: Optional[List[str]] = None):
+        """
+        Declara os recursos lidos e escritos por uma ferramenta. Com schedule_tool_calls=True, as
+        chamadas que não conflitam rodam em paralelo e as conflitantes (ex: duas escritas na mesma
+        conta) rodam em série, na ordem emitida pelo modelo. Ferramentas sem recursos declarados
+        conflitam com todas as outras.
+
+        EXEMPLO:
+
+        manager.set_tool_resources("get_balance", reads=["account:{account_id}"])
+        manager.set_tool_resources("transfer", writes=["account:{from_id}", "account:{to_id}"])
+
+        Args:
+            tool_name: nome da ferramenta
+            reads: chaves dos recursos lidos (aceitam os argumentos da chamada como template)
+            writes: chaves dos recursos escritos (aceitam os argumentos da chamada como template)
+        """
+        self._tool_resources[tool_name] = ToolResources(reads, writes)
+
+    def _resource_keys(self, tool_name: str, tool_args: Dict[str, Any]) -> tuple:
+        resources = self._tool_resources.get(tool_name)
+        if resources is None:
+            return (frozenset(), frozenset([ALL_RESOURCES]))
+        return resources.keys(tool_args)
+
+    def _conflicting_jobs(self, keys: tuple) -> List[str]:
+        """
+        Jobs em segundo plano ainda em execução que conflitam com uma nova chamada (ordem entre turnos).
+        """
+        return [
+            handle for handle, job_keys in list(self._job_resources.items())
+            if not self._job_manager.done(handle) and _conflicts(job_keys, keys)
+        ]
+
+    def set_hedging(self, tool_name: str, policy: Optional[HedgingPolicy]):
+        """
+        Define a política de hedging de uma ferramenta assíncrona (None remove). Aplicada nos caminhos
+        assíncronos (execução individual, use_async_poll e schedule_tool_calls).
+
+        EXEMPLO:
+
+        manager.set_hedging("search", HedgingPolicy(percentile=95, fallback=search_replica))
+        """
+        if policy is None:
+            self._hedging_policies.pop(tool_name, None)
+        else:
+            self._hedging_policies[tool_name] = policy
+
+    def set_scheduler(self, scheduler: Optional[PriorityScheduler]):
+        """
+        Define o PriorityScheduler compartilhado por todas as sessões deste ToolCaller (None remove).
+        Com ele, as ferramentas de todas as sessões concorrentes disputam as mesmas vagas de execução
+        e as sessões com maior priority (ver process_tool_calls) são atendidas primeiro.
+
+        EXEMPLO:
+
+        manager.set_scheduler(PriorityScheduler(max_concurrency=8))
+        """
+        self._scheduler = scheduler
+
+    def get_scheduler(self) -> Optional[PriorityScheduler]:
+        return self._scheduler
+
+    def set_concurrency_limit(self, tool_name: str, limit: Optional[AdaptiveLimit]):
+        """
+        Define o limite de concorrência adaptativo de uma ferramenta (None remove). O limite vale para
+        todas as sessões deste ToolCaller, em use_async_poll, schedule_tool_calls e execuções individuais.
+
+        EXEMPLO:
+
+        manager.set_concurrency_limit("search", AdaptiveLimit(initial_limit=4, max_limit=32, timeout=10))
+        """
+        if limit is None:
+            self._concurrency_limits.pop(tool_name, None)
+        else:
+            self._concurrency_limits[tool_name] = limit
+
+    def get_concurrency_limits(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Limite atual, execuções ativas e em espera, latências, erros e timeouts de cada ferramenta com AdaptiveLimit.
+        """
+        return {tool_name: limit.get_stats() for tool_name, limit in self._concurrency_limits.items()}
+
+    def get_tool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Estatísticas de latência, erros e hedging de cada ferramenta executada.
+        """
+        return {tool_name: stats.summary() for tool_name, stats in self._latency_stats.items()}
+
+    def _get_latency_stats(self, tool_name: str) -> LatencyStats:
+        stats = self._latency_stats.get(tool_name)
+        if stats is None:
+            stats = self._latency_stats.setdefault(tool_name, LatencyStats())
+        return stats
+
+    def set_json_codec(self, codec: Optional[JsonCodec]):
+        """
+        Define o JsonCodec usado para ler os argumentos das chamadas e serializar os resultados
+        (None volta ao json da biblioteca padrão).
+
+        EXEMPLO:
+
+        manager.set_json_codec(JsonCodec(backend="auto", compact=True))
+        """
+        self._json_codec = codec or JsonCodec(backend="json")
+
+    def get_json_codec(self) -> JsonCodec:
+        return self._json_codec
+
+    def register_result_encoder(self, type_: type, encoder: Callable[[Any], Any]):
+        """
+        Registra como serializar resultados de ferramentas do tipo type_ (e subclasses), nos dois frameworks.
+        Dataclasses, datetimes, Decimal, bytes, UUID, Enum, set e arrays NumPy já são suportados.
+
+        EXEMPLO:
+
+        manager.register_result_encoder(Money, lambda money: f"{money.amount} {money.currency}")
+        """
+        self._json_codec.encoders.register(type_, encoder)
+
+    def get_tool_result(self, handle: str) -> Optional[str]:
+        """
+        Retorna o conteúdo completo de um resultado guardado fora das mensagens (OutputPolicy(spill=True) ou paginate=True).
+        """
+        return self._result_store.get(handle)
+
+    def _start_job(self, tool_name: str, tool_args: Dict[str, Any], pending_jobs: List[str]) -> str:
+        handle = self._job_manager.submit(
+            tool_name,
+            self.get_map_tools()[tool_name],
+            tool_args,
+            is_async=tool_name in self.get_name_async_tools()
+        )
+        pending_jobs.append(handle)
+        # Apenas ferramentas com recursos declarados ordenam chamadas de turnos seguintes
+        if tool_name in self._tool_resources:
+            self._job_resources[handle] = self._resource_keys(tool_name, tool_args)
+        return (
+            f"Tool '{tool_name}' started in background with handle '{handle}'. "
+            f"Use check_job(handle='{handle}') to get its result; it will also be sent automatically once it finishes."
+        )
+
+    def _finished_job_messages(self, pending_jobs: List[str]) -> List[Dict[str, Any]]:
+        """
+        Remove de pending_jobs os jobs concluídos e retorna as mensagens com os resultados ainda não entregues.
+        """
+        finished_messages = []
+        for handle in list(pending_jobs):
+            if not self._job_manager.done(handle):
+                continue
+            pending_jobs.remove(handle)
+            self._job_resources.pop(handle, None)
+
+            job = self._job_manager.get(handle)
+            if job["delivered"]:
+                continue
+            self._job_manager.mark_delivered(handle)
+
+            result = self._job_manager.result(handle)
+            if isinstance(result, Exception):
+                result = f"Error executing tool '{job['tool_name']}': {result}"
+            finished_messages.append({
+                "role": "system",
+                "content": f"Background job '{handle}' ({job['tool_name']}) finished. Result: {self._format_tool_result(job['tool_name'], result)}"
+            })
+        return finished_messages
+
+    def _format_tool_result(self, tool_name: str, tool_result: Any) -> str:
+        # Páginas de read_tool_result já respeitam o limite pedido pelo modelo
+        policy = None if tool_name == "read_tool_result" else self.get_output_policy(tool_name)
+        return _format_tool_content(tool_result, self._framework, policy, self._result_store, self._json_codec)
             
+class _ToolSession:
+    """
+    Estado e opções de execução de ferramentas de uma chamada a process_tool_calls(_async).
+    Executa os tool_calls de cada turno e monta as mensagens 'tool' no formato do framework.
+    """
+
+    def __init__(
+        self,
+        tool_caller: ToolCaller,
+        verbose: bool = False,
+        verbose_time: bool = False,
+        use_async_poll: bool = False,
+        on_tool_chunk: Optional[Callable] = None,
+        stream_max_chars: Optional[int] = None,
+        stream_timeout: Optional[float] = None,
+        schedule_tool_calls: bool = False,
+        priority: float = 0,
+        context_budget: Optional[ContextBudget] = None,
+        dedupe_tool_results: bool = False,
+        intern_tool_results: bool = False,
+        compact_messages: bool = False,
+        checkpoint_store: Optional[Any] = None,
+        run_id: Optional[str] = None,
+        stable_prefix: bool = False,
+        tool_executor: Optional[Executor] = None,
+        llm_retry: Optional[RetryPolicy] = None,
+        max_wall_time: Optional[float] = None,
+        max_total_tokens: Optional[int] = None,
+        max_tool_calls: Optional[int] = None,
+        final_answer_mode: Optional[str] = None,
+        reuse_repeated_results: bool = False,
+        repeat_threshold: Optional[int] = None,
+        repeat_action: str = "warn"
+    ):
+        self.tool_caller = tool_caller
+        self.framework = tool_caller.get_framework()
+        self.available_tools = tool_caller.get_map_tools()
+        self.async_tools_name = tool_caller.get_name_async_tools()
+        self.deferred_tools_name = tool_caller.get_name_deferred_tools()
+        self.volatile_tools_name = tool_caller.get_name_volatile_tools()
+        self.pending_jobs = []
+        self.verbose = verbose
+        self.verbose_time = verbose_time
+        self.use_async_poll = use_async_poll
+        self.on_tool_chunk = on_tool_chunk
+        self.stream_max_chars = stream_max_chars
+        self.stream_timeout = stream_timeout
+        self.schedule_tool_calls = schedule_tool_calls
+        self.priority = priority
+        self.scheduler = tool_caller.get_scheduler()
+        self.context_budget = context_budget
+        self.dedupe_tool_results = dedupe_tool_results
+        # Por conversa: as strings compartilhadas são liberadas junto com a sessão
+        self.content_interner = ContentInterner() if intern_tool_results else None
+        self.compact_messages = compact_messages
+        if checkpoint_store is not None and run_id is None:
+            raise ValueError("run_id is required when checkpoint_store is set")
+        self.checkpoint_store = checkpoint_store
+        self.run_id = run_id
+        self.chain_count = 0
+        if stable_prefix and (context_budget is not None or dedupe_tool_results):
+            raise ValueError("stable_prefix cannot be combined with context_budget or dedupe_tool_results, which rewrite earlier messages")
+        self.stable_prefix = stable_prefix
+        self._sent_prefix = None
+        self.tool_executor = tool_executor
+        self.llm_retry = llm_retry
+        if final_answer_mode not in (None, "drop_tools", "tool_choice"):
+            raise ValueError("Invalid final_answer_mode. Use 'drop_tools', 'tool_choice' or None")
+        self.max_wall_time = max_wall_time
+        self.max_total_tokens = max_total_tokens
+        self.max_tool_calls = max_tool_calls
+        self.final_answer_mode = final_answer_mode
+        self.started_at = time.monotonic()
+        self.total_tokens = 0
+        self.tool_calls_count = 0
+        self.finalizing = False
+        if repeat_action not in ("warn", "stop"):
+            raise ValueError("Invalid repeat_action. Use 'warn' or 'stop'")
+        if repeat_threshold is not None and repeat_threshold < 1:
+            raise ValueError("repeat_threshold must be greater than or equal to 1")
+        self.reuse_repeated_results = reuse_repeated_results
+        self.repeat_threshold = repeat_threshold
+        self.repeat_action = repeat_action
+        self.previous_results = {}
+        self.call_counts = {}
+        self._repeated_tools = []
+
+    def _parse_args(self, tool_call: Any) -> Dict[str, Any]:
+        if self.framework == "openai":
+            return self.tool_caller._json_codec.loads(tool_call.function.arguments)
+        return tool_call.function.arguments
+
+    def _format_tool_result(self, tool_name: str, tool_result: Any) -> str:
+        content = self.tool_caller._format_tool_result(tool_name, tool_result)
+        # Saídas repetidas compartilham a mesma string no histórico
+        return self.content_interner.intern(content) if self.content_interner is not None else content
+
+    def _tool_message(self, tool_call: Any, tool_name: str, tool_result: Any) -> Dict[str, Any]:
+        if self.compact_messages:
+            return CompactMessage(
+                "tool",
+                self._format_tool_result(tool_name, tool_result),
+                name=tool_name,
+                tool_call_id=tool_call.id if self.framework == "openai" else None
+            )
+        if self.framework == "openai":
+            return {
+                "role": "tool",
+                "tool_call_id": tool_call.id,
+                "name": tool_name,
+                "content": self._format_tool_result(tool_name, tool_result),
+            }
+        return {
+            "role": "tool", 
+            "content": self._format_tool_result(tool_name, tool_result), 
+            "name": tool_name
+        }
+
+    def _error(self, tool_name: str, error: Exception) -> str:
+        tool_result = f"Error executing tool '{tool_name}': {error}"
+        if self.verbose:
+            print(f"[ERROR] {tool_result}")
+        return tool_result
+
+    def _call_async(self, func: Callable, tool_name: str, tool_args: Dict[str, Any]):
+        return _run_async_tool(
+            func, tool_args, tool_name,
+            on_tool_chunk=self.on_tool_chunk,
+            stream_max_chars=self.stream_max_chars,
+            stream_timeout=self.stream_timeout
+        )
+
+    async def _run_async_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        """
+        Executa uma ferramenta assíncrona aplicando o hedging configurado e registrando a latência.
+        Com um PriorityScheduler e/ou um AdaptiveLimit, aguarda uma vaga de execução antes de iniciar.
+        """
+        if self.scheduler is None:
+            return await self._run_limited_async_tool(tool_name, tool_args)
+        async with self.scheduler.slot_async(self.priority):
+            return await self._run_limited_async_tool(tool_name, tool_args)
+
+    async def _run_limited_async_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        # O AdaptiveLimit fica dentro da vaga do scheduler: a latência e o timeout medidos não
+        # incluem a espera na fila compartilhada, que não diz nada sobre a saúde do backend
+        limit = self.tool_caller._concurrency_limits.get(tool_name)
+        if limit is None:
+            return await self._execute_async_tool(tool_name, tool_args)
+        return await limit.call_async(lambda: self._execute_async_tool(tool_name, tool_args), self.priority)
+
+    async def _execute_async_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        func = self.available_tools[tool_name]
+        stats = self.tool_caller._get_latency_stats(tool_name)
+        policy = self.tool_caller._hedging_policies.get(tool_name)
+        delay = policy.delay(stats) if policy is not None else None
+
+        start_time = time.perf_counter()
+        error = False
+        try:
+            if delay is None:
+                return await self._call_async(func, tool_name, tool_args)
+            return await _run_hedged(
+                lambda: self._call_async(func, tool_name, tool_args),
+                lambda: self._call_async(policy.fallback or func, tool_name, tool_args),
+                delay,
+                stats
+            )
+        except Exception:
+            error = True
+            raise
+        finally:
+            stats.record(time.perf_counter() - start_time, error)
+
+    def _run_sync_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        if self.scheduler is None:
+            return self._run_limited_sync_tool(tool_name, tool_args)
+        with self.scheduler.slot(self.priority):
+            return self._run_limited_sync_tool(tool_name, tool_args)
+
+    def _run_limited_sync_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        limit = self.tool_caller._concurrency_limits.get(tool_name)
+        if limit is None:
+            return self._execute_sync_tool(tool_name, tool_args)
+        return limit.call(lambda: self._execute_sync_tool(tool_name, tool_args), self.priority)
+
+    def _execute_sync_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        stats = self.tool_caller._get_latency_stats(tool_name)
+        start_time = time.perf_counter()
+        error = False
+        try:
+            return self.available_tools[tool_name](**tool_args)
+        except Exception:
+            error = True
+            raise
+        finally:
+            stats.record(time.perf_counter() - start_time, error)
+
+    async def _run_sync_tool_async(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        """
+        Ferramenta síncrona em process_tool_calls_async. Com um AdaptiveLimit, um PriorityScheduler ou
+        um tool_executor, as vagas são obtidas sem bloquear o event loop e a ferramenta roda em uma
+        thread: uma ferramenta assíncrona que ocupa a vaga continua podendo terminar e liberá-la.
+        """
+        if self.scheduler is None and self.tool_executor is None and tool_name not in self.tool_caller._concurrency_limits:
+            return self._execute_sync_tool(tool_name, tool_args)
+        if self.scheduler is None:
+            return await self._run_limited_sync_tool_async(tool_name, tool_args)
+        async with self.scheduler.slot_async(self.priority):
+            return await self._run_limited_sync_tool_async(tool_name, tool_args)
+
+    async def _run_limited_sync_tool_async(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        limit = self.tool_caller._concurrency_limits.get(tool_name)
+        if limit is None:
+            return await self._execute_sync_tool_in_thread(tool_name, tool_args)
+        return await limit.call_async(lambda: self._execute_sync_tool_in_thread(tool_name, tool_args), self.priority)
+
+    async def _execute_sync_tool_in_thread(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        # Sem tool_executor, usa o executor padrão do event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.tool_executor, self._execute_sync_tool, tool_name, tool_args)
+
+    async def _poll_async_tools(self, async_poll_list: List[Dict[str, Any]]) -> List[Any]:
+        tool_results = await _poll_fuction_async(
+            avaliable_tools=self.available_tools, 
+            list_tasks=async_poll_list, 
+            framework=self.framework,
+            format_content=self._format_tool_result,
+            run_tool=self.run_tool_async
+        )
+        if self.compact_messages:
+            return [CompactMessage.from_dict(message) for message in tool_results]
+        return tool_results
+
+    def assistant_message(self, message: Any) -> Any:
+        """
+        Mensagem do assistente adicionada ao histórico a partir da mensagem da resposta do modelo.
+        """
+        if self.compact_messages:
+            if self.framework == "openai":
+                return CompactMessage("assistant", message.content)
+            return _compact_assistant_message(message)
+        if self.framework == "openai":
+            return {"role": "assistant", "content": message.content}
+        return message
+
+    def _call_fingerprint(self, tool_name: str, tool_args: Any) -> str:
+        # Argumentos com chaves ordenadas: {"a": 1, "b": 2} e {"b": 2, "a": 1} são a mesma chamada
+        return f"{tool_name}:{self.tool_caller._json_codec.dumps(_canonical_schema(tool_args), compact=True)}"
+
+    def _reuse_key(self, tool_name: str, tool_args: Dict[str, Any]) -> Optional[str]:
+        if not self.reuse_repeated_results or tool_name in self.deferred_tools_name or tool_name in self.volatile_tools_name:
+            return None
+        return self._call_fingerprint(tool_name, tool_args)
+
+    def _reused_result(self, key: Optional[str], tool_name: str) -> tuple:
+        if key is None or key not in self.previous_results:
+            return False, None
+        if self.verbose:
+            print(f"[TOOL] Reusing the earlier result of {tool_name} (same arguments)")
+        return True, self.previous_results[key]
+
+    def run_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        key = self._reuse_key(tool_name, tool_args)
+        reused, result = self._reused_result(key, tool_name)
+        if reused:
+            return result
+        result = self._dispatch_tool(tool_name, tool_args)
+        if key is not None:
+            self.previous_results[key] = result
+        return result
+
+    async def run_tool_async(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        key = self._reuse_key(tool_name, tool_args)
+        reused, result = self._reused_result(key, tool_name)
+        if reused:
+            return result
+        result = await self._dispatch_tool_async(tool_name, tool_args)
+        if key is not None:
+            self.previous_results[key] = result
+        return result
+
+    def _dispatch_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        if tool_name in self.deferred_tools_name:
+            # Inicia em segundo plano e devolve o handle ao modelo
+            return self.tool_caller._start_job(tool_name, tool_args, self.pending_jobs)
+        if tool_name in self.async_tools_name:
+            # Executa individualmente
+            return asyncio.run(self._run_async_tool(tool_name, tool_args))
+        # Executa ferramenta síncrona
+        return self._run_sync_tool(tool_name, tool_args)
+
+    async def _dispatch_tool_async(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        if tool_name in self.deferred_tools_name:
+            return self.tool_caller._start_job(tool_name, tool_args, self.pending_jobs)
+        if tool_name in self.async_tools_name:
+            return await self._run_async_tool(tool_name, tool_args)
+        return await self._run_sync_tool_async(tool_name, tool_args)
+
+    def _should_poll(self, tool_name: str) -> bool:
+        return self.use_async_poll and tool_name in self.async_tools_name and tool_name not in self.deferred_tools_name
+
+    def _log_result(self, tool_result: Any, start_time: Optional[float]):
+        if self.verbose_time and not self.use_async_poll:
+            end_time = time.time()
+            print(f"[TOOL] Execution time: {end_time - start_time} seconds")
+
+        if self.verbose and not self.use_async_poll:
+            print(f"[TOOL] Result: {tool_result}")
+
+    def run_tool_calls(self, tool_calls: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Executa os tool_calls de um turno e retorna as mensagens 'tool' correspondentes.
+        """
+        self.tool_calls_count += len(tool_calls)
+        if self.schedule_tool_calls:
+            return self._run_scheduled(tool_calls)
+
+        # Lista para armazenar ferramentas assíncronas quando use_async_poll=True
+        async_poll_list = []
+        tool_results = []
+
+        for tool_call in tool_calls:
+            tool_name = tool_call.function.name
+            try:
+                tool_args = self._parse_args(tool_call)
+                if self.verbose and not self.use_async_poll:
+                    print(f"[TOOL] Executing: {tool_name}, Args: {tool_args}")
+
+                start_time = time.time() if self.verbose_time else None
+
+                if self._should_poll(tool_name):
+                    # Armazena para execução em paralelo
+                    async_poll_list.append({
+                        "tool_id": getattr(tool_call, "id", None),
+                        "tool_name": tool_name,
+                        "args": tool_args
+                    })
+                    if self.verbose:
+                        print(f"[TOOL] Adding {tool_name} to async_poll_list")
+                    continue
+
+                tool_result = self.run_tool(tool_name, tool_args)
+                self._log_result(tool_result, start_time)
+
+            except Exception as e:
+                tool_result = self._error(tool_name, e)
+
+            tool_results.append(self._tool_message(tool_call, tool_name, tool_result))
+
+        # Executa ferramentas assíncronas em paralelo se use_async_poll=True
+        if async_poll_list:
+            if self.verbose:
+                print(f"[PROCESS] Executing {len(async_poll_list)} async tools in parallel")
+            tool_results.extend(asyncio.run(self._poll_async_tools(async_poll_list)))
+
+        return tool_results
+
+    async def run_tool_calls_async(self, tool_calls: List[Any]) -> List[Dict[str, Any]]:
+        self.tool_calls_count += len(tool_calls)
+        if self.schedule_tool_calls:
+            return await self._run_scheduled_async(tool_calls)
+
+        async_poll_list = []
+        tool_results = []
+
+        for tool_call in tool_calls:
+            tool_name = tool_call.function.name
+            try:
+                tool_args = self._parse_args(tool_call)
+                if self.verbose and not self.use_async_poll:
+                    print(f"[TOOL] Executing: {tool_name}, Args: {tool_args}")
+
+                start_time = time.time() if self.verbose_time else None
+
+                if self._should_poll(tool_name):
+                    async_poll_list.append({
+                        "tool_id": getattr(tool_call, "id", None),
+                        "tool_name": tool_name,
+                        "args": tool_args
+                    })
+                    if self.verbose:
+                        print(f"[TOOL] Adding {tool_name} to async_poll_list")
+                    continue
+
+                tool_result = await self.run_tool_async(tool_name, tool_args)
+                self._log_result(tool_result, start_time)
+
+            except Exception as e:
+                tool_result = self._error(tool_name, e)
+
+            tool_results.append(self._tool_message(tool_call, tool_name, tool_result))
+
+        if async_poll_list:
+            if self.verbose:
+                print(f"[PROCESS] Executing {len(async_poll_list)} async tools in parallel")
+            tool_results.extend(await self._poll_async_tools(async_poll_list))
+
+        return tool_results
+
+    def _prepare_scheduled(self, tool_calls: List[Any]) -> tuple:
+        """
+        Interpreta os argumentos e calcula as dependências entre as chamadas de um turno.
+        """
+        calls = []
+        for tool_call in tool_calls:
+            tool_name = tool_call.function.name
+            try:
+                tool_args = self._parse_args(tool_call)
+                keys = self.tool_caller._resource_keys(tool_name, tool_args)
+                calls.append((tool_name, tool_args, keys, None))
+            except Exception as e:
+                calls.append((tool_name, None, None, e))
+
+        dependencies = _call_dependencies([keys for _, _, keys, _ in calls])
+        if self.verbose:
+            parallel = sum(1 for deps, call in zip(dependencies, calls) if not deps and call[3] is None)
+            print(f"[PROCESS] Scheduling {len(calls)} tool calls ({parallel} without dependencies)")
+        return calls, dependencies
+
+    def _scheduled_messages(self, tool_calls: List[Any], calls: List[tuple], outcomes: List[Any]) -> List[Dict[str, Any]]:
+        tool_results = []
+        for tool_call, (tool_name, _, _, error), outcome in zip(tool_calls, calls, outcomes):
+            if error is not None:
+                outcome = error
+            if isinstance(outcome, Exception):
+                outcome = self._error(tool_name, outcome)
+            elif self.verbose:
+                print(f"[TOOL] Result: {outcome}")
+            tool_results.append(self._tool_message(tool_call, tool_name, outcome))
+        return tool_results
+
+    def _run_scheduled(self, tool_calls: List[Any]) -> List[Dict[str, Any]]:
+        calls, dependencies = self._prepare_scheduled(tool_calls)
+
+        def run(i: int) -> Any:
+            tool_name, tool_args, keys, error = calls[i]
+            if error is not None:
+                raise error
+            # Respeita jobs em segundo plano de turnos anteriores que usam os mesmos recursos
+            conflicting_jobs = self.tool_caller._conflicting_jobs(keys)
+            if conflicting_jobs:
+                self.tool_caller._job_manager.wait(conflicting_jobs)
+            if self.verbose:
+                print(f"[TOOL] Executing: {tool_name}, Args: {tool_args}")
+            return self.run_tool(tool_name, tool_args)
+
+        outcomes = _run_dag(dependencies, run)
+        return self._scheduled_messages(tool_calls, calls, outcomes)
+
+    async def _run_scheduled_async(self, tool_calls: List[Any]) -> List[Dict[str, Any]]:
+        calls, dependencies = self._prepare_scheduled(tool_calls)
+
+        async def run(i: int) -> Any:
+            tool_name, tool_args, keys, error = calls[i]
+            if error is not None:
+                raise error
+            conflicting_jobs = self.tool_caller._conflicting_jobs(keys)
+            if conflicting_jobs:
+                await self.tool_caller._job_manager.wait_async(conflicting_jobs)
+            if self.verbose:
+                print(f"[TOOL] Executing: {tool_name}, Args: {tool_args}")
+            if tool_name in self.async_tools_name or tool_name in self.deferred_tools_name:
+                return await self.run_tool_async(tool_name, tool_args)
+            # Ferramentas síncronas rodam em threads para não bloquear as demais
+            return await asyncio.to_thread(self.run_tool, tool_name, tool_args)
+
+        outcomes = await _run_dag_async(dependencies, run)
+        return self._scheduled_messages(tool_calls, calls, outcomes)
+
+    def llm_messages(self, messages: List[Any]) -> List[Any]:
+        """
+        Mensagens enviadas ao LLM: o histórico completo ou, com dedupe_tool_results e context_budget,
+        a versão reduzida.
+        """
+        sent = _materialize(messages) if self.compact_messages else messages
+        sent = _dedupe_tool_results(sent) if self.dedupe_tool_results else sent
+        if self.context_budget is None:
+            return self._check_prefix(sent)
+        return self._log_trimmed(sent, self.context_budget.apply(sent))
+
+    async def llm_messages_async(self, messages: List[Any]) -> List[Any]:
+        sent = _materialize(messages) if self.compact_messages else messages
+        sent = _dedupe_tool_results(sent) if self.dedupe_tool_results else sent
+        if self.context_budget is None:
+            return self._check_prefix(sent)
+        return self._log_trimmed(sent, await self.context_budget.apply_async(sent))
+
+    def _check_prefix(self, sent: List[Any]) -> List[Any]:
+        """
+        Com stable_prefix, garante que cada requisição começa exatamente com as mensagens da
+        anterior (o loop só acrescenta mensagens), condição para o cache de prompt do provedor.
+        """
+        if not self.stable_prefix:
+            return sent
+        previous = self._sent_prefix
+        if previous is not None and (
+            len(sent) < len(previous)
+            or any(old is not new and old != new for old, new in zip(previous, sent))
+        ):
+            raise RuntimeError("stable_prefix: the messages sent to the LLM no longer start with the previous request")
+        self._sent_prefix = list(sent)
+        return sent
+
+    def _log_trimmed(self, sent: List[Any], trimmed: List[Any]) -> List[Any]:
+        if not self.verbose:
+            return trimmed
+        # Compara o antes e o depois do orçamento: com compact_messages ou dedupe a lista é sempre nova
+        before = self.context_budget.estimate(sent)
+        after = self.context_budget.estimate(trimmed)
+        if len(trimmed) < len(sent) or after < before:
+            print(f"[PROCESS] Context trimmed from {before} to {after} estimated tokens ({len(trimmed)} of {len(sent)} messages)")
+        return trimmed
+
+    def _serializable_results(self) -> Dict[str, Any]:
+        # Resultados sem representação JSON ficam fora do checkpoint: a ferramenta roda de novo
+        codec = self.tool_caller.get_json_codec()
+        results = {}
+        for key, result in self.previous_results.items():
+            try:
+                codec.dumps(result)
+            except (TypeError, ValueError, OverflowError):
+                continue
+            results[key] = result
+        return results
+
+    def save_checkpoint(self, messages: List[Any]):
+        """
+        Grava o estado do loop: mensagens (com os resultados das ferramentas já executadas),
+        chain_count, tokens e execuções de ferramentas contados nos orçamentos, contagem de chamadas
+        repetidas, resultados reutilizáveis e handles dos jobs em segundo plano ainda pendentes.
+        """
+        if self.checkpoint_store is None:
+            return
+        state = {
+            "messages": _serializable_messages(messages),
+            "chain_count": self.chain_count,
+            "total_tokens": self.total_tokens,
+            "tool_calls_count": self.tool_calls_count,
+            "call_counts": self.call_counts,
+            "previous_results": self._serializable_results(),
+            "pending_jobs": self.pending_jobs,
+        }
+        self.checkpoint_store.save(self.run_id, self.tool_caller.get_json_codec().dumps(state))
+
+    def resume(self, messages: List[Any]) -> bool:
+        """
+        Restaura em messages o último checkpoint de run_id e o estado salvo por save_checkpoint.
+        Retorna True se havia um checkpoint.
+
+        Os jobs em segundo plano vivem no JobManager do processo: handles que ele não conhece mais
+        (ex: depois de reiniciar o processo) são descartados. O tempo de max_wall_time conta a
+        partir da retomada, e resultados reutilizáveis voltam na forma JSON (ex: dataclass -> dict).
+        """
+        if self.checkpoint_store is None:
+            return False
+        data = self.checkpoint_store.load(self.run_id)
+        if data is None:
+            return False
+        state = self.tool_caller.get_json_codec().loads(data)
+        messages[:] = state["messages"]
+        self.chain_count = state["chain_count"]
+        # Checkpoints de versões anteriores guardam apenas mensagens e chain_count
+        self.total_tokens = state.get("total_tokens", 0)
+        self.tool_calls_count = state.get("tool_calls_count", 0)
+        self.call_counts = state.get("call_counts", {})
+        self.previous_results = state.get("previous_results", {})
+        job_manager = self.tool_caller._job_manager
+        self.pending_jobs = [
+            handle for handle in state.get("pending_jobs", [])
+            if job_manager is not None and job_manager.get(handle) is not None
+        ]
+        if self.verbose:
+            print(f"[PROCESS] Resuming run '{self.run_id}' from checkpoint ({len(messages)} messages, {self.chain_count} chained calls)")
+        return True
+
+    def complete(self):
+        # O loop terminou: o checkpoint não é mais necessário
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.delete(self.run_id)
+
+    def record_usage(self, response: Any):
+        """
+        Soma os tokens informados pelo provedor na resposta (usage do OpenAI, contagens do Ollama).
+        """
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.total_tokens += getattr(usage, "total_tokens", None) or 0
+        else:
+            self.total_tokens += (getattr(response, "prompt_eval_count", None) or 0) + (getattr(response, "eval_count", None) or 0)
+
+    def limit_message(self, max_chained_calls: int, tool_calls: List[Any]) -> Optional[str]:
+        """
+        Descrição do limite atingido antes de executar tool_calls, ou None se a execução pode continuar.
+        """
+        if self.chain_count > max_chained_calls:
+            return f"The maximum number of chained calls ({max_chained_calls}) has been reached."
+        if self.max_wall_time is not None and time.monotonic() - self.started_at >= self.max_wall_time:
+            return f"The time budget ({self.max_wall_time} seconds) has been reached."
+        if self.max_total_tokens is not None and self.total_tokens >= self.max_total_tokens:
+            return f"The token budget ({self.max_total_tokens} tokens) has been reached."
+        if self.max_tool_calls is not None and self.tool_calls_count + len(tool_calls) > self.max_tool_calls:
+            return f"The tool call budget ({self.max_tool_calls} calls) has been reached."
+        repeated = self._track_repeats(tool_calls)
+        if repeated and self.repeat_action == "stop":
+            return f"The tools {', '.join(repeated)} were called repeatedly with the same arguments."
+        return None
+
+    def _track_repeats(self, tool_calls: List[Any]) -> List[str]:
+        """
+        Registra as chamadas (ferramenta, argumentos) do turno e retorna as ferramentas que já foram
+        chamadas repeat_threshold vezes com os mesmos argumentos nesta conversa. Ferramentas voláteis
+        (ex: check_job) não são contadas.
+        """
+        if self.repeat_threshold is None:
+            return []
+        repeated = []
+        for tool_call in tool_calls:
+            tool_name = tool_call.function.name
+            if tool_name in self.volatile_tools_name:
+                continue
+            try:
+                fingerprint = self._call_fingerprint(tool_name, self._parse_args(tool_call))
+            except Exception:
+                # Argumentos inválidos viram uma mensagem de erro normal na execução
+                continue
+            count = self.call_counts.get(fingerprint, 0)
+            if count >= self.repeat_threshold and tool_name not in repeated:
+                repeated.append(tool_name)
+            self.call_counts[fingerprint] = count + 1
+        self._repeated_tools = repeated
+        return repeated
+
+    def repeat_messages(self) -> List[Dict[str, Any]]:
+        """
+        Com repeat_action="warn", mensagem de sistema corretiva quando o turno repetiu chamadas.
+        """
+        if not self._repeated_tools or self.repeat_action != "warn":
+            return []
+        names = ", ".join(self._repeated_tools)
+        self._repeated_tools = []
+        if self.verbose:
+            print(f"[WARNING] Repeated tool calls detected: {names}")
+        return [{
+            "role": "system",
+            "content": f"You have called {names} repeatedly with the same arguments and the result will not change. Use the results you already have or try a different approach."
+        }]
+
+    def _final_request(self, tools: List[Any], final: bool) -> tuple:
+        """
+        Ferramentas e parâmetros extras da chamada ao LLM. Na chamada final (limite atingido), o
+        modelo é impedido de chamar ferramentas conforme final_answer_mode.
+        """
+        if not final:
+            return tools, {}
+        self.finalizing = True
+        if self.final_answer_mode == "drop_tools":
+            return [], {}
+        if self.final_answer_mode == "tool_choice":
+            return tools, {"tool_choice": "none"}
+        return tools, {}
+
+    def _log_retry(self, attempt: int, error: BaseException, delay: float):
+        if self.verbose:
+            print(f"[LLM] Attempt {attempt} failed ({type(error).__name__}: {error}), retrying in {delay:.2f} seconds")
+
+    def call_llm(self, llm_call_fn: Callable, model: str, messages: List[Any], tools: List[Any], final: bool = False) -> Any:
+        self.save_checkpoint(messages)
+        sent = self.llm_messages(messages)
+        tools, extra = self._final_request(tools, final)
+        if self.llm_retry is None:
+            response = llm_call_fn(model=model, messages=sent, tools=tools, **extra)
+        else:
+            response = self.llm_retry.call(lambda: llm_call_fn(model=model, messages=sent, tools=tools, **extra), on_retry=self._log_retry)
+        self.record_usage(response)
+        return response
+
+    async def call_llm_async(self, llm_call_fn: Callable, model: str, messages: List[Any], tools: List[Any], final: bool = False) -> Any:
+        self.save_checkpoint(messages)
+        sent = await self.llm_messages_async(messages)
+        tools, extra = self._final_request(tools, final)
+        if self.llm_retry is None:
+            response = await llm_call_fn(model=model, messages=sent, tools=tools, **extra)
+        else:
+            response = await self.llm_retry.call_async(lambda: llm_call_fn(model=model, messages=sent, tools=tools, **extra), on_retry=self._log_retry)
+        self.record_usage(response)
+        return response
+
+    def wait_jobs(self):
+        self.tool_caller._job_manager.wait(self.pending_jobs)
+
+    async def wait_jobs_async(self):
+        await self.tool_caller._job_manager.wait_async(self.pending_jobs)
+
+    def finished_job_messages(self) -> List[Dict[str, Any]]:
+        if not self.pending_jobs:
+            return []
+        finished_messages = self.tool_caller._finished_job_messages(self.pending_jobs)
+        if self.compact_messages:
+            return [CompactMessage.from_dict(message) for message in finished_messages]
+        return finished_messages
+
+@_accepts_conversation_log
 def process_tool_calls(
     response: Any, 
     messages: List[Dict[str, Any]],
@@ -96,7 +1171,28 @@ def process_tool_calls(
     verbose_time: Optional[bool] = False,
     clean_messages: Optional[bool] = False,
     use_async_poll: Optional[bool] = False,
-    max_chained_calls: Optional[int] = 5
+    max_chained_calls: Optional[int] = 5,
+    on_tool_chunk: Optional[Callable] = None,
+    stream_max_chars: Optional[int] = None,
+    stream_timeout: Optional[float] = None,
+    wait_deferred_jobs: Optional[bool] = True,
+    schedule_tool_calls: Optional[bool] = False,
+    priority: Optional[float] = 0,
+    context_budget: Optional[ContextBudget] = None,
+    dedupe_tool_results: Optional[bool] = False,
+    intern_tool_results: Optional[bool] = False,
+    compact_messages: Optional[bool] = False,
+    checkpoint_store: Optional[Any] = None,
+    run_id: Optional[str] = None,
+    stable_prefix: Optional[bool] = False,
+    llm_retry: Optional[RetryPolicy] = None,
+    max_wall_time: Optional[float] = None,
+    max_total_tokens: Optional[int] = None,
+    max_tool_calls: Optional[int] = None,
+    final_answer_mode: Optional[str] = None,
+    reuse_repeated_results: Optional[bool] = False,
+    repeat_threshold: Optional[int] = None,
+    repeat_action: Optional[str] = "warn"
     ) -> List[Dict[str, Any]]:
     """
     Processa tool_calls de uma resposta de LLM, executando as ferramentas necessárias e atualizando as mensagens.
@@ -107,7 +1203,7 @@ def process_tool_calls(
 
     Args:
         response (obrigatorio): resposta inicial do modelo
-        messages  (obrigatorio): lista de mensagens do chat
+        messages  (obrigatorio): lista de mensagens do chat (alterada no lugar) ou um ConversationLog imutável
         tool_caller (obrigatorio): instância da classe ToolCaller
         model (obrigatorio): nome do modelo
         llm_call_fn (obrigatorio): função que faz a chamada ao modelo (ex: lambda model, messages, tools: ...), como esta na descrição do exemplo
@@ -116,139 +1212,147 @@ def process_tool_calls(
         clean_messages (opicional): se True, limpa as mensagens após o processamento
         use_async_poll (opicional): se True, executa as ferramentas assíncronas em paralelo
         max_chained_calls (opicional): número máximo de chamadas encadeadas permitidas
+        on_tool_chunk (opicional): callback on_tool_chunk(tool_name, chunk) chamado a cada chunk de ferramentas async generator
+        stream_max_chars (opicional): limite de caracteres consumidos de ferramentas async generator
+        stream_timeout (opicional): limite de tempo (segundos) para consumir ferramentas async generator
+        wait_deferred_jobs (opicional): se True, aguarda os jobs de ferramentas deferred_tool iniciados na sessão antes de encerrar
+        schedule_tool_calls (opicional): se True, executa em paralelo as chamadas de um turno que não conflitam (ver ToolCaller.set_tool_resources)
+        priority (opicional): prioridade das ferramentas desta sessão no PriorityScheduler do ToolCaller (maior = atendida antes)
+        context_budget (opicional): ContextBudget que limita os tokens do histórico enviado a cada chamada ao LLM
+        dedupe_tool_results (opicional): se True, resultados de ferramentas repetidos são enviados como referência ao primeiro
+        intern_tool_results (opicional): se True, resultados de ferramentas iguais da conversa compartilham uma única string na memória
+        compact_messages (opicional): se True, as mensagens adicionadas ao histórico são CompactMessage (__slots__), convertidas em dicts só na chamada ao LLM
+        checkpoint_store (opicional): FileCheckpointStore ou SQLiteCheckpointStore onde o estado é gravado antes de cada chamada ao LLM
+        run_id (opicional): identificador da execução no checkpoint_store; se já existir um checkpoint, a execução continua a partir dele
+        stable_prefix (opicional): se True, verifica que cada requisição ao LLM apenas acrescenta mensagens à anterior (não combina com context_budget e dedupe_tool_results)
+        llm_retry (opicional): RetryPolicy com timeout, novas tentativas com backoff e orçamento de tempo de cada chamada ao LLM
+        max_wall_time (opicional): tempo máximo (segundos) do processamento; ao ser atingido, o modelo é chamado uma última vez para responder
+        max_total_tokens (opicional): total de tokens (usage das respostas) a partir do qual o modelo é chamado uma última vez para responder
+        max_tool_calls (opicional): número máximo de execuções de ferramentas; um turno que o excederia não é executado e o modelo responde
+        final_answer_mode (opicional): como impedir novas ferramentas na chamada final: "drop_tools" (tools=[]), "tool_choice" (tool_choice="none") ou None (apenas a mensagem de sistema)
+        reuse_repeated_results (opicional): se True, uma chamada repetida (mesma ferramenta e argumentos) reutiliza o resultado anterior da conversa sem executar a ferramenta
+        repeat_threshold (opicional): número de vezes que a mesma chamada pode se repetir antes de repeat_action ser aplicada
+        repeat_action (opicional): "warn" (mensagem de sistema corretiva) ou "stop" (o modelo é chamado uma última vez para responder)
     Returns:
-        Última resposta do modelo após processar todos os tool_calls
+        Última resposta do modelo após processar todos os tool_calls; com um ConversationLog em messages,
+        a tupla (resposta, log estendido com as novas mensagens)
     """
     tools = tool_caller.get_tools()
     framework = tool_caller.get_framework()
-    available_tools = tool_caller.get_map_tools()
-    async_tools_name = tool_caller.get_name_async_tools()
+    session = _ToolSession(
+        tool_caller,
+        verbose=verbose,
+        verbose_time=verbose_time,
+        use_async_poll=use_async_poll,
+        on_tool_chunk=on_tool_chunk,
+        stream_max_chars=stream_max_chars,
+        stream_timeout=stream_timeout,
+        schedule_tool_calls=schedule_tool_calls,
+        priority=priority,
+        context_budget=context_budget,
+        dedupe_tool_results=dedupe_tool_results,
+        intern_tool_results=intern_tool_results,
+        compact_messages=compact_messages,
+        checkpoint_store=checkpoint_store,
+        run_id=run_id,
+        stable_prefix=stable_prefix,
+        llm_retry=llm_retry,
+        max_wall_time=max_wall_time,
+        max_total_tokens=max_total_tokens,
+        max_tool_calls=max_tool_calls,
+        final_answer_mode=final_answer_mode,
+        reuse_repeated_results=reuse_repeated_results,
+        repeat_threshold=repeat_threshold,
+        repeat_action=repeat_action
+    )
 
     start_time_process = time.time() if verbose_time else None
-    chain_count = 0
+    if session.resume(messages):
+        response = session.call_llm(llm_call_fn, model, messages, tools)
+    else:
+        session.record_usage(response)
 
     if verbose:
         print(f"[PROCESS] Framework: {framework}")
 
     if framework == "openai":
         while True:
-            if not hasattr(response.choices[0].message, 'tool_calls') or not response.choices[0].message.tool_calls:
+            if session.finalizing or not hasattr(response.choices[0].message, 'tool_calls') or not response.choices[0].message.tool_calls:
+                if session.pending_jobs and wait_deferred_jobs:
+                    # Aguarda os jobs em segundo plano e devolve os resultados ao modelo
+                    if verbose:
+                        print(f"[JOB] Waiting for {len(session.pending_jobs)} background jobs")
+                    messages.append(session.assistant_message(response.choices[0].message))
+                    session.wait_jobs()
+                    messages.extend(session.finished_job_messages())
+                    # Depois de um limite, a resposta continua sendo a final (sem ferramentas)
+                    response = session.call_llm(llm_call_fn, model, messages, tools, final=session.finalizing)
+                    continue
+
                 if verbose:
                     print("[LLM] No tool_calls detected. Processing completed.")
-                    if chain_count > 0:
-                        print(f"[INFO] Total chained calls: {chain_count}")
+                    if session.chain_count > 0:
+                        print(f"[INFO] Total chained calls: {session.chain_count}")
                 
                 if verbose_time:
                     end_time_process = time.time()
                     print(f"[PROCESS] Total execution time: {end_time_process - start_time_process} seconds")
                 
+                session.complete()
+
                 if clean_messages:
                     response = response.choices[0].message.content
                 return response
                 
             if verbose:
                 print(f"[LLM] Tool_calls detected: {response.choices[0].message.tool_calls}")
-            messages.append({"role": "assistant", "content": response.choices[0].message.content})
+            messages.append(session.assistant_message(response.choices[0].message))
             
             # Incrementa o contador de chamadas encadeadas
-            chain_count += 1
-            if chain_count > max_chained_calls:
+            session.chain_count += 1
+            limit_message = session.limit_message(max_chained_calls, response.choices[0].message.tool_calls)
+            if limit_message:
                 if verbose:
-                    print(f"[WARNING] Maximum number of chained calls reached: {max_chained_calls}")
+                    print(f"[WARNING] {limit_message}")
                 messages.append({
                     "role": "system",
-                    "content": f"The maximum number of chained calls ({max_chained_calls}) has been reached. Please provide an answer based on the results obtained so far."
+                    "content": f"{limit_message} Please provide an answer based on the results obtained so far."
                 })
-                response = llm_call_fn(model=model, messages=messages, tools=tools)
+                response = session.call_llm(llm_call_fn, model, messages, tools, final=True)
                 continue
             
-            # Lista para armazenar ferramentas assíncronas quando use_async_poll=True
-            async_poll_list = []
-            tool_results = []
-            
-            for tool_call in response.choices[0].message.tool_calls:
-                tool_name = tool_call.function.name
-                
-                try:
-                    tool_args = json.loads(tool_call.function.arguments)
-                    
-                    if verbose and not use_async_poll:
-                        print(f"[TOOL] Executing: {tool_name}, Args: {tool_args}")
-
-                    start_time = time.time() if verbose_time else None
-                    
-                    if tool_name in async_tools_name:
-                        if use_async_poll:
-                            # Armazena para execução em paralelo
-                            async_poll_list.append({
-                                "tool_id": tool_call.id,
-                                "tool_name": tool_name,
-                                "args": tool_args
-                            })
-                            if verbose:
-                                print(f"[TOOL] Adding {tool_name} to async_poll_list")
-                            continue
-                        else:
-                            # Executa individualmente
-                            tool_result = asyncio.run(available_tools[tool_name](**tool_args))
-                    else:
-                        # Executa ferramenta síncrona
-                        tool_result = available_tools[tool_name](**tool_args)
-                    
-                    if verbose_time and not use_async_poll:
-                        end_time = time.time()
-                        print(f"[TOOL] Execution time: {end_time - start_time} seconds")
-
-                    if verbose and not use_async_poll:
-                        print(f"[TOOL] Result: {tool_result}")
-
-                    tool_results.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "name": tool_name,
-                        "content": json.dumps(tool_result),
-                    })
-
-                except Exception as e:
-                    tool_result = f"Error executing tool '{tool_name}': {e}"
-
-                    if verbose:
-                        print(f"[ERROR] {tool_result}")
+            tool_results = session.run_tool_calls(response.choices[0].message.tool_calls)
 
-                    tool_results.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "name": tool_name,
-                        "content": json.dumps(tool_result),
-                    })
-            
-            # Executa ferramentas assíncronas em paralelo se use_async_poll=True
-            if use_async_poll and async_poll_list:
-                if verbose:
-                    print(f"[PROCESS] Executing {len(async_poll_list)} async tools in parallel")
-                
-                async_results = asyncio.run(_poll_fuction_async(
-                    avaliable_tools=available_tools, 
-                    list_tasks=async_poll_list, 
-                    framework=framework
-                ))
-                tool_results.extend(async_results)
-            
             messages.extend(tool_results)
-            response = llm_call_fn(model=model, messages=messages, tools=tools)
+            messages.extend(session.finished_job_messages())
+            messages.extend(session.repeat_messages())
+            response = session.call_llm(llm_call_fn, model, messages, tools)
 
     elif framework == "ollama":
         while True:
-            if not response.message.tool_calls:
+            if session.finalizing or not response.message.tool_calls:
+                if session.pending_jobs and wait_deferred_jobs:
+                    # Aguarda os jobs em segundo plano e devolve os resultados ao modelo
+                    if verbose:
+                        print(f"[JOB] Waiting for {len(session.pending_jobs)} background jobs")
+                    messages.append(session.assistant_message(response.message))
+                    session.wait_jobs()
+                    messages.extend(session.finished_job_messages())
+                    # Depois de um limite, a resposta continua sendo a final (sem ferramentas)
+                    response = session.call_llm(llm_call_fn, model, messages, tools, final=session.finalizing)
+                    continue
+
                 if verbose:
                     print("[LLM] No tool_calls detected. Processing completed.")
-                    if chain_count > 0:
-                        print(f"[INFO] Total chained calls: {chain_count}")
+                    if session.chain_count > 0:
+                        print(f"[INFO] Total chained calls: {session.chain_count}")
                 
                 if verbose_time:
                     end_time_process = time.time()
                     print(f"[PROCESS] Total execution time: {end_time_process - start_time_process} seconds")
                 
+                session.complete()
+
                 if clean_messages:
                     return response.message.content
                 
@@ -258,88 +1362,27 @@ def process_tool_calls(
                 print(f"[LLM] Tool_calls detected: {response.message.tool_calls}")
             
             # Incrementa o contador de chamadas encadeadas
-            chain_count += 1
-            if chain_count > max_chained_calls:
+            session.chain_count += 1
+            limit_message = session.limit_message(max_chained_calls, response.message.tool_calls)
+            if limit_message:
                 if verbose:
-                    print(f"[WARNING] Maximum number of chained calls reached: {max_chained_calls}")
+                    print(f"[WARNING] {limit_message}")
                 messages.append({
                     "role": "system",
-                    "content": f"The maximum number of chained calls ({max_chained_calls}) has been reached. Please provide an answer based on the results obtained so far."
+                    "content": f"{limit_message} Please provide an answer based on the results obtained so far."
                 })
-                response = llm_call_fn(model=model, messages=messages, tools=tools)
+                response = session.call_llm(llm_call_fn, model, messages, tools, final=True)
                 continue
 
-            # Lista para armazenar ferramentas assíncronas quando use_async_poll=True
-            async_poll_list = []
-            tools_results = []
-            
-            for tool_call in response.message.tool_calls:
-                tool_name = tool_call.function.name
-                try:
-                    tool_args = tool_call.function.arguments
-                    if verbose and not use_async_poll:
-                        print(f"[TOOL] Executing: {tool_name}, Args: {tool_args}")
-                    
-                    start_time = time.time() if verbose_time else None
-                    
-                    if tool_name in async_tools_name:
-                        if use_async_poll:
-                            # Armazena para execução em paralelo
-                            async_poll_list.append({
-                                "tool_name": tool_name,
-                                "args": tool_args
-                            })
-                            if verbose:
-                                print(f"[TOOL] Adding {tool_name} to async_poll_list")
-                            continue
-                        else:
-                            # Executa individualmente
-                            tool_result = asyncio.run(available_tools[tool_name](**tool_args))
-                    else:
-                        # Executa ferramenta síncrona
-                        tool_result = available_tools[tool_name](**tool_args)
-
-                    if verbose_time and not use_async_poll:
-                        end_time = time.time()
-                        print(f"[TOOL] Execution time: {end_time - start_time} seconds")
-
-                    if verbose and not use_async_poll:
-                        print(f"[TOOL] Result: {tool_result}")
-
-                    tools_results.append({
-                        "role": "tool", 
-                        "content": str(tool_result), 
-                        "name": tool_name
-                    })
-
-                except Exception as e:
-                    tool_result = f"Error executing tool '{tool_name}': {e}"
-
-                    if verbose:
-                        print(f"[ERROR] {tool_result}")
+            tool_results = session.run_tool_calls(response.message.tool_calls)
 
-                    tools_results.append({
-                        "role": "tool", 
-                        "content": str(tool_result), 
-                        "name": tool_name
-                    })
-            
-            # Executa ferramentas assíncronas em paralelo se use_async_poll=True
-            if use_async_poll and async_poll_list:
-                if verbose:
-                    print(f"[PROCESS] Executing {len(async_poll_list)} async tools in parallel")
-                
-                async_results = asyncio.run(_poll_fuction_async(
-                    avaliable_tools=available_tools, 
-                    list_tasks=async_poll_list, 
-                    framework=framework
-                ))
-                tools_results.extend(async_results)
-
-            messages.append(response.message)
-            messages.extend(tools_results)
-            response = llm_call_fn(model=model, messages=messages, tools=tools)
+            messages.append(session.assistant_message(response.message))
+            messages.extend(tool_results)
+            messages.extend(session.finished_job_messages())
+            messages.extend(session.repeat_messages())
+            response = session.call_llm(llm_call_fn, model, messages, tools)
 
+@_accepts_conversation_log
 async def process_tool_calls_async(
     response: Any, 
     messages: List[Dict[str, Any]], 
@@ -350,7 +1393,30 @@ async def process_tool_calls_async(
     verbose_time: Optional[bool] = False,
     clean_messages: Optional[bool] = False,
     use_async_poll: Optional[bool] = False,
-    max_chained_calls: Optional[int] = 5
+    max_chained_calls: Optional[int] = 5,
+    on_tool_chunk: Optional[Callable] = None,
+    stream_max_chars: Optional[int] = None,
+    stream_timeout: Optional[float] = None,
+    wait_deferred_jobs: Optional[bool] = True,
+    schedule_tool_calls: Optional[bool] = False,
+    priority: Optional[float] = 0,
+    context_budget: Optional[ContextBudget] = None,
+    dedupe_tool_results: Optional[bool] = False,
+    intern_tool_results: Optional[bool] = False,
+    compact_messages: Optional[bool] = False,
+    checkpoint_store: Optional[Any] = None,
+    run_id: Optional[str] = None,
+    stable_prefix: Optional[bool] = False,
+    tool_executor: Optional[Executor] = None,
+    llm_retry: Optional[RetryPolicy] = None,
+    max_wall_time: Optional[float] = None,
+    max_total_tokens: Optional[int] = None,
+    max_tool_calls: Optional[int] = None,
+    final_answer_mode: Optional[str] = None,
+    reuse_repeated_results: Optional[bool] = False,
+    repeat_threshold: Optional[int] = None,
+    repeat_action: Optional[str] = "warn",
+    llm_hedge_delay: Optional[float] = 0
     ) -> List[Dict[str, Any]]:
     """
     Processa tool_calls de uma resposta de LLM, executando as ferramentas necessárias e atualizando as mensagens.
@@ -361,146 +1427,162 @@ async def process_tool_calls_async(
 
     Args:
         response: resposta inicial do modelo
-        messages: lista de mensagens do chat
+        messages: lista de mensagens do chat (alterada no lugar) ou um ConversationLog imutável
         tool_caller: instância da classe ToolCaller
         model: nome do modelo
-        llm_call_fn: função que faz a chamada ao modelo (ex: lambda model, messages, tools: ...), como esta na descrição do exemplo
+        llm_call_fn: função que faz a chamada ao modelo (ex: lambda model, messages, tools: ...), como esta na descrição do exemplo.
+            Também aceita uma lista de funções (réplicas ou modelo primário + fallback), executadas com HedgedLLMCall
         verbose: se True, exibe logs detalhados
         verbose_time: se True, exibe logs de tempo
         clean_messages: se True, limpa as mensagens após o processamento
         max_chained_calls: número máximo de chamadas encadeadas permitidas
+        on_tool_chunk: callback on_tool_chunk(tool_name, chunk) (sync ou async) chamado a cada chunk de ferramentas async generator
+        stream_max_chars: limite de caracteres consumidos de ferramentas async generator
+        stream_timeout: limite de tempo (segundos) para consumir ferramentas async generator
+        wait_deferred_jobs: se True, aguarda os jobs de ferramentas deferred_tool iniciados na sessão antes de encerrar
+        schedule_tool_calls: se True, executa em paralelo as chamadas de um turno que não conflitam (ver ToolCaller.set_tool_resources)
+        priority: prioridade das ferramentas desta sessão no PriorityScheduler do ToolCaller (maior = atendida antes)
+        context_budget: ContextBudget que limita os tokens do histórico enviado a cada chamada ao LLM
+        dedupe_tool_results: se True, resultados de ferramentas repetidos são enviados como referência ao primeiro
+        intern_tool_results: se True, resultados de ferramentas iguais da conversa compartilham uma única string na memória
+        compact_messages: se True, as mensagens adicionadas ao histórico são CompactMessage (__slots__), convertidas em dicts só na chamada ao LLM
+        checkpoint_store: FileCheckpointStore ou SQLiteCheckpointStore onde o estado é gravado antes de cada chamada ao LLM
+        run_id: identificador da execução no checkpoint_store; se já existir um checkpoint, a execução continua a partir dele
+        stable_prefix: se True, verifica que cada requisição ao LLM apenas acrescenta mensagens à anterior (não combina com context_budget e dedupe_tool_results)
+        tool_executor: executor (ex: ThreadPoolExecutor) onde as ferramentas síncronas rodam, sem bloquear o event loop
+        llm_retry: RetryPolicy com timeout, novas tentativas com backoff e orçamento de tempo de cada chamada ao LLM
+        max_wall_time: tempo máximo (segundos) do processamento; ao ser atingido, o modelo é chamado uma última vez para responder
+        max_total_tokens: total de tokens (usage das respostas) a partir do qual o modelo é chamado uma última vez para responder
+        max_tool_calls: número máximo de execuções de ferramentas; um turno que o excederia não é executado e o modelo responde
+        final_answer_mode: como impedir novas ferramentas na chamada final: "drop_tools" (tools=[]), "tool_choice" (tool_choice="none") ou None (apenas a mensagem de sistema)
+        reuse_repeated_results: se True, uma chamada repetida (mesma ferramenta e argumentos) reutiliza o resultado anterior da conversa sem executar a ferramenta
+        repeat_threshold: número de vezes que a mesma chamada pode se repetir antes de repeat_action ser aplicada
+        repeat_action: "warn" (mensagem de sistema corretiva) ou "stop" (o modelo é chamado uma última vez para responder)
+        llm_hedge_delay: quando llm_call_fn é uma lista, espera (segundos) antes de iniciar cada função seguinte (0 = todas de uma vez)
     Returns:
-        Última resposta do modelo após processar todos os tool_calls
+        Última resposta do modelo após processar todos os tool_calls; com um ConversationLog em messages,
+        a tupla (resposta, log estendido com as novas mensagens)
     """
+    if isinstance(llm_call_fn, (list, tuple)):
+        llm_call_fn = HedgedLLMCall(llm_call_fn, delay=llm_hedge_delay)
+
     tools = tool_caller.get_tools()
     framework = tool_caller.get_framework()
-    available_tools = tool_caller.get_map_tools()
-    async_tools_name = tool_caller.get_name_async_tools()
+    session = _ToolSession(
+        tool_caller,
+        verbose=verbose,
+        verbose_time=verbose_time,
+        use_async_poll=use_async_poll,
+        on_tool_chunk=on_tool_chunk,
+        stream_max_chars=stream_max_chars,
+        stream_timeout=stream_timeout,
+        schedule_tool_calls=schedule_tool_calls,
+        priority=priority,
+        context_budget=context_budget,
+        dedupe_tool_results=dedupe_tool_results,
+        intern_tool_results=intern_tool_results,
+        compact_messages=compact_messages,
+        checkpoint_store=checkpoint_store,
+        run_id=run_id,
+        stable_prefix=stable_prefix,
+        tool_executor=tool_executor,
+        llm_retry=llm_retry,
+        max_wall_time=max_wall_time,
+        max_total_tokens=max_total_tokens,
+        max_tool_calls=max_tool_calls,
+        final_answer_mode=final_answer_mode,
+        reuse_repeated_results=reuse_repeated_results,
+        repeat_threshold=repeat_threshold,
+        repeat_action=repeat_action
+    )
 
     start_time_process = time.time() if verbose_time else None
-    chain_count = 0
-
-    if use_async_poll:
-        async_poll_list = []
+    if session.resume(messages):
+        response = await session.call_llm_async(llm_call_fn, model, messages, tools)
+    else:
+        session.record_usage(response)
 
     if verbose:
         print(f"[PROCESS] Framework: {framework}\n")
 
     if framework == "openai":
         while True:
-            if not hasattr(response.choices[0].message, 'tool_calls') or not response.choices[0].message.tool_calls:
+            if session.finalizing or not hasattr(response.choices[0].message, 'tool_calls') or not response.choices[0].message.tool_calls:
+                if session.pending_jobs and wait_deferred_jobs:
+                    # Aguarda os jobs em segundo plano e devolve os resultados ao modelo
+                    if verbose:
+                        print(f"[JOB] Waiting for {len(session.pending_jobs)} background jobs")
+                    messages.append(session.assistant_message(response.choices[0].message))
+                    await session.wait_jobs_async()
+                    messages.extend(session.finished_job_messages())
+                    # Depois de um limite, a resposta continua sendo a final (sem ferramentas)
+                    response = await session.call_llm_async(llm_call_fn, model, messages, tools, final=session.finalizing)
+                    continue
+
                 if verbose:
                     print("[LLM] No tool_calls detected. Processing completed.")
-                    if chain_count > 0:
-                        print(f"[INFO] Total chained calls: {chain_count}")
+                    if session.chain_count > 0:
+                        print(f"[INFO] Total chained calls: {session.chain_count}")
                 
                 if verbose_time:
                     end_time_process = time.time()
                     print(f"[PROCESS] Total execution time: {end_time_process - start_time_process} seconds")
                 
+                session.complete()
+
                 if clean_messages:
                     response = response.choices[0].message.content
                 return response
-
+                
             if verbose:
                 print(f"[LLM] Tool_calls detected: {response.choices[0].message.tool_calls}\n")
-            messages.append({"role": "assistant", "content": response.choices[0].message.content})
+            messages.append(session.assistant_message(response.choices[0].message))
             
             # Incrementa o contador de chamadas encadeadas
-            chain_count += 1
-            if chain_count > max_chained_calls:
+            session.chain_count += 1
+            limit_message = session.limit_message(max_chained_calls, response.choices[0].message.tool_calls)
+            if limit_message:
                 if verbose:
-                    print(f"[WARNING] Maximum number of chained calls reached: {max_chained_calls}\n")
+                    print(f"[WARNING] {limit_message}")
                 messages.append({
                     "role": "system",
-                    "content": f"The maximum number of chained calls ({max_chained_calls}) has been reached. Please provide an answer based on the results obtained so far."
+                    "content": f"{limit_message} Please provide an answer based on the results obtained so far."
                 })
-                response = await llm_call_fn(model=model, messages=messages, tools=tools)
+                response = await session.call_llm_async(llm_call_fn, model, messages, tools, final=True)
                 continue
-
-            tool_results = []
-            for tool_call in response.choices[0].message.tool_calls:
-                tool_name = tool_call.function.name
-                try:
-                    tool_args = json.loads(tool_call.function.arguments)
-                    if verbose and not use_async_poll:
-                        print(f"[TOOL] Executing: {tool_name}, Args: {tool_args}")
-                    
-                    start_time = time.time() if verbose_time else None
-                    
-                    if tool_name in async_tools_name:
-                        if use_async_poll:
-                            # Armazena para execução em paralelo
-                            async_poll_list.append({
-                                "tool_id": tool_call.id,
-                                "tool_name": tool_name,
-                                "args": tool_args
-                            })
-                            if verbose:
-                                print(f"[TOOL] Adding {tool_name} to async_poll_list")
-                            continue
-                        else:
-                            # Executa individualmente
-                            tool_result = await available_tools[tool_name](**tool_args)
-                    else:
-                        # Executa ferramenta síncrona
-                        tool_result = available_tools[tool_name](**tool_args)
-
-                    if verbose_time and not use_async_poll:
-                        end_time = time.time()
-                        print(f"[TOOL] Execution time: {end_time - start_time} seconds")
-
-                    if verbose and not use_async_poll:
-                        print(f"[TOOL] Result: {tool_result}")
-
-                    tool_results.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "name": tool_name,
-                        "content": json.dumps(tool_result),
-                    })
-
-                except Exception as e:
-                    tool_result = f"Error executing tool '{tool_name}': {e}"
-
-                    if verbose:
-                        print(f"[ERROR] {tool_result}")
-
-                    tool_results.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "name": tool_name,
-                        "content": json.dumps(tool_result),
-                    })
+            
+            tool_results = await session.run_tool_calls_async(response.choices[0].message.tool_calls)
 
             messages.extend(tool_results)
-            
-            # Executa ferramentas assíncronas em paralelo se use_async_poll=True
-            if use_async_poll and async_poll_list:
-                if verbose:
-                    print(f"[PROCESS] Executing {len(async_poll_list)} async tools in parallel")
-                
-                async_results = await _poll_fuction_async(
-                    avaliable_tools=available_tools, 
-                    list_tasks=async_poll_list, 
-                    framework=framework
-                )
-                messages.extend(async_results)
-            
-            response = await llm_call_fn(model=model, messages=messages, tools=tools)
+            messages.extend(session.finished_job_messages())
+            messages.extend(session.repeat_messages())
+            response = await session.call_llm_async(llm_call_fn, model, messages, tools)
 
     elif framework == "ollama":
         while True:
-            if not response.message.tool_calls:
+            if session.finalizing or not response.message.tool_calls:
+                if session.pending_jobs and wait_deferred_jobs:
+                    # Aguarda os jobs em segundo plano e devolve os resultados ao modelo
+                    if verbose:
+                        print(f"[JOB] Waiting for {len(session.pending_jobs)} background jobs")
+                    messages.append(session.assistant_message(response.message))
+                    await session.wait_jobs_async()
+                    messages.extend(session.finished_job_messages())
+                    # Depois de um limite, a resposta continua sendo a final (sem ferramentas)
+                    response = await session.call_llm_async(llm_call_fn, model, messages, tools, final=session.finalizing)
+                    continue
+
                 if verbose:
                     print("[LLM] No tool_calls detected. Processing completed.")
-                    if chain_count > 0:
-                        print(f"[INFO] Total chained calls: {chain_count}")
+                    if session.chain_count > 0:
+                        print(f"[INFO] Total chained calls: {session.chain_count}")
                 
                 if verbose_time:
                     end_time_process = time.time()
                     print(f"[PROCESS] Total execution time: {end_time_process - start_time_process} seconds")
                 
+                session.complete()
+
                 if clean_messages:
                     return response.message.content
                 
@@ -510,84 +1592,183 @@ async def process_tool_calls_async(
                 print(f"[LLM] Tool_calls detected: {response.message.tool_calls}")
             
             # Incrementa o contador de chamadas encadeadas
-            chain_count += 1
-            if chain_count > max_chained_calls:
+            session.chain_count += 1
+            limit_message = session.limit_message(max_chained_calls, response.message.tool_calls)
+            if limit_message:
                 if verbose:
-                    print(f"[WARNING] Maximum number of chained calls reached: {max_chained_calls}")
+                    print(f"[WARNING] {limit_message}")
                 messages.append({
                     "role": "system",
-                    "content": f"The maximum number of chained calls ({max_chained_calls}) has been reached. Please provide an answer based on the results obtained so far."
+                    "content": f"{limit_message} Please provide an answer based on the results obtained so far."
                 })
-                response = await llm_call_fn(model=model, messages=messages, tools=tools)
+                response = await session.call_llm_async(llm_call_fn, model, messages, tools, final=True)
                 continue
 
-            # Lista para armazenar ferramentas assíncronas quando use_async_poll=True
-            async_poll_list = []
-            tool_results = []
-            
-            for tool_call in response.message.tool_calls:
-                tool_name = tool_call.function.name
-                try:
-                    tool_args = tool_call.function.arguments
-                    if verbose and not use_async_poll:
-                        print(f"[TOOL] Executing: {tool_name}, Args: {tool_args}")
-                    
-                    start_time = time.time() if verbose_time else None
-                    
-                    if tool_name in async_tools_name:
-                        if use_async_poll:
-                            # Armazena para execução em paralelo
-                            async_poll_list.append({
-                                "tool_name": tool_name,
-                                "args": tool_args
-                            })
-                            if verbose:
-                                print(f"[TOOL] Adding {tool_name} to async_poll_list")
-                            continue
-                        else:
-                            # Executa individualmente
-                            tool_result = await available_tools[tool_name](**tool_args)
-                    else:
-                        # Executa ferramenta síncrona
-                        tool_result = available_tools[tool_name](**tool_args)
-
-                    if verbose_time and not use_async_poll:
-                        end_time = time.time()
-                        print(f"[TOOL] Execution time: {end_time - start_time} seconds")
-
-                    if verbose and not use_async_poll:
-                        print(f"[TOOL] Result: {tool_result}")
-
-                    tool_results.append({
-                        "role": "tool", 
-                        "content": str(tool_result), 
-                        "name": tool_name
-                    })
+            tool_results = await session.run_tool_calls_async(response.message.tool_calls)
 
-                except Exception as e:
-                    tool_result = f"Error executing tool '{tool_name}': {e}"
+            messages.append(session.assistant_message(response.message))
+            messages.extend(tool_results)
+            messages.extend(session.finished_job_messages())
+            messages.extend(session.repeat_messages())
+            response = await session.call_llm_async(llm_call_fn, model, messages, tools)
 
-                    if verbose:
-                        print(f"[ERROR] {tool_result}")
 
-                    tool_results.append({
-                        "role": "tool", 
-                        "content": str(tool_result), 
-                        "name": tool_name
-                    })
-            
-            # Executa ferramentas assíncronas em paralelo se use_async_poll=True
-            if use_async_poll and async_poll_list:
-                if verbose:
-                    print(f"[PROCESS] Executing {len(async_poll_list)} async tools in parallel")
-                
-                async_results = await _poll_fuction_async(
-                    avaliable_tools=available_tools, 
-                    list_tasks=async_poll_list, 
-                    framework=framework
-                )
-                tool_results.extend(async_results)
+def resume_tool_calls(
+    run_id: str,
+    checkpoint_store: Any,
+    tool_caller: ToolCaller,
+    model: str,
+    llm_call_fn: Callable,
+    **kwargs
+) -> Any:
+    """
+    Retoma uma execução de process_tool_calls a partir do último checkpoint de run_id: as mensagens
+    (com os resultados das ferramentas já executadas), o contador de chamadas encadeadas e os
+    orçamentos, repetições, resultados reutilizáveis e jobs pendentes da sessão são
+    restaurados e o loop continua com uma nova chamada ao LLM, sem executar de novo as ferramentas.
 
-            messages.append(response.message)
-            messages.extend(tool_results)
-            response = await llm_call_fn(model=model, messages=messages, tools=tools)
+    EXEMPLO:
+
+    store = SQLiteCheckpointStore("checkpoints.db")
+    try:
+        final_response = process_tool_calls(..., checkpoint_store=store, run_id="pedido-42")
+    except Exception:
+        final_response = resume_tool_calls("pedido-42", store, manager, model, llm_call_fn)
+
+    Args:
+        run_id: identificador da execução
+        checkpoint_store: FileCheckpointStore ou SQLiteCheckpointStore usado na execução original
+        tool_caller: instância de ToolCaller com as ferramentas
+        model: modelo a ser usado
+        llm_call_fn: função para chamar o LLM
+        **kwargs: demais parâmetros de process_tool_calls
+    Returns:
+        Última resposta do modelo, como em process_tool_calls
+    """
+    if checkpoint_store.load(run_id) is None:
+        raise ValueError(f"No checkpoint found for run '{run_id}'")
+    return process_tool_calls(
+        None, [], tool_caller, model, llm_call_fn,
+        checkpoint_store=checkpoint_store, run_id=run_id, **kwargs
+    )
+
+
+async def resume_tool_calls_async(
+    run_id: str,
+    checkpoint_store: Any,
+    tool_caller: ToolCaller,
+    model: str,
+    llm_call_fn: Callable,
+    **kwargs
+) -> Any:
+    """
+    Versão assíncrona de resume_tool_calls (usa process_tool_calls_async).
+    """
+    if checkpoint_store.load(run_id) is None:
+        raise ValueError(f"No checkpoint found for run '{run_id}'")
+    return await process_tool_calls_async(
+        None, [], tool_caller, model, llm_call_fn,
+        checkpoint_store=checkpoint_store, run_id=run_id, **kwargs
+    )
+
+
+async def process_tool_calls_batch(
+    items: Iterable[Any],
+    tool_caller: ToolCaller,
+    model: str,
+    llm_call_fn: Callable,
+    max_concurrency: int = 16,
+    tool_workers: Optional[int] = None,
+    return_exceptions: bool = True,
+    **kwargs
+) -> AsyncIterator[tuple]:
+    """
+    Processa muitas conversas ao mesmo tempo em um único event loop, com no máximo max_concurrency
+    conversas em andamento. Os resultados são entregues à medida que cada conversa termina (não na
+    ordem de entrada), com o índice do item correspondente.
+
+    As conversas compartilham o ToolCaller (e seus caches e limites), o llm_call_fn (ex: um
+    CachedLLMCall) e um único pool de threads para as ferramentas síncronas. Os itens são
+    consumidos sob demanda, então items pode ser um gerador com dezenas de milhares de conversas.
+
+    EXEMPLO:
+
+    prompts = ["Quanto é 2 + 2?", "Qual a capital da França?"]
+    async for index, final_response in process_tool_calls_batch(prompts, manager, model, llm_call_fn, clean_messages=True):
+        print(index, final_response)
+
+    Args:
+        items: conversas: tuplas (response, messages) já iniciadas, listas de mensagens ou prompts (str);
+            para listas e prompts, a primeira chamada ao LLM é feita aqui
+        tool_caller: instância de ToolCaller com as ferramentas
+        model: modelo a ser usado
+        llm_call_fn: função assíncrona para chamar o LLM, ou uma lista delas (executadas com HedgedLLMCall)
+        max_concurrency: número máximo de conversas processadas ao mesmo tempo
+        tool_workers: número de threads do pool das ferramentas síncronas (padrão do ThreadPoolExecutor);
+            ignorado quando tool_executor é passado
+        return_exceptions: se True, o erro de uma conversa é entregue como resultado; se False, é levantado
+        **kwargs: demais parâmetros de process_tool_calls_async; um tool_executor passado aqui é usado
+            por todas as conversas no lugar do pool criado pelo lote (e não é encerrado ao final)
+    Returns:
+        Iterador assíncrono de tuplas (índice do item, resposta final ou exceção)
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be greater than or equal to 1")
+
+    # A primeira chamada de listas e prompts também usa o hedging e o llm_retry da sessão
+    if isinstance(llm_call_fn, (list, tuple)):
+        llm_call_fn = HedgedLLMCall(llm_call_fn, delay=kwargs.get("llm_hedge_delay", 0))
+    llm_retry = kwargs.get("llm_retry")
+
+    tools = tool_caller.get_tools()
+    pending_items = enumerate(items)
+    finished = asyncio.Queue()
+    done = object()
+    executor = kwargs.pop("tool_executor", None)
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ThreadPoolExecutor(max_workers=tool_workers, thread_name_prefix="llm_tool_fusion_batch")
+
+    async def run_item(item: Any) -> Any:
+        if isinstance(item, tuple):
+            response, messages = item
+        else:
+            messages = [{"role": "user", "content": item}] if isinstance(item, str) else item
+            if llm_retry is None:
+                response = await llm_call_fn(model=model, messages=messages, tools=tools)
+            else:
+                response = await llm_retry.call_async(lambda: llm_call_fn(model=model, messages=messages, tools=tools))
+        return await process_tool_calls_async(
+            response, messages, tool_caller, model, llm_call_fn, tool_executor=executor, **kwargs
+        )
+
+    async def worker():
+        try:
+            # O iterador é compartilhado: cada worker pega o próximo item quando termina o anterior
+            for index, item in pending_items:
+                try:
+                    result = await run_item(item)
+                except Exception as e:
+                    result = e
+                await finished.put((index, result))
+        finally:
+            finished.put_nowait(done)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max_concurrency)]
+    running = len(workers)
+    try:
+        while running:
+            entry = await finished.get()
+            if entry is done:
+                running -= 1
+                continue
+            index, result = entry
+            if isinstance(result, Exception) and not return_exceptions:
+                raise result
+            yield index, result
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if owns_executor:
+            executor.shutdown(wait=False)
@@ -0,0 +1,117 @@
+import asyncio
+from collections import deque
+from typing import Callable, Any, Dict, Optional, Awaitable
+
+
+class LatencyStats:
+    """
+    Latências observadas de uma ferramenta (janela das últimas execuções).
+
+    Args:
+        window: número de execuções mantidas para o cálculo dos percentis
+    """
+
+    def __init__(self, window: int = 256):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record(self, seconds: float, error: bool = False):
+        self._samples.append(seconds)
+        self.count += 1
+        if error:
+            self.errors += 1
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(int(round(percentile / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean": sum(self._samples) / len(self._samples) if self._samples else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+class HedgingPolicy:
+    """
+    Política de hedging de uma ferramenta assíncrona: se a chamada não terminar até o percentil
+    configurado da latência observada, uma segunda chamada (ou a função fallback) é iniciada e a
+    primeira a terminar com sucesso vence; a outra é cancelada.
+
+    Args:
+        percentile: percentil da latência observada usado como espera antes do hedge
+        fallback: implementação alternativa (mesmos argumentos) usada no hedge; None repete a chamada
+        min_samples: número mínimo de execuções observadas antes de usar o percentil
+        initial_delay: espera (segundos) usada enquanto não há amostras suficientes (None = sem hedge)
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        fallback: Optional[Callable] = None,
+        min_samples: int = 20,
+        initial_delay: Optional[float] = None
+    ):
+        if not 0 < percentile <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        self.percentile = percentile
+        self.fallback = fallback
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+
+    def delay(self, stats: Optional[LatencyStats]) -> Optional[float]:
+        if stats is None or len(stats) < self.min_samples:
+            return self.initial_delay
+        return stats.percentile(self.percentile)
+
+
+async def _run_hedged(
+    primary: Callable[[], Awaitable],
+    secondary: Callable[[], Awaitable],
+    delay: float,
+    stats: Optional[LatencyStats] = None
+    ) -> Any:
+    """
+    Executa primary e, se não terminar em delay segundos, também secondary. Retorna o primeiro
+    resultado bem-sucedido e cancela a chamada perdedora. Se ambas falharem, levanta o erro da primária.
+    """
+    first = asyncio.ensure_future(primary())
+    pending = {first}
+
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return first.result()
+
+        if stats is not None:
+            stats.hedges += 1
+        second = asyncio.ensure_future(secondary())
+        pending = {first, second}
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Em caso de empate a chamada primária tem preferência
+            for task in sorted(done, key=lambda task: task is not first):
+                if task.exception() is None:
+                    if task is second and stats is not None:
+                        stats.hedge_wins += 1
+                    return task.result()
+        return first.result()
+    finally:
+        for task in pending:
+            task.cancel()
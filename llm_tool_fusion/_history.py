@@ -0,0 +1,299 @@
+import inspect
+import sys
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from functools import wraps
+from typing import Callable, Any, Dict, Iterable, Iterator, List, Optional
+
+
+class ContentInterner:
+    """
+    Compartilha um único objeto str entre conteúdos de ferramentas iguais: quando uma ferramenta
+    produz de novo a mesma saída grande (ex: um dump de configuração), a mensagem reutiliza a string
+    já existente em vez de manter outra cópia na memória.
+
+    A busca usa o hash do conteúdo (calculado uma vez por string); são mantidos os conteúdos usados
+    mais recentemente, até max_entries conteúdos e max_chars caracteres no total. Conteúdos maiores
+    que max_chars não são guardados.
+
+    Args:
+        max_entries: número máximo de conteúdos mantidos (LRU)
+        min_chars: tamanho mínimo para um conteúdo ser compartilhado
+        max_chars: total máximo de caracteres dos conteúdos mantidos
+    """
+
+    def __init__(self, max_entries: int = 1024, min_chars: int = 256, max_chars: int = 4_000_000):
+        self._max_entries = max_entries
+        self._min_chars = min_chars
+        self._max_chars = max_chars
+        self._strings = OrderedDict()
+        self._chars = 0
+        self.hits = 0
+
+    def intern(self, content: Any) -> Any:
+        if not isinstance(content, str) or len(content) < self._min_chars:
+            return content
+        existing = self._strings.get(content)
+        if existing is not None:
+            self._strings.move_to_end(content)
+            self.hits += 1
+            return existing
+        if len(content) > self._max_chars:
+            return content
+        self._strings[content] = content
+        self._chars += len(content)
+        while len(self._strings) > self._max_entries or self._chars > self._max_chars:
+            evicted, _ = self._strings.popitem(last=False)
+            self._chars -= len(evicted)
+        return content
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"entries": len(self._strings), "chars": self._chars, "hits": self.hits}
+
+
+def _dedupe_tool_results(messages: List[Any], min_chars: int = 256) -> List[Any]:
+    """
+    Troca os resultados de ferramentas repetidos por uma referência ao primeiro resultado igual.
+    Retorna a própria lista quando não há repetições.
+    """
+    first_seen = {}
+    deduped = None
+    for i, message in enumerate(messages):
+        if not isinstance(message, dict) or message.get("role") != "tool":
+            continue
+        content = message.get("content")
+        if not isinstance(content, str) or len(content) < min_chars:
+            continue
+
+        reference = first_seen.get(content)
+        if reference is None:
+            first_seen[content] = message.get("tool_call_id") or message.get("name")
+            continue
+
+        if deduped is None:
+            deduped = list(messages)
+        if message.get("tool_call_id"):
+            notice = f"[Same result as tool_call '{reference}']"
+        else:
+            notice = f"[Same result as the earlier '{reference}' call]"
+        deduped[i] = {**message, "content": notice}
+
+    return deduped if deduped is not None else messages
+
+
+class CompactMessage(Mapping):
+    """
+    Mensagem do histórico com __slots__ (sem __dict__ por instância), usada com compact_messages=True.
+
+    Guarda apenas os campos que os provedores usam, com papel e nome internados (sys.intern), e é
+    convertida em dict somente na chamada ao llm_call_fn. Funciona como um Mapping somente leitura:
+    message["content"], message.get("name"), dict(message) e comparação com dicts continuam valendo.
+    """
+
+    __slots__ = ("role", "content", "name", "tool_call_id", "tool_calls")
+    _fields = ("role", "tool_call_id", "name", "content", "tool_calls")
+
+    def __init__(
+        self,
+        role: str,
+        content: Any = None,
+        name: Optional[str] = None,
+        tool_call_id: Optional[str] = None,
+        tool_calls: Optional[list] = None
+    ):
+        self.role = sys.intern(role)
+        self.content = content
+        self.name = sys.intern(name) if isinstance(name, str) else name
+        self.tool_call_id = tool_call_id
+        self.tool_calls = tool_calls
+
+    @classmethod
+    def from_dict(cls, message: Dict[str, Any]) -> "CompactMessage":
+        return cls(
+            message["role"],
+            message.get("content"),
+            name=message.get("name"),
+            tool_call_id=message.get("tool_call_id"),
+            tool_calls=message.get("tool_calls")
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._fields:
+            raise KeyError(key)
+        value = getattr(self, key)
+        # Campos ausentes não existem no dict do provedor
+        if value is None and key != "content":
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        for field in self._fields:
+            if field == "content" or getattr(self, field) is not None:
+                yield field
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self}
+
+    def __repr__(self) -> str:
+        return f"CompactMessage({self.to_dict()!r})"
+
+
+def _compact_tool_call(tool_call: Any) -> Dict[str, Any]:
+    compact = {}
+    for field in ("id", "type"):
+        value = getattr(tool_call, field, None)
+        if value is not None:
+            compact[field] = value
+    compact["function"] = {"name": tool_call.function.name, "arguments": tool_call.function.arguments}
+    return compact
+
+
+def _compact_assistant_message(message: Any) -> CompactMessage:
+    """
+    Copia de uma mensagem do provedor (ex: response.message do Ollama) apenas o conteúdo e as
+    chamadas de ferramentas, sem manter o objeto original vivo no histórico. O id e o type das
+    chamadas do OpenAI são mantidos, para o tool_call_id das mensagens 'tool' continuar válido.
+    """
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        tool_calls = [_compact_tool_call(tool_call) for tool_call in tool_calls]
+    return CompactMessage("assistant", getattr(message, "content", None), tool_calls=tool_calls or None)
+
+
+def _materialize(messages: List[Any]) -> List[Any]:
+    """
+    Converte as CompactMessage em dicts do provedor. Retorna a própria lista quando não há nenhuma.
+    """
+    if not any(isinstance(message, CompactMessage) for message in messages):
+        return messages
+    return [message.to_dict() if isinstance(message, CompactMessage) else message for message in messages]
+
+
+class ConversationLog(Sequence):
+    """
+    Histórico de mensagens imutável com compartilhamento estrutural: cada versão guarda apenas as
+    mensagens que acrescentou e uma referência à versão anterior. Criar ramos de uma conversa
+    (best-of-n, novas tentativas) custa O(1) memória, sem copiar as mensagens já existentes.
+
+    process_tool_calls e process_tool_calls_async aceitam um ConversationLog em messages; nesse caso
+    retornam (resposta, log_estendido) e o log recebido não é alterado.
+
+    EXEMPLO:
+
+    base = ConversationLog([{"role": "user", "content": "..."}])
+    branches = [process_tool_calls(response, base, ...) for response in candidates]
+    final_response, log = branches[0]
+
+    Args:
+        messages: mensagens iniciais
+    """
+
+    __slots__ = ("_parent", "_segment", "_length")
+
+    def __init__(self, messages: Iterable[Any] = ()):
+        self._parent = None
+        self._segment = tuple(messages)
+        self._length = len(self._segment)
+
+    @classmethod
+    def _child(cls, parent: "ConversationLog", segment: tuple) -> "ConversationLog":
+        log = cls.__new__(cls)
+        log._parent = parent
+        log._segment = segment
+        log._length = parent._length + len(segment)
+        return log
+
+    def append(self, message: Any) -> "ConversationLog":
+        """
+        Nova versão com message ao final (esta versão não muda).
+        """
+        return ConversationLog._child(self, (message,))
+
+    def extend(self, messages: Iterable[Any]) -> "ConversationLog":
+        """
+        Nova versão com messages ao final (esta versão não muda).
+        """
+        segment = tuple(messages)
+        if not segment:
+            return self
+        return ConversationLog._child(self, segment)
+
+    def _segments(self) -> List[tuple]:
+        segments = []
+        log = self
+        while log is not None:
+            segments.append(log._segment)
+            log = log._parent
+        segments.reverse()
+        return segments
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Any]:
+        for segment in self._segments():
+            yield from segment
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return self.to_list()[index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("ConversationLog index out of range")
+        # Percorre a partir do fim: os acessos mais comuns são às mensagens recentes
+        log = self
+        while index < log._length - len(log._segment):
+            log = log._parent
+        return log._segment[index - (log._length - len(log._segment))]
+
+    def to_list(self) -> List[Any]:
+        """
+        Lista (nova) com todas as mensagens, na ordem.
+        """
+        return [message for segment in self._segments() for message in segment]
+
+    def __repr__(self) -> str:
+        return f"ConversationLog({self._length} messages)"
+
+
+def _accepts_conversation_log(func: Callable) -> Callable:
+    """
+    Permite passar um ConversationLog em messages: a função trabalha em uma lista temporária e o
+    retorno vira (resposta, log estendido com as mensagens acrescentadas).
+    """
+    signature = inspect.signature(func)
+
+    def split(args: tuple, kwargs: dict) -> tuple:
+        bound = signature.bind(*args, **kwargs)
+        log = bound.arguments["messages"]
+        if not isinstance(log, ConversationLog):
+            return None, None, None
+        working = log.to_list()
+        bound.arguments["messages"] = working
+        return log, working, bound
+
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            log, working, bound = split(args, kwargs)
+            if log is None:
+                return await func(*args, **kwargs)
+            response = await func(*bound.args, **bound.kwargs)
+            return response, log.extend(working[len(log):])
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        log, working, bound = split(args, kwargs)
+        if log is None:
+            return func(*args, **kwargs)
+        response = func(*bound.args, **bound.kwargs)
+        return response, log.extend(working[len(log):])
+    return wrapper
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Any, Dict, List, Optional
+from ._utils import _run_async_tool
+
+
+class JobManager:
+    """
+    Executa ferramentas em segundo plano e guarda o resultado de cada execução sob um handle.
+
+    As ferramentas síncronas rodam diretamente nas threads do pool; as assíncronas rodam em um
+    event loop próprio dentro da thread, para sobreviver ao fim da sessão que as iniciou.
+
+    Args:
+        max_workers: número máximo de ferramentas executando em paralelo
+        max_finished_jobs: número máximo de jobs concluídos e já entregues mantidos para consulta; jobs
+            cujo resultado ainda não foi entregue (check_job ou mensagem de sistema) nunca são descartados
+    """
+
+    def __init__(self, max_workers: int = 4, max_finished_jobs: int = 1024):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm_tool_fusion_job")
+        self._max_finished_jobs = max_finished_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, tool_name: str, func: Callable, args: Dict[str, Any], is_async: bool = False) -> str:
+        if is_async:
+            future = self._executor.submit(lambda: asyncio.run(_run_async_tool(func, args, tool_name)))
+        else:
+            future = self._executor.submit(func, **args)
+
+        handle = f"job_{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._jobs[handle] = {
+                "tool_name": tool_name,
+                "future": future,
+                "started_at": time.time(),
+                "delivered": False
+            }
+            self._trim()
+        return handle
+
+    def _trim(self):
+        # Apenas resultados já entregues: uma sessão ainda pode estar aguardando os demais
+        finished = [handle for handle, job in self._jobs.items() if job["future"].done() and job["delivered"]]
+        for handle in finished[:max(len(finished) - self._max_finished_jobs, 0)]:
+            del self._jobs[handle]
+
+    def get(self, handle: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._jobs.get(handle)
+
+    def done(self, handle: str) -> bool:
+        job = self.get(handle)
+        return job is not None and job["future"].done()
+
+    def mark_delivered(self, handle: str):
+        job = self.get(handle)
+        if job is not None:
+            job["delivered"] = True
+
+    def result(self, handle: str) -> Any:
+        """
+        Resultado de um job concluído (a exceção da ferramenta é retornada, não levantada).
+        """
+        future = self.get(handle)["future"]
+        exception = future.exception()
+        return exception if exception is not None else future.result()
+
+    def wait(self, handles: List[str], timeout: Optional[float] = None):
+        futures = [job["future"] for job in map(self.get, handles) if job is not None]
+        wait(futures, timeout=timeout)
+
+    async def wait_async(self, handles: List[str]):
+        futures = [asyncio.wrap_future(job["future"]) for job in map(self.get, handles) if job is not None]
+        if futures:
+            await asyncio.wait(futures)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+def _make_check_job(job_manager: JobManager) -> Callable:
+    def check_job(handle: str) -> Any:
+        """
+        Checks the status of a background job started by a deferred tool.
+
+        Args:
+            handle (str): handle of the job, as informed when it was started
+        Returns:
+            The job result when it has finished, or its current status
+        """
+        job = job_manager.get(handle)
+        if job is None:
+            return f"Unknown job handle '{handle}'"
+
+        if not job["future"].done():
+            elapsed = time.time() - job["started_at"]
+            return f"Job '{handle}' ({job['tool_name']}) is still running ({elapsed:.1f} seconds elapsed)"
+
+        job_manager.mark_delivered(handle)
+        result = job_manager.result(handle)
+        if isinstance(result, Exception):
+            return f"Error executing tool '{job['tool_name']}': {result}"
+        return result
+
+    return check_job
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Any, Dict, Optional, Awaitable
+from ._scheduling import PriorityScheduler
+
+
+class AdaptiveLimit(PriorityScheduler):
+    """
+    Limite de concorrência adaptativo (AIMD) de uma ferramenta.
+
+    Enquanto a latência recente fica próxima da menor latência observada, o limite cresce
+    aditivamente (cerca de `increase` a cada `limit` execuções concluídas). Erros, timeouts ou uma
+    latência recente acima de latency_tolerance vezes a menor latência cortam o limite
+    multiplicativamente (uma vez por episódio de congestionamento).
+
+    EXEMPLO:
+
+    manager.set_concurrency_limit("search", AdaptiveLimit(initial_limit=4, max_limit=32, timeout=10))
+    print(manager.get_concurrency_limits())
+
+    Args:
+        initial_limit: limite inicial de execuções simultâneas
+        min_limit: menor limite permitido
+        max_limit: maior limite permitido
+        increase: incremento aditivo do limite a cada janela de execuções estável
+        decrease_factor: fator multiplicativo aplicado ao limite em caso de congestionamento
+        latency_tolerance: razão entre a latência recente e a menor latência que indica congestionamento
+        timeout: tempo máximo (segundos) de uma execução; ferramentas assíncronas são canceladas e as
+            síncronas que excederem o tempo contam como timeout
+        window: número de execuções usadas para calcular a menor latência
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        timeout: Optional[float] = None,
+        window: int = 100
+    ):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be between 0 and 1")
+        super().__init__(max_concurrency=initial_limit, aging_rate=0)
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._increase = increase
+        self._decrease_factor = decrease_factor
+        self._latency_tolerance = latency_tolerance
+        self.timeout = timeout
+        self._samples = deque(maxlen=window)
+        self._recent_latency = None
+        self._last_decrease = 0.0
+        self._errors = 0
+        self._timeouts = 0
+        self._decreases = 0
+
+    def record(self, latency: float, started_at: float, error: bool = False, timeout: bool = False):
+        """
+        Registra o resultado de uma execução e ajusta o limite.
+
+        Args:
+            latency: duração da execução (segundos)
+            started_at: instante (time.monotonic) em que a execução começou
+            error: se a execução falhou
+            timeout: se a execução excedeu o tempo limite
+        """
+        with self._lock:
+            if timeout:
+                self._timeouts += 1
+            elif error:
+                self._errors += 1
+            else:
+                self._samples.append(latency)
+                # Média móvel exponencial: reage a degradações sem cortar por uma única chamada lenta
+                self._recent_latency = latency if self._recent_latency is None else 0.8 * self._recent_latency + 0.2 * latency
+
+            congested = error or timeout or (
+                self._recent_latency is not None
+                and self._recent_latency > self._latency_tolerance * min(self._samples)
+            )
+            if congested:
+                # Execuções iniciadas antes do último corte já refletem aquele congestionamento
+                if started_at >= self._last_decrease:
+                    self._limit = max(self._min_limit, self._limit * self._decrease_factor)
+                    self._last_decrease = time.monotonic()
+                    self._decreases += 1
+            else:
+                self._limit = min(self._max_limit, self._limit + self._increase / self._limit)
+            self._set_max_concurrency_locked(int(self._limit))
+
+    def call(self, func: Callable[[], Any], priority: float = 0) -> Any:
+        """
+        Executa func() dentro do limite e registra latência, erros e timeouts.
+        """
+        with self.slot(priority):
+            started_at = time.monotonic()
+            error = False
+            try:
+                return func()
+            except Exception:
+                error = True
+                raise
+            finally:
+                latency = time.monotonic() - started_at
+                timed_out = self.timeout is not None and latency > self.timeout
+                self.record(latency, started_at, error=error and not timed_out, timeout=timed_out)
+
+    async def call_async(self, func: Callable[[], Awaitable], priority: float = 0) -> Any:
+        """
+        Versão assíncrona de call: aguarda await func() dentro do limite, cancelando-a após timeout.
+        """
+        async with self.slot_async(priority):
+            started_at = time.monotonic()
+            error = timed_out = cancelled = False
+            try:
+                if self.timeout is None:
+                    return await func()
+                return await asyncio.wait_for(func(), self.timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                raise
+            except asyncio.CancelledError:
+                # Cancelamentos (ex: perdedor de um hedge) não dizem nada sobre a saúde do backend
+                cancelled = True
+                raise
+            except Exception:
+                error = True
+                raise
+            finally:
+                if not cancelled:
+                    self.record(time.monotonic() - started_at, started_at, error=error, timeout=timed_out)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        with self._lock:
+            stats.update({
+                "limit": int(self._limit),
+                "min_latency": min(self._samples) if self._samples else None,
+                "recent_latency": self._recent_latency,
+                "errors": self._errors,
+                "timeouts": self._timeouts,
+                "decreases": self._decreases,
+            })
+        return stats
@@ -0,0 +1,300 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Any, Dict, List, Optional
+from ._checkpoint import _serializable_messages
+from ._utils import _tools_fingerprint
+
+
+class HedgedLLMCall:
+    """
+    Combina várias funções assíncronas de chamada ao LLM (réplicas, ou um modelo primário e um
+    fallback mais rápido) em uma única llm_call_fn. A primeira função é iniciada imediatamente e
+    cada uma das seguintes após `delay` segundos sem resposta; a primeira resposta bem-sucedida
+    vence e as demais chamadas são canceladas.
+
+    EXEMPLO:
+
+    llm_call_fn = HedgedLLMCall([primary_call, replica_call], delay=2.0, names=["primary", "replica"])
+    await process_tool_calls_async(..., llm_call_fn=llm_call_fn)
+    print(llm_call_fn.get_stats())
+
+    Args:
+        llm_call_fns: lista de funções async (model, messages, tools) -> resposta
+        delay: espera (segundos) antes de iniciar cada backend seguinte (0 = todos de uma vez)
+        names: nomes dos backends nas estatísticas (padrão: índice)
+        models: modelo usado por cada backend (None mantém o modelo recebido)
+    """
+
+    def __init__(
+        self,
+        llm_call_fns: List[Callable],
+        delay: float = 0,
+        names: Optional[List[str]] = None,
+        models: Optional[List[Optional[str]]] = None
+    ):
+        if not llm_call_fns:
+            raise ValueError("llm_call_fns must contain at least one function")
+        if names is not None and len(names) != len(llm_call_fns):
+            raise ValueError("names must have the same length as llm_call_fns")
+        if models is not None and len(models) != len(llm_call_fns):
+            raise ValueError("models must have the same length as llm_call_fns")
+
+        self._llm_call_fns = list(llm_call_fns)
+        self._delay = delay
+        self._names = list(names) if names is not None else [str(i) for i in range(len(llm_call_fns))]
+        self._models = list(models) if models is not None else [None] * len(llm_call_fns)
+        self._stats = {
+            name: {"calls": 0, "wins": 0, "errors": 0, "cancelled": 0, "latency_total": 0.0, "completed": 0}
+            for name in self._names
+        }
+
+    async def _call_backend(self, index: int, model: str, messages: Any, tools: Any, kwargs: Dict[str, Any]) -> Any:
+        stats = self._stats[self._names[index]]
+        stats["calls"] += 1
+        start_time = time.perf_counter()
+        try:
+            response = await self._llm_call_fns[index](
+                model=self._models[index] or model, messages=messages, tools=tools, **kwargs
+            )
+        except asyncio.CancelledError:
+            stats["cancelled"] += 1
+            raise
+        except Exception:
+            stats["errors"] += 1
+            raise
+        stats["completed"] += 1
+        stats["latency_total"] += time.perf_counter() - start_time
+        return response
+
+    async def __call__(self, model: str, messages: Any, tools: Any = None, **kwargs) -> Any:
+        tasks = []
+        first_error = None
+
+        try:
+            for index in range(len(self._llm_call_fns)):
+                tasks.append(asyncio.ensure_future(self._call_backend(index, model, messages, tools, kwargs)))
+                is_last = index == len(self._llm_call_fns) - 1
+                if is_last:
+                    break
+
+                # Espera a próxima janela de hedge; se algum backend responder antes, usa a resposta
+                deadline = time.monotonic() + self._delay
+                while True:
+                    pending = [task for task in tasks if not task.done()]
+                    remaining = deadline - time.monotonic()
+                    if not pending or remaining <= 0:
+                        break
+                    await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                    winner, first_error = self._pick_winner(tasks, first_error)
+                    if winner is not None:
+                        return winner
+
+                winner, first_error = self._pick_winner(tasks, first_error)
+                if winner is not None:
+                    return winner
+
+            while True:
+                winner, first_error = self._pick_winner(tasks, first_error)
+                if winner is not None:
+                    return winner
+                pending = [task for task in tasks if not task.done()]
+                if not pending:
+                    raise first_error
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _pick_winner(self, tasks: List[asyncio.Future], first_error: Optional[Exception]) -> tuple:
+        # Percorre na ordem dos backends para dar preferência ao primário em caso de empate
+        for index, task in enumerate(tasks):
+            if not task.done() or task.cancelled():
+                continue
+            if task.exception() is not None:
+                first_error = first_error or task.exception()
+                continue
+            self._stats[self._names[index]]["wins"] += 1
+            return task.result(), first_error
+        return None, first_error
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Chamadas, vitórias, erros, cancelamentos e latência média (das chamadas concluídas) por backend.
+        """
+        return {
+            name: {
+                "calls": stats["calls"],
+                "wins": stats["wins"],
+                "errors": stats["errors"],
+                "cancelled": stats["cancelled"],
+                "mean_latency": stats["latency_total"] / stats["completed"] if stats["completed"] else None,
+            }
+            for name, stats in self._stats.items()
+        }
+
+
+class MemoryResponseCache:
+    """
+    Cache em memória (LRU) das respostas do LLM usado por CachedLLMCall.
+
+    Args:
+        max_entries: número máximo de respostas mantidas
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self._max_entries = max_entries
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+            return response
+
+    def set(self, key: str, response: Any):
+        with self._lock:
+            self._responses[key] = response
+            self._responses.move_to_end(key)
+            while len(self._responses) > self._max_entries:
+                self._responses.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+
+class SQLiteResponseCache:
+    """
+    Cache em disco (SQLite) das respostas do LLM usado por CachedLLMCall. As respostas são
+    serializadas com pickle: use apenas bancos gerados por você.
+
+    Args:
+        path: caminho do arquivo do banco
+        ttl: validade (segundos) de uma resposta; None = sem expiração
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        self._path = path
+        self._ttl = ttl
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, data BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Uma conexão por operação: o cache pode ser usado por várias threads ao mesmo tempo
+        return sqlite3.connect(self._path, timeout=30)
+
+    def get(self, key: str) -> Any:
+        with self._connect() as connection:
+            row = connection.execute("SELECT data, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or (self._ttl is not None and time.time() - row[1] > self._ttl):
+            return None
+        return pickle.loads(row[0])
+
+    def set(self, key: str, response: Any):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, data, created_at) VALUES (?, ?, ?)",
+                (key, pickle.dumps(response), time.time())
+            )
+
+    def __len__(self) -> int:
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class CachedLLMCall:
+    """
+    Envolve uma llm_call_fn (síncrona ou assíncrona) com um cache de respostas: requisições
+    idênticas (mesmo modelo, mesmas mensagens normalizadas, mesmo bloco de ferramentas e mesmos
+    parâmetros extras) são respondidas pelo cache, sem ida ao provedor. Útil em pipelines com
+    temperatura 0, replays e suítes de regressão. Erros não são armazenados.
+
+    EXEMPLO:
+
+    llm_call_fn = CachedLLMCall(call_openai, cache=SQLiteResponseCache("llm_cache.db"))
+    final_response = process_tool_calls(..., llm_call_fn=llm_call_fn)
+    print(llm_call_fn.get_stats())
+
+    Args:
+        llm_call_fn: função (model, messages, tools) -> resposta, síncrona ou assíncrona
+        cache: MemoryResponseCache, SQLiteResponseCache ou objeto com get(key)/set(key, resposta)
+            (padrão: MemoryResponseCache())
+        is_async: se True, as respostas (inclusive as do cache) são devolvidas como awaitables. Por
+            padrão é detectado pela função ou pelo primeiro resultado awaitable (ex: uma lambda que
+            devolve uma corrotina); informe True nesse caso se o cache já tiver respostas gravadas
+    """
+
+    def __init__(self, llm_call_fn: Callable, cache: Optional[Any] = None, is_async: Optional[bool] = None):
+        self._llm_call_fn = llm_call_fn
+        self.cache = cache if cache is not None else MemoryResponseCache()
+        if is_async is None:
+            is_async = inspect.iscoroutinefunction(llm_call_fn) or inspect.iscoroutinefunction(
+                getattr(llm_call_fn, "__call__", None)
+            )
+        self._is_async = is_async
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, messages: Any, tools: Any = None, **kwargs) -> str:
+        """
+        Hash estável da requisição: modelo, mensagens normalizadas (dicts, chaves ordenadas),
+        fingerprint das ferramentas e parâmetros extras.
+        """
+        request = {
+            "model": model,
+            "messages": _serializable_messages(list(messages)),
+            "tools": _tools_fingerprint(tools or []),
+            "kwargs": kwargs,
+        }
+        encoded = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def __call__(self, model: str, messages: Any, tools: Any = None, **kwargs) -> Any:
+        if self._is_async:
+            return self._call_async(model, messages, tools, kwargs)
+        key = self.key(model, messages, tools, **kwargs)
+        response = self.cache.get(key)
+        if response is not None:
+            self.hits += 1
+            return response
+        self.misses += 1
+        response = self._llm_call_fn(model=model, messages=messages, tools=tools, **kwargs)
+        if inspect.isawaitable(response):
+            # Função síncrona que devolve uma corrotina: as próximas chamadas seguem o caminho assíncrono
+            self._is_async = True
+            return self._store_awaited(key, response)
+        self.cache.set(key, response)
+        return response
+
+    async def _store_awaited(self, key: str, pending: Any) -> Any:
+        response = await pending
+        self.cache.set(key, response)
+        return response
+
+    async def _call_async(self, model: str, messages: Any, tools: Any, kwargs: Dict[str, Any]) -> Any:
+        key = self.key(model, messages, tools, **kwargs)
+        response = self.cache.get(key)
+        if response is not None:
+            self.hits += 1
+            return response
+        self.misses += 1
+        response = self._llm_call_fn(model=model, messages=messages, tools=tools, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+        self.cache.set(key, response)
+        return response
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.cache)}
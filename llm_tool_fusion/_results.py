@@ -0,0 +1,294 @@
+import copy
+import os
+import uuid
+from collections import OrderedDict
+from typing import Callable, Any, List, Optional
+from ._utils import _estimate_tokens, _encode_tool_result
+from ._codec import JsonCodec
+
+
+class ToolResultStore:
+    """
+    Armazena fora do histórico de mensagens o conteúdo completo de resultados grandes,
+    acessível por um handle. O armazenamento é limitado: os resultados mais antigos (LRU)
+    são descartados ao exceder max_entries ou max_chars.
+
+    Args:
+        max_entries: número máximo de resultados armazenados
+        max_chars: soma máxima de caracteres armazenados (None = sem limite)
+        directory: se informado, os resultados são gravados em disco neste diretório em vez da memória
+    """
+
+    def __init__(self, max_entries: int = 128, max_chars: Optional[int] = None, directory: Optional[str] = None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be greater than or equal to 1")
+        self._max_entries = max_entries
+        self._max_chars = max_chars
+        self._directory = directory
+        # handle -> conteúdo (memória) ou tamanho (disco)
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_chars = 0
+
+        if self._directory is not None:
+            os.makedirs(self._directory, exist_ok=True)
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self._directory, f"{handle}.txt")
+
+    def put(self, content: str) -> str:
+        handle = f"result_{uuid.uuid4().hex[:12]}"
+        if self._directory is not None:
+            with open(self._path(handle), "w", encoding="utf-8") as file:
+                file.write(content)
+            self._entries[handle] = None
+        else:
+            self._entries[handle] = content
+        self._sizes[handle] = len(content)
+        self._total_chars += len(content)
+
+        while len(self._entries) > 1 and (
+            len(self._entries) > self._max_entries
+            or (self._max_chars is not None and self._total_chars > self._max_chars)
+        ):
+            self._evict(next(iter(self._entries)))
+        return handle
+
+    def _evict(self, handle: str):
+        self._entries.pop(handle)
+        self._total_chars -= self._sizes.pop(handle)
+        if self._directory is not None:
+            try:
+                os.remove(self._path(handle))
+            except FileNotFoundError:
+                pass
+
+    def get(self, handle: str) -> Optional[str]:
+        if handle not in self._entries:
+            return None
+        self._entries.move_to_end(handle)
+        if self._directory is not None:
+            with open(self._path(handle), encoding="utf-8") as file:
+                return file.read()
+        return self._entries[handle]
+
+    def read(self, handle: str, offset: int = 0, limit: int = 2000) -> Optional[str]:
+        """
+        Retorna apenas um trecho (página) do resultado, sem carregar o restante quando está em disco.
+        """
+        if handle not in self._entries:
+            return None
+        self._entries.move_to_end(handle)
+        offset = max(offset, 0)
+        limit = max(limit, 0)
+        if self._directory is not None:
+            with open(self._path(handle), encoding="utf-8") as file:
+                file.read(offset)
+                return file.read(limit)
+        return self._entries[handle][offset:offset + limit]
+
+    def size(self, handle: str) -> Optional[int]:
+        return self._sizes.get(handle)
+
+    def __contains__(self, handle: str) -> bool:
+        return handle in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_TRUNCATION_MARKER = "\n[... {omitted} characters omitted ...]\n"
+
+
+class OutputPolicy:
+    """
+    Política de tamanho para o conteúdo das mensagens de ferramenta.
+
+    Uma política por ferramenta (ToolCaller.set_output_policy(..., tool_name=...)) é aplicada sobre
+    a global: apenas os campos com valor diferente do padrão substituem os da política global.
+
+    Args:
+        max_chars: limite de caracteres do conteúdo
+        max_tokens: limite de tokens estimados do conteúdo (usa token_estimator)
+        token_estimator: função text -> número de tokens (padrão: ~4 caracteres por token)
+        compact_json: se True, serializa resultados com separadores JSON compactos
+        head_ratio: fração do limite mantida do início do conteúdo; o restante é mantido do final
+        truncation_marker: texto inserido no ponto de corte ({omitted} = caracteres omitidos)
+        spill: se True, guarda o resultado completo fora das mensagens e informa o handle ao modelo
+        paginate: se True, guarda o resultado completo e envia apenas a primeira página; o modelo lê
+            o restante com a ferramenta read_tool_result, registrada automaticamente pelo ToolCaller
+        tabular: codificação compacta de listas de dicts com as mesmas chaves (ex: linhas de banco):
+            "rows" = {"columns": [...], "rows": [[...], ...]}, "columns" = {"columns": {coluna: [...]}}
+    """
+
+    def __init__(
+        self,
+        max_chars: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        token_estimator: Optional[Callable[[str], int]] = None,
+        compact_json: bool = False,
+        head_ratio: float = 1.0,
+        truncation_marker: str = _TRUNCATION_MARKER,
+        spill: bool = False,
+        paginate: bool = False,
+        tabular: Optional[str] = None
+    ):
+        if not 0 <= head_ratio <= 1:
+            raise ValueError("head_ratio must be between 0 and 1")
+        if tabular not in (None, "rows", "columns"):
+            raise ValueError("tabular must be None, 'rows' or 'columns'")
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+        self.token_estimator = token_estimator or _estimate_tokens
+        self.compact_json = compact_json
+        self.head_ratio = head_ratio
+        self.truncation_marker = truncation_marker
+        self.spill = spill
+        self.paginate = paginate
+        self.tabular = tabular
+
+    def merged(self, base: Optional["OutputPolicy"]) -> "OutputPolicy":
+        """
+        Cópia de base com os campos desta política que diferem do padrão (base None = esta política).
+        """
+        if base is None:
+            return self
+        policy = copy.copy(base)
+        for field, default in _POLICY_DEFAULTS.items():
+            value = getattr(self, field)
+            if value is not default and value != default:
+                setattr(policy, field, value)
+        return policy
+
+    def _char_limit(self, content: str) -> Optional[int]:
+        limit = self.max_chars
+        if self.max_tokens is not None:
+            tokens = self.token_estimator(content)
+            if tokens > self.max_tokens:
+                # Converte o orçamento de tokens em caracteres proporcionalmente
+                token_limit = int(len(content) * self.max_tokens / tokens)
+                limit = token_limit if limit is None else min(limit, token_limit)
+        return limit
+
+    def apply(self, content: str, store: Optional[ToolResultStore] = None) -> str:
+        limit = self._char_limit(content)
+        if limit is None or len(content) <= limit:
+            return content
+
+        if self.paginate and store is not None:
+            return _first_page(content, limit, store)
+
+        omitted = len(content) - limit
+        marker = self.truncation_marker.format(omitted=omitted)
+        if self.spill and store is not None:
+            handle = store.put(content)
+            marker = f"{marker.rstrip()} [full result stored under handle '{handle}']\n"
+
+        budget = max(limit - len(marker), 0)
+        head = int(budget * self.head_ratio)
+        tail = budget - head
+        return content[:head] + marker + (content[-tail:] if tail else "")
+
+
+_POLICY_DEFAULTS = {
+    "max_chars": None,
+    "max_tokens": None,
+    "token_estimator": _estimate_tokens,
+    "compact_json": False,
+    "head_ratio": 1.0,
+    "truncation_marker": _TRUNCATION_MARKER,
+    "spill": False,
+    "paginate": False,
+    "tabular": None,
+}
+
+
+def _first_page(content: str, limit: int, store: ToolResultStore) -> str:
+    handle = store.put(content)
+    notice = (
+        f"\n[Showing characters 0-{{end}} of {len(content)}. Use read_tool_result(handle='{handle}', "
+        f"offset={{end}}, limit=...) to read more]"
+    )
+    end = max(limit - len(notice.format(end=limit)), 0)
+    return content[:end] + notice.format(end=end)
+
+def _make_read_tool_result(store: ToolResultStore) -> Callable:
+    def read_tool_result(handle: str, offset: int = 0, limit: int = 2000) -> str:
+        """
+        Reads a page of a tool result that was too large to be returned in full.
+
+        Args:
+            handle (str): handle of the stored result, as informed in the truncated tool message
+            offset (int): character offset to start reading from
+            limit (int): maximum number of characters to read
+        Returns:
+            str: the requested page of the result
+        """
+        offset = int(offset)
+        limit = int(limit)
+        page = store.read(handle, offset, limit)
+        if page is None:
+            return f"Unknown or expired handle '{handle}'"
+
+        total = store.size(handle)
+        end = offset + len(page)
+        if end < total:
+            return f"{page}\n[Showing characters {offset}-{end} of {total}. Next offset: {end}]"
+        return f"{page}\n[Showing characters {offset}-{end} of {total}. End of result]"
+
+    return read_tool_result
+
+def _row_columns(value: Any) -> Optional[List[str]]:
+    """
+    Colunas de uma lista de dicts com as mesmas chaves (pelo menos 2 linhas), ou None.
+    """
+    if not isinstance(value, list) or len(value) < 2 or not isinstance(value[0], dict):
+        return None
+    columns = list(value[0])
+    keys = set(columns)
+    for row in value:
+        if not isinstance(row, dict) or len(row) != len(columns) or row.keys() != keys:
+            return None
+    return columns
+
+
+def _to_table(value: Any, layout: str) -> Any:
+    columns = _row_columns(value)
+    if columns is None:
+        return value
+    if layout == "columns":
+        return {"columns": {column: [row[column] for row in value] for column in columns}}
+    return {"columns": columns, "rows": [[row[column] for column in columns] for row in value]}
+
+
+def encode_tabular(result: Any, layout: str = "rows") -> Any:
+    """
+    Converte listas de dicts com as mesmas chaves para a forma tabular, sem repetir as chaves em
+    cada linha. Aplica-se ao próprio resultado ou aos valores de um dict (ex: {"items": [...], "total": 10}).
+    Outros valores são retornados sem alteração.
+
+    Args:
+        result: resultado da ferramenta
+        layout: "rows" (cabeçalho + linhas) ou "columns" (uma lista de valores por coluna)
+    Returns:
+        Resultado na forma tabular
+    """
+    if isinstance(result, dict):
+        converted = {key: _to_table(value, layout) for key, value in result.items()}
+        return converted if any(converted[key] is not result[key] for key in result) else result
+    return _to_table(result, layout)
+
+
+def _format_tool_content(
+    result: Any,
+    framework: str,
+    policy: Optional[OutputPolicy] = None,
+    store: Optional[ToolResultStore] = None,
+    codec: Optional[JsonCodec] = None
+    ) -> str:
+    if policy is not None and policy.tabular is not None:
+        result = encode_tabular(result, policy.tabular)
+    content = _encode_tool_result(result, framework, compact_json=policy.compact_json if policy else False, codec=codec)
+    if policy is None:
+        return content
+    return policy.apply(content, store)
@@ -0,0 +1,199 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Any, Dict, Optional, Awaitable
+
+# Códigos HTTP que indicam falhas transitórias do provedor
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504, 529})
+
+# Exceções dos SDKs (openai, anthropic, httpx) reconhecidas pelo nome, sem importar os pacotes
+_RETRYABLE_ERROR_NAMES = frozenset({
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+    "ConnectError", "ReadTimeout", "WriteTimeout", "PoolTimeout", "RemoteProtocolError",
+})
+
+
+def _is_retryable_error(error: BaseException) -> bool:
+    """
+    Erros transitórios: timeouts, falhas de conexão e respostas com status HTTP de nova tentativa.
+    """
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in _RETRYABLE_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    status_code = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return isinstance(status_code, int) and status_code in RETRYABLE_STATUS_CODES
+
+
+class RetryPolicy:
+    """
+    Timeout, novas tentativas com backoff exponencial (com jitter) e orçamento total de tempo para
+    as chamadas ao LLM de process_tool_calls e process_tool_calls_async. Uma falha transitória
+    repete apenas a chamada ao LLM, sem perder o trabalho das ferramentas já executadas.
+
+    Por padrão são repetidos timeouts, erros de conexão, erros de limite de taxa e respostas com
+    status 408, 409, 425, 429 e 5xx. As assíncronas que excedem o timeout são canceladas. Com timeout,
+    cada tentativa síncrona roda em uma thread daemon própria, abandonada (resultado descartado) se
+    exceder o timeout: ela não ocupa vaga das chamadas seguintes, mas continua rodando até o
+    provedor responder. Para chamadas síncronas, prefira também configurar o timeout do SDK
+    (ex: OpenAI(timeout=30)), que encerra a requisição de fato.
+
+    EXEMPLO:
+
+    retry = RetryPolicy(max_attempts=4, timeout=30, base_delay=1, max_elapsed=120)
+    final_response = process_tool_calls(..., llm_retry=retry)
+    print(retry.get_stats())
+
+    Args:
+        max_attempts: número máximo de tentativas por chamada (1 = sem novas tentativas)
+        timeout: tempo máximo (segundos) de cada tentativa; None = sem timeout
+        base_delay: espera (segundos) antes da primeira nova tentativa; dobra a cada tentativa
+        max_delay: espera máxima entre tentativas
+        jitter: se True, a espera é sorteada entre 0 e o valor do backoff (full jitter), evitando
+            que muitas conversas repitam ao mesmo tempo
+        max_elapsed: orçamento total (segundos) de uma chamada, somando tentativas e esperas
+        retry_on: função error -> bool que decide se um erro é transitório (padrão: erros de rede,
+            timeouts e status HTTP de nova tentativa)
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        timeout: Optional[float] = None,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        jitter: bool = True,
+        max_elapsed: Optional[float] = None,
+        retry_on: Optional[Callable[[BaseException], bool]] = None
+    ):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be greater than or equal to 1")
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_elapsed = max_elapsed
+        self.retry_on = retry_on or _is_retryable_error
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Espera (segundos) antes da tentativa attempt + 1.
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def _attempt_timeout(self, deadline: Optional[float]) -> Optional[float]:
+        if deadline is None:
+            return self.timeout
+        remaining = max(0.0, deadline - time.monotonic())
+        return remaining if self.timeout is None else min(self.timeout, remaining)
+
+    def _next_delay(self, attempt: int, error: BaseException, deadline: Optional[float]) -> Optional[float]:
+        """
+        Espera antes da próxima tentativa, ou None se o erro deve ser levantado.
+        """
+        if attempt >= self.max_attempts or not self.retry_on(error):
+            return None
+        delay = self.backoff(attempt)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        with self._lock:
+            self.retries += 1
+        return delay
+
+    def _record(self, timed_out: bool = False, failed: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            if failed:
+                self.failures += 1
+
+    def _run_with_timeout(self, func: Callable[[], Any], timeout: Optional[float]) -> Any:
+        if timeout is None:
+            return func()
+        # Uma thread por tentativa: tentativas abandonadas não esgotam um pool compartilhado
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(func())
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="llm_tool_fusion_llm", daemon=True).start()
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"LLM call timed out after {timeout} seconds")
+
+    def call(self, func: Callable[[], Any], on_retry: Optional[Callable[[int, BaseException, float], None]] = None) -> Any:
+        """
+        Executa func() aplicando timeout e novas tentativas.
+
+        Args:
+            func: função sem argumentos que faz a chamada ao LLM
+            on_retry: chamada como on_retry(tentativa, erro, espera) antes de cada nova tentativa
+        """
+        with self._lock:
+            self.calls += 1
+        deadline = time.monotonic() + self.max_elapsed if self.max_elapsed is not None else None
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return self._run_with_timeout(func, self._attempt_timeout(deadline))
+            except Exception as e:
+                timed_out = isinstance(e, TimeoutError)
+                delay = self._next_delay(attempt, e, deadline)
+                self._record(timed_out=timed_out, failed=delay is None)
+                if delay is None:
+                    raise
+                if on_retry is not None:
+                    on_retry(attempt, e, delay)
+                time.sleep(delay)
+
+    async def call_async(
+        self,
+        func: Callable[[], Awaitable],
+        on_retry: Optional[Callable[[int, BaseException, float], None]] = None
+    ) -> Any:
+        """
+        Versão assíncrona de call: cada tentativa é cancelada ao exceder o timeout.
+        """
+        with self._lock:
+            self.calls += 1
+        deadline = time.monotonic() + self.max_elapsed if self.max_elapsed is not None else None
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._attempt_timeout(deadline)
+            try:
+                if timeout is None:
+                    return await func()
+                return await asyncio.wait_for(func(), timeout)
+            except Exception as e:
+                timed_out = isinstance(e, (TimeoutError, asyncio.TimeoutError))
+                delay = self._next_delay(attempt, e, deadline)
+                self._record(timed_out=timed_out, failed=delay is None)
+                if delay is None:
+                    raise
+                if on_retry is not None:
+                    on_retry(attempt, e, delay)
+                await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+            }
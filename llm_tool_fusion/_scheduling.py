@@ -0,0 +1,248 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Any, Dict, List, Optional, Iterable, Tuple
+
+# Chave usada por ferramentas sem recursos declarados: conflita com qualquer outra chamada
+ALL_RESOURCES = "*"
+
+
+class ToolResources:
+    """
+    Recursos lidos e escritos por uma ferramenta, usados para ordenar chamadas em paralelo.
+
+    As chaves podem usar os argumentos da chamada como template, por exemplo "account:{account_id}".
+    Uma chave que não pode ser formatada com os argumentos vira ALL_RESOURCES (conservador).
+
+    Args:
+        reads: chaves dos recursos lidos
+        writes: chaves dos recursos escritos
+    """
+
+    def __init__(self, reads: Optional[Iterable[str]] = None, writes: Optional[Iterable[str]] = None):
+        self.reads = tuple(reads or ())
+        self.writes = tuple(writes or ())
+
+    @staticmethod
+    def _format(template: str, args: Dict[str, Any]) -> str:
+        try:
+            return template.format(**args)
+        except (KeyError, IndexError, ValueError):
+            return ALL_RESOURCES
+
+    def keys(self, args: Dict[str, Any]) -> Tuple[frozenset, frozenset]:
+        return (
+            frozenset(self._format(key, args) for key in self.reads),
+            frozenset(self._format(key, args) for key in self.writes)
+        )
+
+
+def _conflicts(first: Tuple[frozenset, frozenset], second: Tuple[frozenset, frozenset]) -> bool:
+    """
+    Duas chamadas conflitam quando uma escreve um recurso que a outra lê ou escreve.
+    """
+    first_reads, first_writes = first
+    second_reads, second_writes = second
+
+    def overlap(a: frozenset, b: frozenset) -> bool:
+        if not a or not b:
+            return False
+        return ALL_RESOURCES in a or ALL_RESOURCES in b or not a.isdisjoint(b)
+
+    return (
+        overlap(first_writes, second_writes)
+        or overlap(first_writes, second_reads)
+        or overlap(first_reads, second_writes)
+    )
+
+
+def _call_dependencies(call_keys: List[Optional[Tuple[frozenset, frozenset]]]) -> List[set]:
+    """
+    Para cada chamada, os índices das chamadas anteriores (na ordem emitida pelo modelo) com as
+    quais ela conflita e que portanto precisam terminar antes. Chamadas None não têm dependências.
+    """
+    dependencies = []
+    for i, keys in enumerate(call_keys):
+        dependencies.append({
+            j for j in range(i)
+            if keys is not None and call_keys[j] is not None and _conflicts(call_keys[j], keys)
+        })
+    return dependencies
+
+
+def _run_dag(dependencies: List[set], run: Callable[[int], Any], max_workers: Optional[int] = None) -> List[Any]:
+    """
+    Executa run(i) em threads respeitando as dependências. Retorna, para cada índice, o resultado
+    ou a exceção levantada.
+    """
+    outcomes = [None] * len(dependencies)
+    if not dependencies:
+        return outcomes
+
+    done = set()
+    waiting = set(range(len(dependencies)))
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or min(32, len(dependencies))) as pool:
+        while waiting or running:
+            for i in sorted(waiting):
+                if dependencies[i] <= done:
+                    running[pool.submit(run, i)] = i
+                    waiting.discard(i)
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = running.pop(future)
+                done.add(i)
+                exception = future.exception()
+                outcomes[i] = exception if exception is not None else future.result()
+
+    return outcomes
+
+
+async def _run_dag_async(dependencies: List[set], run: Callable[[int], Any]) -> List[Any]:
+    """
+    Versão assíncrona de _run_dag: cada chamada vira uma task que aguarda as tasks das quais depende.
+    """
+    tasks = []
+
+    async def run_after(i: int):
+        if dependencies[i]:
+            await asyncio.wait([tasks[j] for j in dependencies[i]])
+        return await run(i)
+
+    for i in range(len(dependencies)):
+        tasks.append(asyncio.ensure_future(run_after(i)))
+
+    return list(await asyncio.gather(*tasks, return_exceptions=True))
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "event", "cancelled")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.cancelled = False
+
+
+class PriorityScheduler:
+    """
+    Limita quantas ferramentas executam ao mesmo tempo entre todas as sessões que compartilham o
+    ToolCaller (threads, tasks de event loops diferentes) e entrega as vagas livres por prioridade.
+
+    Prioridades maiores são atendidas primeiro. Para evitar starvation, a prioridade efetiva de uma
+    chamada em espera cresce aging_rate pontos por segundo de espera.
+
+    Args:
+        max_concurrency: número máximo de ferramentas em execução ao mesmo tempo
+        aging_rate: pontos de prioridade ganhos por segundo de espera
+    """
+
+    def __init__(self, max_concurrency: int = 8, aging_rate: float = 1.0):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be greater than or equal to 1")
+        self._max_concurrency = max_concurrency
+        self._aging_rate = aging_rate
+        self._active = 0
+        self._waiters = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def _key(self, priority: float) -> float:
+        # prioridade efetiva = priority + aging_rate * (agora - entrada); a ordem entre as chamadas
+        # em espera não muda com o tempo, então basta ordenar por aging_rate * entrada - priority
+        return self._aging_rate * time.monotonic() - priority
+
+    def _try_acquire(self, priority: float, waiter_factory: Callable[[], _Waiter]) -> Optional[_Waiter]:
+        with self._lock:
+            if self._active < self._max_concurrency and not self._waiters:
+                self._active += 1
+                return None
+            waiter = waiter_factory()
+            heapq.heappush(self._waiters, (self._key(priority), next(self._counter), waiter))
+            return waiter
+
+    def acquire(self, priority: float = 0):
+        waiter = self._try_acquire(priority, _Waiter)
+        if waiter is not None:
+            # A vaga é transferida diretamente por release()
+            waiter.event.wait()
+
+    async def acquire_async(self, priority: float = 0):
+        loop = asyncio.get_running_loop()
+        waiter = self._try_acquire(priority, lambda: _Waiter(loop))
+        if waiter is None:
+            return
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                waiter.cancelled = True
+            if waiter.future.done() and not waiter.future.cancelled():
+                # A vaga chegou junto com o cancelamento: repassa para o próximo
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            # Se o limite foi reduzido, a vaga liberada é descartada em vez de repassada
+            if self._active <= self._max_concurrency and self._wake_next_locked():
+                return
+            self._active -= 1
+
+    def _wake_next_locked(self) -> bool:
+        """
+        Entrega uma vaga à chamada em espera mais urgente. Retorna False se não há ninguém esperando.
+        """
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.cancelled:
+                continue
+            if waiter.event is not None:
+                waiter.event.set()
+            else:
+                waiter.loop.call_soon_threadsafe(self._grant, waiter)
+            return True
+        return False
+
+    def _set_max_concurrency_locked(self, max_concurrency: int):
+        self._max_concurrency = max_concurrency
+        while self._active < self._max_concurrency and self._wake_next_locked():
+            self._active += 1
+
+    def _grant(self, waiter: _Waiter):
+        if waiter.future.done():
+            # A espera foi cancelada antes de receber a vaga
+            self.release()
+        else:
+            waiter.future.set_result(None)
+
+    @contextmanager
+    def slot(self, priority: float = 0):
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self, priority: float = 0):
+        await self.acquire_async(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_concurrency": self._max_concurrency,
+                "active": self._active,
+                "waiting": sum(1 for _, _, waiter in self._waiters if not waiter.cancelled),
+            }
@@ -1,7 +1,11 @@
-import json
 import re
-from typing import Callable, Any, Dict
+import time
+import json
+import hashlib
+import inspect
+from typing import Callable, Any, Dict, List, Optional
 import asyncio
+from ._codec import JsonCodec, DEFAULT_CODEC
 
 def _extract_docstring(func: Callable) -> Dict[str, Any]:
     """
@@ -83,13 +87,173 @@ def _extract_docstring(func: Callable) -> Dict[str, Any]:
 
     return result
 
-async def _poll_fuction_async(avaliable_tools: dict, list_tasks: dict, framework: str) -> list[Dict[str, Any]]:
+def _canonical_schema(value: Any) -> Any:
+    """
+    Cópia de um schema com as chaves dos dicts em ordem alfabética (em todos os níveis), para que
+    a serialização seja idêntica byte a byte entre requisições.
+    """
+    if isinstance(value, dict):
+        return {key: _canonical_schema(value[key]) for key in sorted(value)}
+    if isinstance(value, list):
+        return [_canonical_schema(item) for item in value]
+    return value
+
+def _tools_fingerprint(tools: List[Dict[str, Any]]) -> str:
+    """
+    Hash SHA-256 da lista de ferramentas serializada de forma canônica.
+    """
+    encoded = json.dumps(tools, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def _estimate_tokens(text: str) -> int:
+    """
+    Estimativa simples do número de tokens de um texto (~4 caracteres por token).
+    """
+    return (len(text) + 3) // 4
+
+def _encode_tool_result(result: Any, framework: str, compact_json: bool = False, codec: Optional[JsonCodec] = None) -> str:
+    """
+    Converte o resultado de uma ferramenta no conteúdo da mensagem 'tool' de cada framework.
+    """
+    codec = codec or DEFAULT_CODEC
+    if framework == "ollama":
+        if isinstance(result, str):
+            return result
+        if compact_json or codec.compact:
+            return codec.dumps(result, compact=True)
+        # Tipos com encoder (dataclasses, arrays NumPy, datetimes...) viram JSON em vez do repr
+        if codec.encoders.handles(result):
+            return codec.dumps(result)
+        return str(result)
+
+    return codec.dumps(result, compact=compact_json)
+
+async def _consume_async_generator(
+    agen: Any,
+    tool_name: str,
+    on_tool_chunk: Optional[Callable] = None,
+    stream_max_chars: Optional[int] = None,
+    stream_timeout: Optional[float] = None
+    ) -> Any:
+    """
+    Consome incrementalmente a saída de uma ferramenta async generator.
+
+    Cada chunk é repassado para on_tool_chunk(tool_name, chunk) assim que chega. O consumo é
+    interrompido ao atingir stream_max_chars caracteres ou stream_timeout segundos, e o gerador é
+    fechado.
+
+    Returns:
+        str com os chunks concatenados (se todos forem str) ou lista de chunks, com um marcador
+        de truncamento ao final quando algum limite foi atingido.
+    """
+    chunks = []
+    size = 0
+    truncated = None
+    deadline = time.monotonic() + stream_timeout if stream_timeout is not None else None
+
+    try:
+        while True:
+            try:
+                if deadline is None:
+                    chunk = await agen.__anext__()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    chunk = await asyncio.wait_for(agen.__anext__(), remaining)
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                truncated = f"time limit of {stream_timeout} seconds"
+                break
+
+            if on_tool_chunk is not None:
+                observed = on_tool_chunk(tool_name, chunk)
+                if inspect.isawaitable(observed):
+                    await observed
+
+            chunks.append(chunk)
+            size += len(chunk) if isinstance(chunk, str) else len(str(chunk))
+            if stream_max_chars is not None and size >= stream_max_chars:
+                truncated = f"size limit of {stream_max_chars} characters"
+                break
+    finally:
+        await agen.aclose()
+
+    marker = f"[output truncated: {truncated} reached]" if truncated else None
+
+    if all(isinstance(chunk, str) for chunk in chunks):
+        result = "".join(chunks)
+        if stream_max_chars is not None:
+            result = result[:stream_max_chars]
+        return f"{result}\n{marker}" if marker else result
+
+    if marker:
+        chunks.append(marker)
+    return chunks
+
+async def _run_async_tool(
+    func: Callable,
+    args: Dict[str, Any],
+    tool_name: str,
+    on_tool_chunk: Optional[Callable] = None,
+    stream_max_chars: Optional[int] = None,
+    stream_timeout: Optional[float] = None
+    ) -> Any:
+    """
+    Executa uma ferramenta assíncrona, seja ela uma corrotina ou um async generator.
+    """
+    result = func(**args)
+
+    if inspect.isasyncgen(result):
+        return await _consume_async_generator(
+            result, tool_name,
+            on_tool_chunk=on_tool_chunk,
+            stream_max_chars=stream_max_chars,
+            stream_timeout=stream_timeout
+        )
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+async def _poll_fuction_async(
+    avaliable_tools: dict,
+    list_tasks: dict,
+    framework: str,
+    on_tool_chunk: Optional[Callable] = None,
+    stream_max_chars: Optional[int] = None,
+    stream_timeout: Optional[float] = None,
+    format_content: Optional[Callable] = None,
+    run_tool: Optional[Callable] = None,
+    codec: Optional[JsonCodec] = None
+    ) -> list[Dict[str, Any]]:
+    """
+    Executa em paralelo as ferramentas assíncronas de list_tasks e monta as mensagens 'tool'.
+
+    Args:
+        format_content: função (tool_name, result) -> conteúdo da mensagem (padrão: codificação do framework)
+        run_tool: corrotina (tool_name, args) -> resultado que substitui a execução direta da ferramenta
+        codec: JsonCodec usado na codificação padrão dos resultados
+    """
     tools_async_list = []
     tool_async_results = []
     for tool_call in list_tasks:
-        tools_async_list.append(avaliable_tools[tool_call.get("tool_name")](**tool_call.get("args")))
+        if run_tool is not None:
+            tools_async_list.append(run_tool(tool_call.get("tool_name"), tool_call.get("args")))
+            continue
+        tools_async_list.append(_run_async_tool(
+            avaliable_tools[tool_call.get("tool_name")],
+            tool_call.get("args"),
+            tool_call.get("tool_name"),
+            on_tool_chunk=on_tool_chunk,
+            stream_max_chars=stream_max_chars,
+            stream_timeout=stream_timeout
+        ))
 
     results = await asyncio.gather(*tools_async_list, return_exceptions=True)
+
+    if format_content is None:
+        format_content = lambda tool_name, result: _encode_tool_result(result, framework, codec=codec)
     
     if framework == "openai":
         for i, task in enumerate(list_tasks):
@@ -98,7 +262,7 @@ async def _poll_fuction_async(avaliable_tools: dict, list_tasks: dict, framework
                             "role": "tool",
                             "tool_call_id": task.get("tool_id"),
                             "name": task.get("tool_name"),
-                            "content": json.dumps(content),
+                            "content": format_content(task.get("tool_name"), content),
                         })
             
     elif framework == "ollama":
@@ -107,7 +271,7 @@ async def _poll_fuction_async(avaliable_tools: dict, list_tasks: dict, framework
             tool_async_results.append({
                 "role": "tool",
                 "name": task.get("tool_name"),
-                "content": json.dumps(content),
+                "content": format_content(task.get("tool_name"), content),
             })
 
 
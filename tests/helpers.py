@@ -0,0 +1,17 @@
+import json
+import types
+
+
+def make_response(tool_calls=None, content="resp"):
+    """
+    Resposta no formato do OpenAI (response.choices[0].message) usada nos testes.
+    """
+    message = types.SimpleNamespace(tool_calls=tool_calls, content=content)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def make_tool_call(name, args, id="id1"):
+    """
+    tool_call no formato do OpenAI, com os argumentos serializados em JSON.
+    """
+    return types.SimpleNamespace(id=id, function=types.SimpleNamespace(name=name, arguments=json.dumps(args)))
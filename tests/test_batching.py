@@ -0,0 +1,78 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import pytest
+from llm_tool_fusion._core import ToolCaller, process_tool_calls_async
+from llm_tool_fusion._batching import MicroBatcher
+from tests.helpers import make_response, make_tool_call
+
+def test_micro_batcher_groups_concurrent_calls():
+    received = []
+
+    async def double(calls):
+        received.append(len(calls))
+        return [call["x"] * 2 for call in calls]
+
+    batcher = MicroBatcher(double, max_batch_size=3, max_wait_ms=50)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit({"x": i}) for i in range(5)))
+
+    assert asyncio.run(main()) == [0, 2, 4, 6, 8]
+    # Lote cheio com 3 itens, o restante disparado pelo tempo
+    assert received == [3, 2]
+    assert batcher.batches == 2
+    assert batcher.items == 5
+
+def test_micro_batcher_per_item_exception():
+    def lookup(calls):
+        return [ValueError("missing") if call["key"] == "b" else call["key"].upper() for call in calls]
+
+    batcher = MicroBatcher(lookup, max_wait_ms=1)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit({"key": k}) for k in "abc"), return_exceptions=True)
+
+    a, b, c = asyncio.run(main())
+    assert (a, c) == ("A", "C")
+    assert isinstance(b, ValueError)
+
+def test_batch_tool_shared_across_sessions():
+    caller = ToolCaller()
+    batch_sizes = []
+
+    @caller.batch_tool(max_wait_ms=20)
+    async def embed(calls):
+        """Gera o embedding de um texto
+        Args:
+            text (str): texto
+        """
+        batch_sizes.append(len(calls))
+        return [len(call["text"]) for call in calls]
+
+    assert 'embed' in caller.get_name_async_tools()
+    assert any(t['function']['name'] == 'embed' for t in caller.get_tools())
+
+    async def llm_call_fn(**kwargs):
+        return make_response()
+
+    async def session(text):
+        messages = []
+        response = make_response([make_tool_call('embed', {"text": text})])
+        await process_tool_calls_async(response, messages, caller, model='fake', llm_call_fn=llm_call_fn)
+        return messages
+
+    async def main():
+        return await asyncio.gather(*(session("x" * n) for n in range(1, 5)))
+
+    results = asyncio.run(main())
+    assert batch_sizes == [4]
+    assert [json.loads(m[-1]['content']) for m in results] == [1, 2, 3, 4]
+
+def test_micro_batcher_invalid_arguments():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda calls: calls, max_batch_size=0)
@@ -0,0 +1,141 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import types
+import pytest
+from llm_tool_fusion import (
+    ToolCaller, process_tool_calls, resume_tool_calls, resume_tool_calls_async,
+    FileCheckpointStore, SQLiteCheckpointStore
+)
+from tests.helpers import make_response, make_tool_call
+
+def make_manager(calls):
+    manager = ToolCaller()
+
+    @manager.tool
+    def fetch(key: str) -> str:
+        """
+        Fetch
+
+        Args:
+            key (str): key
+        Returns:
+            str: value
+        """
+        calls.append(key)
+        return f"value of {key}"
+
+    return manager
+
+@pytest.mark.parametrize("kind", ["file", "sqlite"])
+def test_checkpoint_stores(tmp_path, kind):
+    store = FileCheckpointStore(str(tmp_path)) if kind == "file" else SQLiteCheckpointStore(str(tmp_path / "runs.db"))
+    assert store.load("run-1") is None
+    store.save("run-1", '{"a": 1}')
+    store.save("run-1", '{"a": 2}')
+    assert store.load("run-1") == '{"a": 2}'
+    store.delete("run-1")
+    store.delete("run-1")
+    assert store.load("run-1") is None
+
+def test_file_store_rejects_paths(tmp_path):
+    store = FileCheckpointStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.save("../escape", "{}")
+
+def test_resume_does_not_repeat_tools(tmp_path):
+    calls = []
+    manager = make_manager(calls)
+    store = SQLiteCheckpointStore(str(tmp_path / "runs.db"))
+    responses = [make_response([make_tool_call("fetch", {"key": "b"}, id="call_2")])]
+
+    def failing_llm(model, messages, tools):
+        if not responses:
+            raise RuntimeError("provider down")
+        return responses.pop(0)
+
+    messages = [{"role": "user", "content": "q"}]
+    with pytest.raises(RuntimeError):
+        process_tool_calls(
+            make_response([make_tool_call("fetch", {"key": "a"}, id="call_1")]), messages, manager, "model", failing_llm,
+            checkpoint_store=store, run_id="run-1"
+        )
+    assert calls == ["a", "b"]
+    assert json.loads(store.load("run-1"))["chain_count"] == 2
+
+    sent = []
+
+    def llm_call_fn(model, messages, tools):
+        sent.append(list(messages))
+        return make_response(content="done")
+
+    final = resume_tool_calls("run-1", store, manager, "model", llm_call_fn, clean_messages=True)
+    assert final == "done"
+    assert calls == ["a", "b"]
+    assert [message["content"] for message in sent[0] if message["role"] == "tool"] == ['"value of a"', '"value of b"']
+    assert store.load("run-1") is None
+
+def test_resume_async_without_checkpoint(tmp_path):
+    store = FileCheckpointStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        asyncio.run(resume_tool_calls_async("missing", store, make_manager([]), "model", lambda *args: None))
+
+def test_checkpoint_requires_run_id(tmp_path):
+    with pytest.raises(ValueError):
+        process_tool_calls(
+            make_response(), [], make_manager([]), "model", lambda *args: None,
+            checkpoint_store=FileCheckpointStore(str(tmp_path))
+        )
+
+def test_resume_restores_budgets_repeats_and_reuse(tmp_path):
+    calls = []
+    manager = make_manager(calls)
+    store = FileCheckpointStore(str(tmp_path))
+    responses = [make_response([make_tool_call("fetch", {"key": "b"}, id="call_2")])]
+    responses[0].usage = types.SimpleNamespace(total_tokens=100)
+
+    def failing_llm(model, messages, tools):
+        if not responses:
+            raise RuntimeError("provider down")
+        return responses.pop(0)
+
+    options = dict(max_tool_calls=3, reuse_repeated_results=True, repeat_threshold=5)
+    with pytest.raises(RuntimeError):
+        process_tool_calls(
+            make_response([make_tool_call("fetch", {"key": "a"}, id="call_1")]), [{"role": "user", "content": "q"}],
+            manager, "model", failing_llm, checkpoint_store=store, run_id="run-1", **options
+        )
+    state = json.loads(store.load("run-1"))
+    assert state["tool_calls_count"] == 2 and state["total_tokens"] == 100
+    assert len(state["call_counts"]) == 2 and len(state["previous_results"]) == 2
+
+    turns = [
+        make_response([make_tool_call("fetch", {"key": "a"}, id="call_3")]),
+        make_response([make_tool_call("fetch", {"key": "c"}, id="call_4")]),
+    ]
+    sent = []
+
+    def llm_call_fn(model, messages, tools, **kwargs):
+        sent.append(list(messages))
+        return turns.pop(0) if turns else make_response(content="done")
+
+    final = resume_tool_calls("run-1", store, manager, "model", llm_call_fn, clean_messages=True, **options)
+    assert final == "done"
+    # "a" reutiliza o resultado salvo e "c" excederia o orçamento restaurado (2 + 1 + 1 > 3)
+    assert calls == ["a", "b"]
+    assert sent[1][-1]["content"] == '"value of a"'
+    assert "tool call budget" in sent[-1][-1]["content"]
+
+def test_checkpoint_keeps_openai_tool_call_ids():
+    from llm_tool_fusion._checkpoint import _serializable_messages
+
+    tool_call = types.SimpleNamespace(id="call_1", type="function", function=types.SimpleNamespace(name="fetch", arguments='{"key": "a"}'))
+    message = types.SimpleNamespace(role="assistant", content=None, tool_calls=[tool_call])
+    serialized = _serializable_messages([message, {"role": "tool", "tool_call_id": "call_1", "content": "x"}])
+    assert serialized[0]["tool_calls"] == [
+        {"id": "call_1", "type": "function", "function": {"name": "fetch", "arguments": '{"key": "a"}'}}
+    ]
@@ -0,0 +1,190 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import pytest
+from llm_tool_fusion import ToolCaller, JsonCodec, benchmark_codecs, process_tool_calls
+from llm_tool_fusion import _codec
+from tests.helpers import make_response, make_tool_call
+
+def test_json_codec_stdlib():
+    value = {"a": [1, 2], "b": "ç"}
+    codec = JsonCodec(backend="json")
+    assert codec.dumps(value) == json.dumps(value)
+    assert codec.dumps(value, compact=True) == json.dumps(value, separators=(",", ":"))
+    assert JsonCodec(backend="json", compact=True).dumps(value) == json.dumps(value, separators=(",", ":"))
+    assert codec.loads(codec.dumps(value)) == value
+
+def test_json_codec_auto_round_trip():
+    value = {"rows": [{"id": i, "name": f"item {i}"} for i in range(10)]}
+    codec = JsonCodec()
+    assert codec.backend in _codec._available_backends()
+    assert codec.loads(codec.dumps(value)) == value
+
+def test_json_codec_invalid_backend():
+    with pytest.raises(ValueError):
+        JsonCodec(backend="yaml")
+    missing = [backend for backend in ("orjson", "msgspec") if backend not in _codec._available_backends()]
+    for backend in missing:
+        with pytest.raises(ValueError):
+            JsonCodec(backend=backend)
+
+def test_benchmark_codecs():
+    results = benchmark_codecs({"rows": list(range(100))}, iterations=5)
+    assert "json" in results and "json (compact)" in results
+    assert results["json (compact)"]["size"] < results["json"]["size"]
+    assert all(result["dumps"] >= 0 and result["loads"] >= 0 for result in results.values())
+
+def test_tool_caller_uses_json_codec():
+    manager = ToolCaller(json_codec=JsonCodec(backend="json", compact=True))
+
+    @manager.tool
+    def rows(n: int) -> list:
+        """
+        Rows
+
+        Args:
+            n (int): count
+        Returns:
+            list: rows
+        """
+        return [{"id": i} for i in range(n)]
+
+    messages = []
+    process_tool_calls(
+        make_response([make_tool_call("rows", {"n": 2})]), messages, manager, "model",
+        lambda model, messages, tools: make_response()
+    )
+    assert messages[-1]["content"] == '[{"id":0},{"id":1}]'
+
+    manager.set_json_codec(None)
+    assert manager.get_json_codec().backend == "json" and not manager.get_json_codec().compact
+
+def test_result_encoders_default_types():
+    import dataclasses
+    import datetime
+    import enum
+    import uuid
+    from decimal import Decimal
+
+    class Color(enum.Enum):
+        RED = "red"
+
+    @dataclasses.dataclass
+    class Point:
+        x: int
+        when: datetime.date
+
+    class FakeArray:
+        # Duck typing de arrays NumPy
+        dtype = "int64"
+
+        def tolist(self):
+            return [[1, 2], [3, 4]]
+
+    codec = JsonCodec(backend="json")
+    value = {
+        "point": Point(1, datetime.date(2024, 1, 2)),
+        "at": datetime.datetime(2024, 1, 2, 3, 4, 5),
+        "price": Decimal("1.10"),
+        "raw": b"abc",
+        "binary": b"\xff\x00",
+        "id": uuid.UUID(int=1),
+        "color": Color.RED,
+        "tags": {"a"},
+        "matrix": FakeArray(),
+    }
+    assert json.loads(codec.dumps(value)) == {
+        "point": {"x": 1, "when": "2024-01-02"},
+        "at": "2024-01-02T03:04:05",
+        "price": "1.10",
+        "raw": "abc",
+        "binary": "/wA=",
+        "id": "00000000-0000-0000-0000-000000000001",
+        "color": "red",
+        "tags": ["a"],
+        "matrix": [[1, 2], [3, 4]],
+    }
+    with pytest.raises(TypeError):
+        codec.dumps(object())
+
+def test_register_result_encoder_both_frameworks():
+    import datetime
+
+    class Money:
+        def __init__(self, amount):
+            self.amount = amount
+
+    class Euro(Money):
+        pass
+
+    for framework, expected in [("openai", '"10 EUR"'), ("ollama", '"10 EUR"')]:
+        manager = ToolCaller(framework=framework)
+        manager.register_result_encoder(Money, lambda money: f"{money.amount} EUR")
+        assert manager._format_tool_result("price", Euro(10)) == expected
+        assert manager._format_tool_result("when", datetime.date(2024, 1, 2)) == '"2024-01-02"'
+    # Os encoders são por ToolCaller
+    assert not ToolCaller().get_json_codec().encoders.handles(Money(1))
+
+@pytest.mark.parametrize("backend", _codec._available_backends())
+def test_json_codec_matches_stdlib_for_keys_and_big_ints(backend):
+    codec = JsonCodec(backend=backend)
+    values = [
+        {1: "a", 2: {3: "b"}},
+        {1.5: "x", None: 1, True: 2},
+        {"big": 2 ** 70, "negative": -2 ** 65, "rows": [2 ** 64]},
+    ]
+    for value in values:
+        assert json.loads(codec.dumps(value)) == json.loads(json.dumps(value))
+
+@pytest.mark.parametrize("backend", _codec._available_backends())
+def test_json_codec_nan(backend):
+    value = {"nan": float("nan"), "inf": float("inf")}
+    decoded = json.loads(JsonCodec(backend=backend).dumps(value))
+    if backend == "json":
+        assert decoded["nan"] != decoded["nan"] and decoded["inf"] == float("inf")
+    else:
+        assert decoded == {"nan": None, "inf": None}
+
+@pytest.mark.parametrize("backend", _codec._available_backends())
+def test_json_codec_registered_encoders_win_on_every_backend(backend):
+    import dataclasses
+    import datetime
+    import enum
+    import uuid
+
+    class Color(enum.Enum):
+        RED = "red"
+
+    @dataclasses.dataclass
+    class Point:
+        x: int
+        raw: bytes
+
+    value = {
+        "point": Point(1, b"\xff"),
+        "points": [Point(2, b"abc")],
+        "at": datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+        "day": datetime.date(2024, 1, 2),
+        "elapsed": datetime.timedelta(minutes=1),
+        "raw": b"abc",
+        "id": uuid.UUID(int=1),
+        "color": Color.RED,
+    }
+    stdlib = JsonCodec(backend="json")
+    codec = JsonCodec(backend=backend)
+    assert json.loads(codec.dumps(value)) == json.loads(stdlib.dumps(value))
+
+    for encoders in (stdlib.encoders, codec.encoders):
+        encoders.register(Point, lambda point: f"point {point.x}")
+        encoders.register(datetime.datetime, lambda at: at.hour)
+        encoders.register(datetime.date, lambda day: day.year)
+        encoders.register(bytes, len)
+        encoders.register(uuid.UUID, lambda id_: id_.int)
+        encoders.register(Color, lambda color: color.name)
+    decoded = json.loads(codec.dumps(value))
+    assert decoded == json.loads(stdlib.dumps(value))
+    assert decoded["point"] == "point 1" and decoded["at"] == 3 and decoded["day"] == 2024 and decoded["raw"] == 3
+    assert decoded["id"] == 1 and decoded["color"] == "RED"
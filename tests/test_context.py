@@ -0,0 +1,144 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+from llm_tool_fusion import ToolCaller, ContextBudget, json_extract, process_tool_calls
+from tests.helpers import make_response, make_tool_call
+
+def build_history(turns, result_size=400):
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "question"}]
+    for i in range(turns):
+        messages.append({"role": "assistant", "content": "", "tool_calls": [{"id": f"id{i}"}]})
+        messages.append({"role": "tool", "tool_call_id": f"id{i}", "content": "x" * result_size})
+    return messages
+
+def test_context_budget_keeps_messages_within_budget():
+    budget = ContextBudget(max_tokens=10_000)
+    messages = build_history(2)
+    assert budget.apply(messages) is messages
+
+def test_context_budget_elides_old_tool_results_first():
+    messages = build_history(4)
+    budget = ContextBudget(max_tokens=250)
+    trimmed = budget.apply(messages)
+    assert len(trimmed) == len(messages)
+    assert budget.estimate(trimmed) <= 250
+    assert trimmed[3]["content"].startswith("[Tool result elided")
+    assert trimmed[3]["tool_call_id"] == "id0"
+    # O turno mais recente e o histórico original não são alterados
+    assert trimmed[-1]["content"] == "x" * 400
+    assert messages[3]["content"] == "x" * 400
+    assert budget.get_stats()["elided"] >= 1
+
+def test_context_budget_drops_whole_turns():
+    messages = build_history(6)
+    budget = ContextBudget(max_tokens=140, token_estimator=len)
+    trimmed = budget.apply(messages)
+    assert trimmed[:2] == messages[:2]
+    assert trimmed[-2:] == messages[-2:]
+    assert budget.get_stats()["dropped"] >= 1
+    # Cada mensagem 'tool' continua precedida pelo assistant que a originou
+    for i, message in enumerate(trimmed):
+        if message["role"] == "tool":
+            assert trimmed[i - 1]["role"] == "assistant"
+            assert trimmed[i - 1]["tool_calls"][0]["id"] == message["tool_call_id"]
+
+def test_process_tool_calls_sends_trimmed_history(capsys):
+    manager = ToolCaller()
+
+    @manager.tool
+    def big(i: int) -> str:
+        """
+        Big result
+
+        Args:
+            i (int): index
+        Returns:
+            str: result
+        """
+        return "y" * 2000
+
+    sent = []
+    responses = [make_response([make_tool_call("big", {"i": 1}, id="id1")]), make_response()]
+
+    def llm_call_fn(model, messages, tools):
+        sent.append(messages)
+        return responses.pop(0)
+
+    messages = [{"role": "user", "content": "question"}]
+    process_tool_calls(
+        make_response([make_tool_call("big", {"i": 0})]), messages, manager, "model", llm_call_fn,
+        context_budget=ContextBudget(max_tokens=700), verbose=True
+    )
+    assert capsys.readouterr().out.count("Context trimmed") == 1
+    # A primeira chamada cabe no orçamento; na segunda, o resultado antigo é removido
+    assert json.dumps("y" * 2000) in [message["content"] for message in sent[0]]
+    assert sent[1][2]["content"].startswith("[Tool result elided")
+    assert sent[1][-1]["content"] == json.dumps("y" * 2000)
+    assert messages[2]["content"] == json.dumps("y" * 2000)
+
+def test_verbose_logs_only_real_trimming(capsys):
+    manager = ToolCaller()
+
+    @manager.tool
+    def small(i: int) -> str:
+        """
+        Small result
+
+        Args:
+            i (int): index
+        Returns:
+            str: result
+        """
+        return "ok"
+
+    responses = [make_response([make_tool_call("small", {"i": 1}, id="id1")]), make_response()]
+    process_tool_calls(
+        make_response([make_tool_call("small", {"i": 0})]), [{"role": "user", "content": "q"}], manager, "model",
+        lambda model, messages, tools: responses.pop(0),
+        context_budget=ContextBudget(max_tokens=10000), compact_messages=True, dedupe_tool_results=True, verbose=True
+    )
+    assert "Context trimmed" not in capsys.readouterr().out
+
+def test_context_budget_compactor_is_cached_by_content():
+    calls = []
+
+    def compactor(content, tool_name):
+        calls.append(tool_name)
+        return "summary"
+
+    messages = build_history(3)
+    for message in messages:
+        if message["role"] == "tool":
+            message["name"] = "search"
+    budget = ContextBudget(max_tokens=10_000, compactor=compactor, compact_threshold=200, min_compact_tokens=50)
+    trimmed = budget.apply(messages)
+    assert [message["content"] for message in trimmed if message["role"] == "tool"] == ["summary", "summary", "x" * 400]
+    # Os resultados antigos têm o mesmo conteúdo: um único resumo calculado
+    assert calls == ["search"]
+    budget.apply(messages)
+    assert calls == ["search"]
+    assert budget.get_stats()["compacted"] == 4
+
+def test_context_budget_async_compactor():
+    import asyncio
+
+    async def compactor(content, tool_name):
+        return "async summary"
+
+    budget = ContextBudget(max_tokens=10_000, compactor=compactor, compact_threshold=200, min_compact_tokens=50)
+    trimmed = asyncio.run(budget.apply_async(build_history(2)))
+    assert trimmed[3]["content"] == "async summary"
+
+def test_json_extract():
+    content = json.dumps({"items": [{"id": i, "text": "t" * 200} for i in range(10)], "total": 10})
+    summary = json_extract(content, max_items=2, max_string=10)
+    assert summary.startswith("[Summary] ")
+    assert len(summary) < len(content) / 5
+    extracted = json.loads(summary[len("[Summary] "):])
+    assert extracted["total"] == 10
+    assert extracted["items"][0] == {"id": 0, "text": "tttttttttt... (200 chars)"}
+    assert extracted["items"][-1] == "... 8 more items"
+    assert json_extract("plain text") == "[Summary] plain text"
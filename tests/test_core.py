@@ -268,4 +268,292 @@ def test_process_tool_calls_tool_error():
     assert len(tool_messages) > 0
     error_content = json.loads(tool_messages[0]['content'])
     assert error_message in error_content
-    assert isinstance(result, DummyResponse) 
\ No newline at end of file
+    assert isinstance(result, DummyResponse)
+
+def test_process_tool_calls_async_generator_tool():
+    caller = ToolCaller()
+    chunks = []
+
+    @caller.async_tool
+    async def long_report(topic):
+        for section in ("intro", "body", "end"):
+            yield f"{topic}:{section} "
+
+    tool_calls = [DummyToolCall('long_report', '{"topic": "sales"}')]
+    messages = []
+    process_tool_calls(
+        DummyResponse(tool_calls),
+        messages,
+        caller,
+        model='fake',
+        llm_call_fn=lambda **kwargs: DummyResponse(),
+        on_tool_chunk=lambda name, chunk: chunks.append(chunk),
+        stream_max_chars=20
+    )
+
+    assert chunks == ["sales:intro ", "sales:body "]
+    content = json.loads(messages[-1]['content'])
+    assert content.startswith("sales:intro sales:bo")
+    assert "output truncated" in content
+
+def test_canonical_tools_order_and_fingerprint():
+    def make_caller(names, canonical=True):
+        caller = ToolCaller(canonical_tools=canonical)
+        for name in names:
+            def tool(a: int, b: int) -> int:
+                """Soma
+                Args:
+                    a (int): primeiro
+                    b (int): segundo
+                Returns:
+                    int
+                """
+                return a + b
+            tool.__name__ = name
+            caller.register_tool(tool)
+        return caller
+
+    first = make_caller(["zeta", "alpha"])
+    second = make_caller(["alpha", "zeta"])
+    tools = first.get_tools()
+    assert [tool["function"]["name"] for tool in tools] == ["alpha", "zeta"]
+    assert list(tools[0]) == ["function", "type"]
+    assert json.dumps(tools) == json.dumps(second.get_tools())
+    assert first.get_tools() is tools
+    assert first.get_tools_fingerprint() == second.get_tools_fingerprint()
+
+    legacy = make_caller(["zeta", "alpha"], canonical=False)
+    assert [tool["function"]["name"] for tool in legacy.get_tools()] == ["zeta", "alpha"]
+    assert legacy.get_tools_fingerprint() != first.get_tools_fingerprint()
+
+    first.register_tool(lambda: None)
+    assert first.get_tools_fingerprint() != second.get_tools_fingerprint()
+
+def test_stable_prefix():
+    caller = ToolCaller()
+
+    @caller.tool
+    def foo(x: int) -> int:
+        """Soma 1 ao valor
+        Args:
+            x (int): valor de entrada
+        Returns:
+            int
+        """
+        return x + 1
+
+    sent = []
+    responses = [DummyResponse([DummyToolCall('foo', '{"x": 2}', id="id2")]), DummyResponse()]
+
+    def llm_call_fn(model, messages, tools):
+        sent.append(list(messages))
+        return responses.pop(0)
+
+    messages = [{"role": "user", "content": "q"}]
+    process_tool_calls(
+        DummyResponse([DummyToolCall('foo', '{"x": 1}')]), messages, caller, 'fake', llm_call_fn,
+        stable_prefix=True, compact_messages=True
+    )
+    assert sent[1][:len(sent[0])] == sent[0]
+
+    def rewriting_llm_call_fn(model, messages, tools):
+        messages[0] = {"role": "user", "content": "changed"}
+        return DummyResponse([DummyToolCall('foo', '{"x": 1}')])
+
+    with pytest.raises(RuntimeError):
+        process_tool_calls(
+            DummyResponse([DummyToolCall('foo', '{"x": 1}')]), [{"role": "user", "content": "q"}], caller, 'fake',
+            rewriting_llm_call_fn, stable_prefix=True
+        )
+
+    with pytest.raises(ValueError):
+        process_tool_calls(DummyResponse(), [], caller, 'fake', llm_call_fn, stable_prefix=True, dedupe_tool_results=True)
+
+def test_budgets_force_final_answer():
+    caller = ToolCaller()
+    executed = []
+
+    @caller.tool
+    def foo(x: int) -> int:
+        """Soma 1 ao valor
+        Args:
+            x (int): valor de entrada
+        Returns:
+            int
+        """
+        executed.append(x)
+        return x + 1
+
+    calls = []
+
+    def looping_llm_call_fn(model, messages, tools, **kwargs):
+        calls.append((len(tools), kwargs))
+        response = DummyResponse([DummyToolCall('foo', '{"x": 1}')])
+        response.usage = types.SimpleNamespace(total_tokens=100)
+        return response
+
+    messages = []
+    result = process_tool_calls(
+        DummyResponse([DummyToolCall('foo', '{"x": 1}')]), messages, caller, 'fake', looping_llm_call_fn,
+        max_tool_calls=2, final_answer_mode="drop_tools"
+    )
+    assert executed == [1, 1]
+    assert calls[-1] == (0, {}) and all(count == 1 for count, _ in calls[:-1])
+    assert "tool call budget (2 calls)" in messages[-1]["content"]
+    assert isinstance(result, DummyResponse)
+
+    calls.clear()
+    process_tool_calls(
+        DummyResponse([DummyToolCall('foo', '{"x": 1}')]), [], caller, 'fake', looping_llm_call_fn,
+        max_total_tokens=250, final_answer_mode="tool_choice"
+    )
+    assert len(calls) == 4 and calls[-1] == (1, {"tool_choice": "none"})
+
+    calls.clear()
+    executed.clear()
+    process_tool_calls(
+        DummyResponse([DummyToolCall('foo', '{"x": 1}')]), [], caller, 'fake', looping_llm_call_fn, max_wall_time=0
+    )
+    assert executed == [] and len(calls) == 1
+
+    with pytest.raises(ValueError):
+        process_tool_calls(DummyResponse(), [], caller, 'fake', looping_llm_call_fn, final_answer_mode="stop")
+
+def test_final_answer_mode_survives_deferred_job_wait():
+    import asyncio
+    import threading
+    from llm_tool_fusion._core import process_tool_calls_async
+
+    caller = ToolCaller()
+    release = threading.Event()
+
+    @caller.deferred_tool
+    def report(x: int) -> int:
+        """Relatório demorado
+        Args:
+            x (int): valor de entrada
+        Returns:
+            int
+        """
+        release.wait(5)
+        return x * 10
+
+    calls = []
+
+    def looping_llm_call_fn(model, messages, tools, **kwargs):
+        calls.append((len(tools), kwargs))
+        # O job termina só depois da chamada final, com a sessão já encerrando
+        if len(calls) == 2:
+            release.set()
+        return DummyResponse([DummyToolCall('report', '{"x": 1}')])
+
+    async def async_looping_llm_call_fn(model, messages, tools, **kwargs):
+        return looping_llm_call_fn(model, messages, tools, **kwargs)
+
+    messages = []
+    process_tool_calls(
+        DummyResponse([DummyToolCall('report', '{"x": 1}')]), messages, caller, 'fake', looping_llm_call_fn,
+        max_tool_calls=1, final_answer_mode="drop_tools"
+    )
+    # Depois do limite, a espera pelos jobs não devolve as ferramentas ao modelo
+    assert calls == [(2, {}), (0, {}), (0, {})]
+    assert "report" in messages[-1]["content"]
+
+    calls.clear()
+    release.clear()
+    asyncio.run(process_tool_calls_async(
+        DummyResponse([DummyToolCall('report', '{"x": 1}')]), [], caller, 'fake', async_looping_llm_call_fn,
+        max_tool_calls=1, final_answer_mode="tool_choice"
+    ))
+    assert calls == [(2, {}), (2, {"tool_choice": "none"}), (2, {"tool_choice": "none"})]
+
+def test_repeated_tool_calls():
+    caller = ToolCaller()
+    executed = []
+
+    @caller.tool
+    def search(query: str, limit: int) -> str:
+        """Busca
+        Args:
+            query (str): consulta
+            limit (int): máximo de resultados
+        Returns:
+            str
+        """
+        executed.append(query)
+        return f"results for {query}"
+
+    def make_llm_call_fn(turns):
+        responses = [DummyResponse([DummyToolCall('search', args, id=f"id{i}")]) for i, args in enumerate(turns)]
+
+        def llm_call_fn(model, messages, tools):
+            return responses.pop(0) if responses else DummyResponse()
+        return llm_call_fn
+
+    repeats = ['{"limit": 5, "query": "x"}', '{"query": "x", "limit": 5}', '{"query": "x", "limit": 5}']
+    messages = []
+    process_tool_calls(
+        DummyResponse([DummyToolCall('search', '{"query": "x", "limit": 5}')]), messages, caller, 'fake',
+        make_llm_call_fn(repeats), reuse_repeated_results=True, repeat_threshold=2
+    )
+    assert executed == ["x"]
+    assert [message["content"] for message in messages if message["role"] == "tool"] == ['"results for x"'] * 4
+    warnings = [message for message in messages if message["role"] == "system"]
+    assert len(warnings) == 2 and "called search repeatedly" in warnings[0]["content"]
+
+    executed.clear()
+    messages = []
+    process_tool_calls(
+        DummyResponse([DummyToolCall('search', '{"query": "x", "limit": 5}')]), messages, caller, 'fake',
+        make_llm_call_fn(repeats), repeat_threshold=1, repeat_action="stop", max_chained_calls=10
+    )
+    assert executed == ["x"]
+    assert "search were called repeatedly" in messages[-1]["content"]
+
+    with pytest.raises(ValueError):
+        process_tool_calls(DummyResponse(), [], caller, 'fake', make_llm_call_fn([]), repeat_action="ignore")
+
+def test_repeated_async_poll_tool_calls_reuse_results():
+    import asyncio
+    from llm_tool_fusion._core import process_tool_calls_async
+
+    caller = ToolCaller()
+    executed = []
+
+    @caller.async_tool
+    async def fetch(url: str) -> str:
+        """Busca uma página
+        Args:
+            url (str): endereço
+        Returns:
+            str
+        """
+        executed.append(url)
+        return f"page {url}"
+
+    def make_responses():
+        return [DummyResponse([DummyToolCall('fetch', '{"url": "a"}', id="id1")]), DummyResponse()]
+
+    responses = make_responses()
+
+    def llm_call_fn(model, messages, tools):
+        return responses.pop(0)
+
+    async def async_llm_call_fn(model, messages, tools):
+        return responses.pop(0)
+
+    messages = []
+    process_tool_calls(
+        DummyResponse([DummyToolCall('fetch', '{"url": "a"}')]), messages, caller, 'fake', llm_call_fn,
+        use_async_poll=True, reuse_repeated_results=True
+    )
+    assert executed == ["a"]
+    assert [message["content"] for message in messages if message["role"] == "tool"] == ['"page a"'] * 2
+
+    executed.clear()
+    responses = make_responses()
+    asyncio.run(process_tool_calls_async(
+        DummyResponse([DummyToolCall('fetch', '{"url": "a"}')]), [], caller, 'fake', async_llm_call_fn,
+        use_async_poll=True, reuse_repeated_results=True
+    ))
+    assert executed == ["a"]
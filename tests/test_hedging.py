@@ -0,0 +1,102 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import pytest
+from llm_tool_fusion._core import ToolCaller, process_tool_calls_async
+from llm_tool_fusion._hedging import LatencyStats, HedgingPolicy, _run_hedged
+from tests.helpers import make_response, make_tool_call
+
+def test_latency_stats_and_policy_delay():
+    stats = LatencyStats(window=100)
+    for i in range(1, 101):
+        stats.record(i / 100)
+    assert stats.percentile(50) == pytest.approx(0.5, abs=0.02)
+    assert stats.percentile(95) == pytest.approx(0.95, abs=0.02)
+
+    policy = HedgingPolicy(percentile=95, min_samples=200, initial_delay=0.2)
+    assert policy.delay(stats) == 0.2
+    policy.min_samples = 10
+    assert policy.delay(stats) == pytest.approx(0.95, abs=0.02)
+
+    with pytest.raises(ValueError):
+        HedgingPolicy(percentile=0)
+
+def test_run_hedged_cancels_loser():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+            return "slow"
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def fast():
+        await asyncio.sleep(0.01)
+        return "fast"
+
+    async def main():
+        stats = LatencyStats()
+        result = await _run_hedged(slow, fast, delay=0.02, stats=stats)
+        await asyncio.sleep(0)
+        return result, stats
+
+    result, stats = asyncio.run(main())
+    assert result == "fast"
+    assert cancelled == [True]
+    assert (stats.hedges, stats.hedge_wins) == (1, 1)
+
+def test_run_hedged_without_hedge_and_on_failure():
+    async def quick():
+        return "quick"
+
+    async def failing():
+        raise RuntimeError("down")
+
+    async def backup():
+        await asyncio.sleep(0.02)
+        return "backup"
+
+    assert asyncio.run(_run_hedged(quick, backup, delay=0.1)) == "quick"
+    # Se a primária falha depois do hedge, a secundária ainda pode vencer
+    async def failing_late():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("down")
+    assert asyncio.run(_run_hedged(failing_late, backup, delay=0.01)) == "backup"
+
+def test_set_hedging_with_fallback_in_process_tool_calls_async():
+    caller = ToolCaller()
+
+    async def replica(query):
+        return f"replica:{query}"
+
+    @caller.async_tool
+    async def search(query):
+        await asyncio.sleep(0.5)
+        return f"primary:{query}"
+
+    @caller.tool
+    def ping():
+        return "pong"
+
+    caller.set_hedging("search", HedgingPolicy(fallback=replica, initial_delay=0.02))
+
+    async def llm_call_fn(**kwargs):
+        return make_response()
+
+    messages = []
+    tool_calls = [make_tool_call('search', {"query": "q"}, id="a"), make_tool_call('ping', {}, id="b")]
+    asyncio.run(process_tool_calls_async(make_response(tool_calls), messages, caller,
+                                         model='fake', llm_call_fn=llm_call_fn, use_async_poll=True))
+
+    assert json.loads(messages[-1]['content']) == "replica:q"
+    stats = caller.get_tool_stats()
+    assert stats['search']['hedge_wins'] == 1
+    assert stats['search']['count'] == 1
+    assert stats['ping']['count'] == 1
+    assert stats['search']['p95'] < 0.5
@@ -0,0 +1,189 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import types
+from llm_tool_fusion import ToolCaller, process_tool_calls
+from llm_tool_fusion._history import ContentInterner, _dedupe_tool_results
+from tests.helpers import make_response, make_tool_call
+
+def test_content_interner_shares_strings():
+    interner = ContentInterner(max_entries=2, min_chars=4)
+    first = "".join(["abc", "def"])
+    second = "".join(["abc", "def"])
+    assert first is not second
+    assert interner.intern(first) is first
+    assert interner.intern(second) is first
+    assert interner.intern("ab") == "ab"
+    assert interner.get_stats() == {"entries": 1, "chars": 6, "hits": 1}
+    interner.intern("x" * 10)
+    interner.intern("y" * 10)
+    assert len(interner) == 2
+
+def test_content_interner_caps_total_chars():
+    interner = ContentInterner(min_chars=4, max_chars=25)
+    interner.intern("a" * 10)
+    interner.intern("b" * 10)
+    interner.intern("c" * 10)
+    assert len(interner) == 2 and interner.get_stats()["chars"] == 20
+    big = "d" * 30
+    assert interner.intern(big) is big and len(interner) == 2
+
+def test_dedupe_tool_results():
+    big = "z" * 300
+    messages = [
+        {"role": "user", "content": "q"},
+        {"role": "tool", "tool_call_id": "call_1", "name": "dump", "content": big},
+        {"role": "tool", "tool_call_id": "call_2", "name": "dump", "content": big},
+        {"role": "tool", "name": "dump", "content": "small"},
+    ]
+    deduped = _dedupe_tool_results(messages)
+    assert deduped[1]["content"] == big
+    assert deduped[2] == {"role": "tool", "tool_call_id": "call_2", "name": "dump", "content": "[Same result as tool_call 'call_1']"}
+    assert messages[2]["content"] == big
+    without_repeats = messages[:2]
+    assert _dedupe_tool_results(without_repeats) is without_repeats
+
+    ollama = [{"role": "tool", "name": "dump", "content": big}, {"role": "tool", "name": "dump", "content": big}]
+    assert _dedupe_tool_results(ollama)[1]["content"] == "[Same result as the earlier 'dump' call]"
+
+def test_process_tool_calls_interns_only_when_enabled():
+    manager = ToolCaller()
+
+    @manager.tool
+    def dump() -> str:
+        """
+        Config dump
+
+        Returns:
+            str: config
+        """
+        return "".join(["config=", "v" * 500])
+
+    sent = []
+    responses = [make_response([make_tool_call("dump", {}, id="call_2")]), make_response()]
+
+    def llm_call_fn(model, messages, tools):
+        sent.append(messages)
+        return responses.pop(0)
+
+    messages = []
+    process_tool_calls(
+        make_response([make_tool_call("dump", {}, id="call_1")]), messages, manager, "model", llm_call_fn,
+        dedupe_tool_results=True, intern_tool_results=True
+    )
+    tool_messages = [message for message in messages if message["role"] == "tool"]
+    assert tool_messages[0]["content"] is tool_messages[1]["content"]
+    assert sent[-1][-1]["content"] == "[Same result as tool_call 'call_1']"
+
+    # Desativado por padrão e sem estado compartilhado entre conversas
+    responses = [make_response([make_tool_call("dump", {}, id="call_2")]), make_response()]
+    other = []
+    process_tool_calls(make_response([make_tool_call("dump", {}, id="call_1")]), other, manager, "model", llm_call_fn)
+    tool_messages = [message for message in other if message["role"] == "tool"]
+    assert tool_messages[0]["content"] == tool_messages[1]["content"]
+    assert tool_messages[0]["content"] is not tool_messages[1]["content"]
+    assert tool_messages[0]["content"] is not messages[1]["content"]
+
+def test_compact_message_mapping_and_size():
+    from llm_tool_fusion._history import CompactMessage, _materialize
+
+    message = CompactMessage("tool", "result", name="search", tool_call_id="call_1")
+    as_dict = {"role": "tool", "tool_call_id": "call_1", "name": "search", "content": "result"}
+    assert not hasattr(message, "__dict__")
+    assert message == as_dict and as_dict == message
+    assert message["content"] == "result" and message.get("tool_calls") is None
+    assert {**message, "content": "x"}["name"] == "search"
+    assert sys.getsizeof(message) < sys.getsizeof(as_dict)
+    assert message.role is CompactMessage("tool").role
+
+    plain = [{"role": "user", "content": "q"}]
+    assert _materialize(plain) is plain
+    materialized = _materialize(plain + [message])
+    assert type(materialized[1]) is dict and materialized[1] == as_dict
+
+def test_process_tool_calls_compact_messages_ollama():
+    from llm_tool_fusion._history import CompactMessage
+
+    manager = ToolCaller(framework="ollama")
+
+    @manager.tool
+    def add(a: int, b: int) -> int:
+        """
+        Add
+
+        Args:
+            a (int): first
+            b (int): second
+        Returns:
+            int: sum
+        """
+        return a + b
+
+    tool_call = types.SimpleNamespace(function=types.SimpleNamespace(name="add", arguments={"a": 1, "b": 2}))
+    first = types.SimpleNamespace(message=types.SimpleNamespace(role="assistant", content="", tool_calls=[tool_call], raw="big"))
+    final = types.SimpleNamespace(message=types.SimpleNamespace(role="assistant", content="3", tool_calls=None))
+    sent = []
+
+    def llm_call_fn(model, messages, tools):
+        sent.append(messages)
+        return final
+
+    messages = [{"role": "user", "content": "1+2?"}]
+    process_tool_calls(first, messages, manager, "model", llm_call_fn, compact_messages=True)
+    assert all(isinstance(message, CompactMessage) for message in messages[1:])
+    # A mensagem do provedor não é mantida: só conteúdo e chamadas de ferramentas
+    assert messages[1] == {"role": "assistant", "content": "", "tool_calls": [{"function": {"name": "add", "arguments": {"a": 1, "b": 2}}}]}
+    assert messages[2] == {"role": "tool", "name": "add", "content": "3"}
+    assert all(type(message) is dict for message in sent[0])
+
+def test_conversation_log_structural_sharing():
+    from llm_tool_fusion import ConversationLog
+
+    base = ConversationLog([{"role": "user", "content": "q"}])
+    first = base.append({"role": "assistant", "content": "a"})
+    second = base.extend([{"role": "assistant", "content": "b"}, {"role": "user", "content": "c"}])
+    assert len(base) == 1 and len(first) == 2 and len(second) == 3
+    assert first[0] is second[0] is base[0]
+    assert second[-1]["content"] == "c" and second[1]["content"] == "b"
+    assert [message["content"] for message in second[1:]] == ["b", "c"]
+    assert base.extend([]) is base
+    assert list(first) == first.to_list()
+
+def test_process_tool_calls_with_conversation_log():
+    import asyncio
+    from llm_tool_fusion import ConversationLog, process_tool_calls_async
+
+    manager = ToolCaller()
+
+    @manager.tool
+    def echo(text: str) -> str:
+        """
+        Echo
+
+        Args:
+            text (str): text
+        Returns:
+            str: text
+        """
+        return text
+
+    base = ConversationLog([{"role": "user", "content": "q"}])
+    response, branch_a = process_tool_calls(
+        make_response([make_tool_call("echo", {"text": "a"})]), base, manager, "model",
+        lambda model, messages, tools: make_response(content="done a")
+    )
+
+    async def llm_call_fn(model, messages, tools):
+        return make_response(content="done b")
+
+    response_b, branch_b = asyncio.run(process_tool_calls_async(
+        make_response([make_tool_call("echo", {"text": "b"})]), base, manager, "model", llm_call_fn
+    ))
+    assert response.choices[0].message.content == "done a"
+    assert response_b.choices[0].message.content == "done b"
+    assert len(base) == 1
+    assert branch_a[0] is branch_b[0]
+    assert branch_a[-1]["content"] == json.dumps("a") and branch_b[-1]["content"] == json.dumps("b")
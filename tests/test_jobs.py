@@ -0,0 +1,201 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import threading
+import pytest
+from llm_tool_fusion._core import ToolCaller, process_tool_calls, process_tool_calls_async
+from llm_tool_fusion._jobs import JobManager, _make_check_job
+from tests.helpers import make_response, make_tool_call
+
+def test_job_manager_and_check_job():
+    release = threading.Event()
+    manager = JobManager(max_workers=2)
+    check_job = _make_check_job(manager)
+
+    def slow(x):
+        release.wait(5)
+        return x * 10
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    handle = manager.submit("slow", slow, {"x": 4})
+    assert "still running" in check_job(handle)
+    release.set()
+    manager.wait([handle])
+    assert check_job(handle) == 40
+    assert manager.get(handle)["delivered"]
+
+    handle = manager.submit("failing", failing, {}, is_async=True)
+    manager.wait([handle])
+    assert check_job(handle) == "Error executing tool 'failing': boom"
+    assert "Unknown job handle" in check_job("job_missing")
+    manager.shutdown()
+
+def test_job_manager_keeps_undelivered_results():
+    manager = JobManager(max_finished_jobs=1)
+    handles = [manager.submit("double", lambda x: x * 2, {"x": x}) for x in range(3)]
+    manager.wait(handles)
+    manager.submit("double", lambda x: x * 2, {"x": 3})
+    # Nenhum resultado foi entregue: todos continuam disponíveis
+    assert all(manager.done(handle) for handle in handles)
+
+    for handle in handles:
+        manager.mark_delivered(handle)
+    manager.wait([manager.submit("double", lambda x: x * 2, {"x": 4})])
+    assert [manager.get(handle) is not None for handle in handles] == [False, False, True]
+    manager.shutdown()
+
+def test_deferred_tool_returns_handle_and_injects_result():
+    caller = ToolCaller()
+    release = threading.Event()
+
+    @caller.deferred_tool
+    def build_report(name):
+        """Gera um relatório demorado
+        Args:
+            name (str): nome do relatório
+        """
+        release.wait(5)
+        return f"report {name} ready"
+
+    assert 'check_job' in caller.get_name_tools()
+    assert 'build_report' in caller.get_name_deferred_tools()
+
+    calls = []
+    def llm_call_fn(**kwargs):
+        calls.append(list(kwargs['messages']))
+        # Libera o job apenas depois que o modelo recebeu o handle
+        release.set()
+        return make_response(content="final" if len(calls) > 1 else "waiting")
+
+    messages = []
+    result = process_tool_calls(
+        make_response([make_tool_call('build_report', {"name": "q3"})]),
+        messages, caller, model='fake', llm_call_fn=llm_call_fn, clean_messages=True
+    )
+
+    assert result == "final"
+    handle_message = json.loads(calls[0][1]['content'])
+    assert "started in background with handle 'job_" in handle_message
+    injected = [m for m in messages if m.get('role') == 'system']
+    assert len(injected) == 1
+    assert "report q3 ready" in injected[0]['content']
+
+def test_deferred_async_tool_in_async_processing():
+    caller = ToolCaller()
+
+    @caller.deferred_tool
+    async def crawl(url):
+        await asyncio.sleep(0.05)
+        return {"url": url, "pages": 3}
+
+    async def llm_call_fn(**kwargs):
+        return make_response(content="done")
+
+    messages = []
+    asyncio.run(process_tool_calls_async(
+        make_response([make_tool_call('crawl', {"url": "a.com"})]),
+        messages, caller, model='fake', llm_call_fn=llm_call_fn
+    ))
+    assert '{"url": "a.com", "pages": 3}' in messages[-1]['content']
+
+def test_check_job_polling_is_not_reused_or_flagged():
+    import re
+
+    caller = ToolCaller()
+    release = threading.Event()
+
+    @caller.deferred_tool
+    def build_report(name):
+        """Gera um relatório demorado
+        Args:
+            name (str): nome do relatório
+        """
+        release.wait(5)
+        return f"report {name} ready"
+
+    calls = []
+
+    def llm_call_fn(model, messages, tools):
+        calls.append(list(messages))
+        handle = re.search(r"handle '(job_\w+)'", messages[1]["content"]).group(1)
+        if len(calls) == 2:
+            release.set()
+            caller._job_manager.wait([handle])
+        if len(calls) <= 2:
+            return make_response([make_tool_call('check_job', {"handle": handle}, id=f"poll{len(calls)}")])
+        return make_response(content="final")
+
+    messages = []
+    result = process_tool_calls(
+        make_response([make_tool_call('build_report', {"name": "q3"})]),
+        messages, caller, model='fake', llm_call_fn=llm_call_fn, clean_messages=True,
+        reuse_repeated_results=True, repeat_threshold=1
+    )
+    assert result == "final"
+    polls = [message["content"] for message in messages if message.get("name") == "check_job"]
+    assert len(polls) == 2
+    assert "still running" in polls[0]
+    assert polls[1] == '"report q3 ready"'
+    assert not any("repeatedly" in message["content"] for message in messages if message["role"] == "system")
+
+    caller.set_tool_volatile("build_report")
+    assert "build_report" in caller.get_name_volatile_tools()
+    caller.set_tool_volatile("build_report", False)
+    assert caller.get_name_volatile_tools() == {"check_job"}
+
+def test_builtin_tool_names_clash_with_user_tools():
+    from llm_tool_fusion import OutputPolicy
+
+    manager = ToolCaller()
+
+    @manager.tool
+    def check_job(handle: str) -> str:
+        """
+        Check a job in the user's system
+
+        Args:
+            handle (str): handle
+        Returns:
+            str: status
+        """
+        return "user"
+
+    # Sem ferramentas deferidas, o nome está livre
+    assert manager.get_map_tools()["check_job"] is check_job
+
+    @manager.deferred_tool
+    def slow() -> str:
+        """
+        Slow
+
+        Returns:
+            str: value
+        """
+        return "done"
+
+    with pytest.raises(ValueError, match="check_job"):
+        manager.get_map_tools()
+
+    paged = ToolCaller()
+
+    @paged.tool
+    def read_tool_result(handle: str) -> str:
+        """
+        Read
+
+        Args:
+            handle (str): handle
+        Returns:
+            str: value
+        """
+        return "user"
+
+    paged.set_output_policy(OutputPolicy(max_chars=10, paginate=True))
+    with pytest.raises(ValueError, match="read_tool_result"):
+        paged.get_tools()
@@ -0,0 +1,118 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import time
+import pytest
+from llm_tool_fusion import ToolCaller, AdaptiveLimit, process_tool_calls_async
+from tests.helpers import make_response, make_tool_call
+
+def test_adaptive_limit_additive_increase():
+    limit = AdaptiveLimit(initial_limit=2, max_limit=4)
+    for _ in range(20):
+        limit.record(0.1, time.monotonic())
+    assert limit.limit == 4
+    assert limit.get_stats()["max_concurrency"] == 4
+
+def test_adaptive_limit_multiplicative_decrease_once_per_episode():
+    limit = AdaptiveLimit(initial_limit=8)
+    started_at = time.monotonic()
+    limit.record(0.1, started_at, error=True)
+    assert limit.limit == 4
+    # Execução iniciada antes do corte não corta de novo
+    limit.record(0.1, started_at, error=True)
+    assert limit.limit == 4
+    limit.record(0.1, time.monotonic(), timeout=True)
+    assert limit.limit == 2
+    stats = limit.get_stats()
+    assert stats["errors"] == 2 and stats["timeouts"] == 1 and stats["decreases"] == 2
+
+def test_adaptive_limit_latency_degradation():
+    limit = AdaptiveLimit(initial_limit=8, latency_tolerance=2.0)
+    for _ in range(5):
+        limit.record(0.1, time.monotonic())
+    for _ in range(10):
+        limit.record(1.0, time.monotonic())
+    assert limit.limit < 8
+
+def test_adaptive_limit_async_timeout():
+    limit = AdaptiveLimit(initial_limit=4, timeout=0.01)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(limit.call_async(slow))
+    assert limit.get_stats()["timeouts"] == 1
+    assert limit.limit == 2
+
+def test_adaptive_limit_applied_to_async_poll():
+    manager = ToolCaller()
+    state = {"running": 0, "max_running": 0}
+
+    @manager.async_tool
+    async def fetch(x: int) -> int:
+        """
+        Fetch
+
+        Args:
+            x (int): value
+        Returns:
+            int: value
+        """
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+        return x
+
+    manager.set_concurrency_limit("fetch", AdaptiveLimit(initial_limit=2, max_limit=2))
+    tool_calls = [make_tool_call("fetch", {"x": i}, id=f"id{i}") for i in range(6)]
+    messages = []
+
+    async def llm_call_fn(model, messages, tools):
+        return make_response()
+
+    asyncio.run(process_tool_calls_async(
+        make_response(tool_calls), messages, manager, "model", llm_call_fn, use_async_poll=True
+    ))
+    assert state["max_running"] == 2
+    assert sorted(message["content"] for message in messages if message["role"] == "tool") == [str(i) for i in range(6)]
+    stats = manager.get_concurrency_limits()["fetch"]
+    assert stats["limit"] == 2 and stats["active"] == 0 and stats["waiting"] == 0
+
+def test_adaptive_limit_excludes_scheduler_queue_time():
+    from llm_tool_fusion import PriorityScheduler
+
+    # A fila do scheduler global (uma vaga) não pode contar como latência nem como timeout da ferramenta
+    manager = ToolCaller(scheduler=PriorityScheduler(max_concurrency=1))
+    limit = AdaptiveLimit(initial_limit=4, timeout=0.15)
+    manager.set_concurrency_limit("fetch", limit)
+
+    @manager.async_tool
+    async def fetch(x: int) -> int:
+        """
+        Fetch
+
+        Args:
+            x (int): value
+        Returns:
+            int: value
+        """
+        await asyncio.sleep(0.1)
+        return x
+
+    async def llm_call_fn(model, messages, tools):
+        return make_response(content="done")
+
+    tool_calls = [make_tool_call("fetch", {"x": i}, id=f"id{i}") for i in range(3)]
+    messages = []
+    asyncio.run(process_tool_calls_async(
+        make_response(tool_calls), messages, manager, "model", llm_call_fn, use_async_poll=True
+    ))
+    assert [message["content"] for message in messages if message["role"] == "tool"] == ["0", "1", "2"]
+    stats = limit.get_stats()
+    assert stats["timeouts"] == 0 and stats["decreases"] == 0
+    assert stats["min_latency"] < 0.15
@@ -0,0 +1,277 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import types
+import pytest
+from llm_tool_fusion._core import ToolCaller, process_tool_calls_async
+from llm_tool_fusion._llm import HedgedLLMCall
+from tests.helpers import make_response
+
+def make_backend(name, latency, fail=False, seen=None):
+    async def call(model, messages, tools):
+        if seen is not None:
+            seen.append((name, model))
+        await asyncio.sleep(latency)
+        if fail:
+            raise RuntimeError(f"{name} failed")
+        return make_response(content=name)
+    return call
+
+def test_hedged_llm_call_delay_and_stats():
+    seen = []
+    hedged = HedgedLLMCall(
+        [make_backend("primary", 0.01, seen=seen), make_backend("replica", 0.01, seen=seen)],
+        delay=0.2, names=["primary", "replica"], models=[None, "small-model"]
+    )
+    response = asyncio.run(hedged(model="big-model", messages=[], tools=[]))
+    assert response.choices[0].message.content == "primary"
+    # A réplica não chega a ser iniciada quando o primário responde antes do delay
+    assert seen == [("primary", "big-model")]
+
+    slow = HedgedLLMCall(
+        [make_backend("primary", 0.5, seen=seen), make_backend("replica", 0.01, seen=seen)],
+        delay=0.02, names=["primary", "replica"], models=[None, "small-model"]
+    )
+
+    async def run():
+        response = await slow(model="big-model", messages=[], tools=[])
+        await asyncio.sleep(0)
+        return response
+
+    assert asyncio.run(run()).choices[0].message.content == "replica"
+    assert ("replica", "small-model") in seen
+    stats = slow.get_stats()
+    assert stats["replica"]["wins"] == 1
+    assert stats["primary"]["cancelled"] == 1
+    assert stats["replica"]["mean_latency"] is not None
+
+def test_hedged_llm_call_errors():
+    hedged = HedgedLLMCall([make_backend("a", 0.01, fail=True), make_backend("b", 0.02)])
+    assert asyncio.run(hedged(model="m", messages=[], tools=[])).choices[0].message.content == "b"
+    assert hedged.get_stats()["0"]["errors"] == 1
+
+    failing = HedgedLLMCall([make_backend("a", 0.01, fail=True), make_backend("b", 0.02, fail=True)])
+    with pytest.raises(RuntimeError, match="a failed"):
+        asyncio.run(failing(model="m", messages=[], tools=[]))
+
+    with pytest.raises(ValueError):
+        HedgedLLMCall([])
+
+def test_process_tool_calls_async_with_llm_call_list():
+    caller = ToolCaller()
+    result = asyncio.run(process_tool_calls_async(
+        make_response([types.SimpleNamespace(id="1", function=types.SimpleNamespace(name="missing", arguments="{}"))]),
+        [], caller, model="m",
+        llm_call_fn=[make_backend("slow", 0.3), make_backend("fast", 0.01)],
+        clean_messages=True
+    ))
+    assert result == "fast"
+
+def test_cached_llm_call_sync_and_sqlite(tmp_path):
+    from llm_tool_fusion import CachedLLMCall, SQLiteResponseCache
+
+    calls = []
+
+    def llm_call_fn(model, messages, tools):
+        calls.append(model)
+        return make_response(content=f"answer {len(calls)}")
+
+    messages = [{"role": "user", "content": "q"}]
+    tools = [{"type": "function", "function": {"name": "add"}}]
+    cached = CachedLLMCall(llm_call_fn, cache=SQLiteResponseCache(str(tmp_path / "cache.db")))
+    first = cached("model", messages, tools)
+    assert cached("model", [{"content": "q", "role": "user"}], tools).choices[0].message.content == first.choices[0].message.content
+    cached("model", messages, [])
+    cached("other", messages, tools)
+    assert len(calls) == 3
+    assert cached.get_stats() == {"hits": 1, "misses": 3, "entries": 3}
+
+    reopened = CachedLLMCall(llm_call_fn, cache=SQLiteResponseCache(str(tmp_path / "cache.db")))
+    assert reopened("model", messages, tools).choices[0].message.content == "answer 1"
+    assert len(calls) == 3
+
+def test_cached_llm_call_async_in_process():
+    from llm_tool_fusion import CachedLLMCall, MemoryResponseCache
+
+    manager = ToolCaller()
+
+    @manager.tool
+    def add(a: int, b: int) -> int:
+        """
+        Add
+
+        Args:
+            a (int): first
+            b (int): second
+        Returns:
+            int: sum
+        """
+        return a + b
+
+    calls = []
+
+    async def llm_call_fn(model, messages, tools):
+        calls.append(len(messages))
+        return make_response(content="3")
+
+    cached = CachedLLMCall(llm_call_fn, cache=MemoryResponseCache(max_entries=1))
+    tool_call = types.SimpleNamespace(id="id1", function=types.SimpleNamespace(name="add", arguments='{"a": 1, "b": 2}'))
+    for _ in range(2):
+        result = asyncio.run(process_tool_calls_async(
+            make_response([tool_call]), [{"role": "user", "content": "q"}], manager, "model", cached, clean_messages=True
+        ))
+        assert result == "3"
+    assert calls == [3]
+    assert cached.get_stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+def test_cached_llm_call_lambda_returning_coroutine():
+    from llm_tool_fusion import CachedLLMCall, MemoryResponseCache
+
+    calls = []
+
+    async def call_provider(model, messages, tools):
+        calls.append(model)
+        return make_response(content="ok")
+
+    cache = MemoryResponseCache()
+    cached = CachedLLMCall(lambda model, messages, tools: call_provider(model, messages, tools), cache=cache)
+    messages = [{"role": "user", "content": "q"}]
+    for _ in range(2):
+        response = asyncio.run(cached("model", messages, []))
+        assert response.choices[0].message.content == "ok"
+    assert calls == ["model"]
+    assert cached.get_stats() == {"hits": 1, "misses": 1, "entries": 1}
+    assert not asyncio.iscoroutine(cache.get(CachedLLMCall.key("model", messages, [])))
+
+    # Com o cache já preenchido, is_async=True devolve awaitables desde a primeira chamada
+    reopened = CachedLLMCall(lambda model, messages, tools: call_provider(model, messages, tools), cache=cache, is_async=True)
+    assert asyncio.run(reopened("model", messages, [])).choices[0].message.content == "ok"
+    assert calls == ["model"]
+
+def test_process_tool_calls_batch_concurrency_and_streaming():
+    import threading
+    from llm_tool_fusion import process_tool_calls_batch
+
+    manager = ToolCaller()
+    tool_threads = set()
+
+    @manager.tool
+    def lookup(key: str) -> str:
+        """
+        Lookup
+
+        Args:
+            key (str): key
+        Returns:
+            str: value
+        """
+        tool_threads.add(threading.current_thread().name)
+        return key.upper()
+
+    active = 0
+    peak = 0
+
+    async def llm_call_fn(model, messages, tools):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        prompt = messages[0]["content"]
+        await asyncio.sleep(0.05 if prompt == "slow" else 0.01)
+        active -= 1
+        if prompt == "boom":
+            raise RuntimeError("provider error")
+        if messages[-1]["role"] == "user":
+            tool_call = types.SimpleNamespace(id="id1", function=types.SimpleNamespace(name="lookup", arguments=f'{{"key": "{prompt}"}}'))
+            return make_response([tool_call])
+        return make_response(content=messages[-1]["content"])
+
+    async def collect():
+        prompts = (prompt for prompt in ["slow", "a", "boom", "b", "c"])
+        return [item async for item in process_tool_calls_batch(
+            prompts, manager, "model", llm_call_fn, max_concurrency=2, clean_messages=True
+        )]
+
+    results = asyncio.run(collect())
+    assert sorted(index for index, _ in results) == [0, 1, 2, 3, 4]
+    by_index = dict(results)
+    assert by_index[0] == '"SLOW"' and by_index[3] == '"B"'
+    assert isinstance(by_index[2], RuntimeError)
+    assert results[-1][0] == 0
+    assert peak <= 2
+    assert all(name.startswith("llm_tool_fusion_batch") for name in tool_threads)
+
+    async def first_error():
+        async for _ in process_tool_calls_batch(["boom"], manager, "model", llm_call_fn, return_exceptions=False):
+            pass
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(first_error())
+
+def test_process_tool_calls_batch_first_call_uses_retry_and_hedging():
+    from llm_tool_fusion import process_tool_calls_batch, RetryPolicy
+
+    manager = ToolCaller()
+    attempts = []
+
+    async def flaky(model, messages, tools):
+        attempts.append(len(messages))
+        if len(attempts) == 1:
+            raise ConnectionError("reset")
+        return make_response(content="ok")
+
+    async def failing(model, messages, tools):
+        raise RuntimeError("primary down")
+
+    async def collect(llm_call_fn, **kwargs):
+        return [item async for item in process_tool_calls_batch(
+            ["q"], manager, "model", llm_call_fn, return_exceptions=False, clean_messages=True, **kwargs
+        )]
+
+    retry = RetryPolicy(max_attempts=2, base_delay=0, jitter=False)
+    assert asyncio.run(collect(flaky, llm_retry=retry)) == [(0, "ok")]
+    assert attempts == [1, 1] and retry.get_stats()["retries"] == 1
+
+    assert asyncio.run(collect([failing, flaky], llm_hedge_delay=0.01)) == [(0, "ok")]
+    assert attempts == [1, 1, 1]
+
+def test_process_tool_calls_batch_uses_caller_executor():
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from llm_tool_fusion import process_tool_calls_batch
+    from tests.helpers import make_tool_call
+
+    manager = ToolCaller()
+    tool_threads = set()
+
+    @manager.tool
+    def lookup(key: str) -> str:
+        """
+        Lookup
+
+        Args:
+            key (str): key
+        Returns:
+            str: value
+        """
+        tool_threads.add(threading.current_thread().name)
+        return key.upper()
+
+    async def llm_call_fn(model, messages, tools):
+        if messages[-1]["role"] == "user":
+            return make_response([make_tool_call("lookup", {"key": messages[0]["content"]})])
+        return make_response(content=messages[-1]["content"])
+
+    async def collect(executor):
+        return [item async for item in process_tool_calls_batch(
+            ["a", "b"], manager, "model", llm_call_fn, return_exceptions=False,
+            clean_messages=True, tool_executor=executor
+        )]
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="caller_pool") as executor:
+        assert sorted(asyncio.run(collect(executor))) == [(0, '"A"'), (1, '"B"')]
+        # O executor do chamador continua disponível após o lote
+        assert executor.submit(lambda: 1).result() == 1
+    assert tool_threads == {"caller_pool_0"}
@@ -0,0 +1,155 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import pytest
+from llm_tool_fusion._results import OutputPolicy, ToolResultStore, _format_tool_content, encode_tabular
+
+def test_output_policy_truncates_with_marker():
+    policy = OutputPolicy(max_chars=60)
+    content = policy.apply("x" * 1000)
+    assert len(content) <= 60
+    assert content.startswith("x")
+    assert "characters omitted" in content
+
+def test_output_policy_head_tail_sampling():
+    policy = OutputPolicy(max_chars=80, head_ratio=0.5, truncation_marker="|{omitted}|")
+    content = policy.apply("a" * 500 + "z" * 500)
+    assert content.startswith("a")
+    assert content.endswith("z")
+    assert "|920|" in content
+
+def test_output_policy_max_tokens_with_estimator():
+    policy = OutputPolicy(max_tokens=10, token_estimator=lambda text: len(text.split()))
+    content = policy.apply(" ".join(["word"] * 100))
+    assert len(content) < 100
+    assert policy.apply("few words") == "few words"
+
+def test_format_tool_content_compact_json():
+    result = {"a": [1, 2], "b": "c"}
+    assert _format_tool_content(result, "openai") == json.dumps(result)
+    compact = _format_tool_content(result, "openai", OutputPolicy(compact_json=True))
+    assert compact == '{"a":[1,2],"b":"c"}'
+    assert _format_tool_content(result, "ollama", OutputPolicy(compact_json=True)) == compact
+    assert _format_tool_content(result, "ollama") == str(result)
+
+def test_output_policy_spill_to_store():
+    store = ToolResultStore(max_entries=2)
+    policy = OutputPolicy(max_chars=100, spill=True)
+    full = "y" * 1000
+    content = policy.apply(full, store)
+    handle = content.split("handle '")[1].split("'")[0]
+    assert store.get(handle) == full
+
+    # Respeita o limite de entradas (LRU)
+    policy.apply(full, store)
+    policy.apply(full, store)
+    assert len(store) == 2
+    assert handle not in store
+
+def test_tool_caller_output_policy_per_tool():
+    from llm_tool_fusion._core import ToolCaller
+
+    caller = ToolCaller(output_policy=OutputPolicy(max_chars=150, spill=True))
+    caller.set_output_policy(OutputPolicy(max_chars=10_000), tool_name="big_ok")
+
+    short = caller._format_tool_result("any", "z" * 500)
+    assert len(short) <= 150
+    handle = short.split("handle '")[1].split("'")[0]
+    assert caller.get_tool_result(handle) == json.dumps("z" * 500)
+    assert caller._format_tool_result("big_ok", "z" * 500) == json.dumps("z" * 500)
+
+    with pytest.raises(ValueError):
+        OutputPolicy(head_ratio=2)
+
+def test_result_store_bounded_by_chars_and_disk(tmp_path):
+    store = ToolResultStore(max_chars=150)
+    first = store.put("a" * 100)
+    second = store.put("b" * 100)
+    assert first not in store
+    assert store.read(second, 10, 5) == "bbbbb"
+
+    disk = ToolResultStore(max_entries=1, directory=str(tmp_path))
+    old = disk.put("old")
+    handle = disk.put("0123456789")
+    assert disk.read(handle, 3, 4) == "3456"
+    assert disk.get(handle) == "0123456789"
+    assert old not in disk
+    assert len(os.listdir(tmp_path)) == 1
+
+def test_paginated_result_and_read_tool_result():
+    from llm_tool_fusion._core import ToolCaller
+
+    caller = ToolCaller(output_policy=OutputPolicy(max_chars=200, paginate=True))
+    assert 'read_tool_result' in caller.get_name_tools()
+    assert any(t['function']['name'] == 'read_tool_result' for t in caller.get_tools())
+
+    full = "".join(str(i % 10) for i in range(1000))
+    first_page = caller._format_tool_result("dump", full)
+    assert len(first_page) <= 200
+    handle = first_page.split("handle='")[1].split("'")[0]
+    end = int(first_page.split("offset=")[1].split(",")[0])
+
+    read_tool_result = caller.get_map_tools()['read_tool_result']
+    page = read_tool_result(handle=handle, offset=end, limit=50)
+    assert page.startswith(json.dumps(full)[end:end + 50])
+    assert f"Next offset: {end + 50}" in page
+    # Páginas não são cortadas novamente pela política
+    assert caller._format_tool_result("read_tool_result", "x" * 500) == json.dumps("x" * 500)
+    assert "Unknown or expired handle" in read_tool_result(handle="nope")
+
+def test_read_tool_result_only_registered_when_paginating():
+    from llm_tool_fusion._core import ToolCaller
+
+    caller = ToolCaller(output_policy=OutputPolicy(max_chars=200))
+    assert 'read_tool_result' not in caller.get_map_tools()
+    caller.set_output_policy(OutputPolicy(max_chars=100, paginate=True), tool_name="dump")
+    assert 'read_tool_result' in caller.get_map_tools()
+
+def test_encode_tabular_layouts():
+    rows = [{"id": 1, "name": "a"}, {"name": "b", "id": 2}]
+    assert encode_tabular(rows) == {"columns": ["id", "name"], "rows": [[1, "a"], [2, "b"]]}
+    assert encode_tabular(rows, "columns") == {"columns": {"id": [1, 2], "name": ["a", "b"]}}
+    assert encode_tabular({"items": rows, "total": 2}) == {"items": {"columns": ["id", "name"], "rows": [[1, "a"], [2, "b"]]}, "total": 2}
+    # Linhas com chaves diferentes, uma única linha ou valores que não são listas não mudam
+    mixed = [{"id": 1}, {"id": 2, "extra": True}]
+    assert encode_tabular(mixed) is mixed
+    assert encode_tabular([{"id": 1}]) == [{"id": 1}]
+    assert encode_tabular("text") == "text"
+
+def test_tabular_policy_reduces_size():
+    from llm_tool_fusion import ToolCaller
+
+    rows = [{"id": i, "name": f"Customer {i}", "email": f"customer{i}@example.com", "active": True} for i in range(100)]
+    manager = ToolCaller()
+    manager.set_output_policy(OutputPolicy(tabular="rows"), tool_name="customers")
+    content = manager._format_tool_result("customers", rows)
+    assert json.loads(content)["rows"][0] == [0, "Customer 0", "customer0@example.com", True]
+    assert len(content) < 0.7 * len(json.dumps(rows))
+    # Outras ferramentas mantêm o formato original
+    assert manager._format_tool_result("other", rows) == json.dumps(rows)
+
+def test_per_tool_policy_merges_over_global():
+    from llm_tool_fusion import ToolCaller
+
+    rows = [{"id": i, "name": f"Customer {i}"} for i in range(100)]
+    manager = ToolCaller(output_policy=OutputPolicy(max_chars=300, spill=True))
+    manager.set_output_policy(OutputPolicy(tabular="rows"), tool_name="customers")
+    content = manager._format_tool_result("customers", rows)
+    # O limite global continua valendo para a ferramenta tabular
+    assert len(content) <= 300
+    assert content.startswith('{"columns": ["id", "name"], "rows": [[0, "Customer 0"]')
+    assert "full result stored under handle" in content
+
+    policy = manager.get_output_policy("customers")
+    assert (policy.max_chars, policy.spill, policy.tabular) == (300, True, "rows")
+    manager.set_output_policy(OutputPolicy(max_chars=5000), tool_name="customers")
+    assert manager.get_output_policy("customers").max_chars == 5000
+    assert manager.get_output_policy("customers").spill
+    assert manager.get_output_policy("other").max_chars == 300
+
+def test_tabular_policy_validation():
+    with pytest.raises(ValueError):
+        OutputPolicy(tabular="csv")
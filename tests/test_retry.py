@@ -0,0 +1,127 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import time
+import pytest
+from llm_tool_fusion import ToolCaller, RetryPolicy, process_tool_calls, process_tool_calls_async
+from llm_tool_fusion._retry import _is_retryable_error
+from tests.helpers import make_response, make_tool_call
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+class RateLimitError(Exception):
+    pass
+
+def test_retryable_errors():
+    assert _is_retryable_error(TimeoutError())
+    assert _is_retryable_error(ConnectionResetError())
+    assert _is_retryable_error(StatusError(503))
+    assert _is_retryable_error(RateLimitError())
+    assert not _is_retryable_error(StatusError(400))
+    assert not _is_retryable_error(ValueError())
+
+def test_backoff_is_exponential_and_capped():
+    policy = RetryPolicy(base_delay=1, max_delay=5, jitter=False)
+    assert [policy.backoff(attempt) for attempt in range(1, 5)] == [1, 2, 4, 5]
+    jittered = RetryPolicy(base_delay=1, max_delay=5)
+    assert all(0 <= jittered.backoff(3) <= 4 for _ in range(20))
+
+def test_retry_keeps_tool_work():
+    manager = ToolCaller()
+    executed = []
+
+    @manager.tool
+    def add(a: int, b: int) -> int:
+        """
+        Add
+
+        Args:
+            a (int): first
+            b (int): second
+        Returns:
+            int: sum
+        """
+        executed.append((a, b))
+        return a + b
+
+    outcomes = [StatusError(502), StatusError(429), make_response(content="3")]
+
+    def llm_call_fn(model, messages, tools):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    retry = RetryPolicy(max_attempts=3, base_delay=0.001)
+    final = process_tool_calls(
+        make_response([make_tool_call("add", {"a": 1, "b": 2})]), [], manager, "model", llm_call_fn,
+        clean_messages=True, llm_retry=retry
+    )
+    assert final == "3"
+    assert executed == [(1, 2)]
+    assert retry.get_stats() == {"calls": 1, "retries": 2, "timeouts": 0, "failures": 0}
+
+    with pytest.raises(ValueError):
+        retry.call(lambda: (_ for _ in ()).throw(ValueError("bad request")))
+    assert retry.get_stats()["failures"] == 1
+
+def test_sync_timeout_and_max_elapsed():
+    attempts = []
+
+    def stalled():
+        attempts.append(time.monotonic())
+        time.sleep(0.2)
+        return "late"
+
+    retry = RetryPolicy(max_attempts=5, timeout=0.02, base_delay=0.05, jitter=False, max_elapsed=0.1)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        retry.call(stalled)
+    assert time.monotonic() - started < 0.15
+    assert len(attempts) == 2
+    assert retry.get_stats()["timeouts"] == 2
+
+def test_sync_timeouts_do_not_starve_later_calls():
+    import threading
+
+    release = threading.Event()
+    retry = RetryPolicy(max_attempts=1, timeout=0.05)
+
+    def stalled_call():
+        with pytest.raises(TimeoutError):
+            retry.call(lambda: release.wait(5))
+
+    # Mais tentativas abandonadas que threads de um pool padrão
+    callers = [threading.Thread(target=stalled_call) for _ in range(40)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    try:
+        assert retry.call(lambda: "fast") == "fast"
+        assert retry.get_stats()["timeouts"] == 40
+    finally:
+        release.set()
+
+def test_async_timeout_retry():
+    calls = []
+
+    async def llm_call_fn(model, messages, tools):
+        calls.append(model)
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+        return make_response(content="ok")
+
+    retry = RetryPolicy(timeout=0.02, base_delay=0.001)
+    final = asyncio.run(process_tool_calls_async(
+        make_response([make_tool_call("missing", {})]), [], ToolCaller(), "model", llm_call_fn,
+        clean_messages=True, llm_retry=retry
+    ))
+    assert final == "ok"
+    assert retry.get_stats() == {"calls": 1, "retries": 1, "timeouts": 1, "failures": 0}
@@ -0,0 +1,258 @@
+import os
+import sys
+# Adiciona o diretório pai ao sys.path | Adds the parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import threading
+import time
+from llm_tool_fusion._core import ToolCaller, process_tool_calls, process_tool_calls_async
+from llm_tool_fusion._scheduling import ToolResources, PriorityScheduler, ALL_RESOURCES, _call_dependencies
+from tests.helpers import make_response, make_tool_call
+
+def test_tool_resources_templates():
+    resources = ToolResources(reads=["user:{user_id}"], writes=["orders:{user_id}", "audit:{missing}"])
+    reads, writes = resources.keys({"user_id": 7})
+    assert reads == {"user:7"}
+    assert writes == {"orders:7", ALL_RESOURCES}
+
+def test_call_dependencies():
+    read_a = (frozenset({"a"}), frozenset())
+    write_a = (frozenset(), frozenset({"a"}))
+    write_b = (frozenset(), frozenset({"b"}))
+    undeclared = (frozenset(), frozenset({ALL_RESOURCES}))
+
+    deps = _call_dependencies([read_a, read_a, write_a, write_b, write_a, undeclared, None])
+    assert deps[1] == set()          # leituras não conflitam
+    assert deps[2] == {0, 1}         # escrita espera as leituras anteriores
+    assert deps[3] == set()          # recurso diferente roda em paralelo
+    assert deps[4] == {0, 1, 2}      # duas escritas na mesma conta em série
+    assert deps[5] == {0, 1, 2, 3, 4}
+    assert deps[6] == set()
+
+def build_caller(log, lock):
+    caller = ToolCaller()
+    active = {"count": 0, "max": 0}
+
+    def track(name, account_id):
+        with lock:
+            active["count"] += 1
+            active["max"] = max(active["max"], active["count"])
+            log.append(("start", name, account_id))
+        time.sleep(0.05)
+        with lock:
+            active["count"] -= 1
+            log.append(("end", name, account_id))
+        return f"{name}:{account_id}"
+
+    @caller.tool
+    def get_balance(account_id):
+        return track("get_balance", account_id)
+
+    @caller.tool
+    def deposit(account_id, amount):
+        return track("deposit", account_id)
+
+    caller.set_tool_resources("get_balance", reads=["account:{account_id}"])
+    caller.set_tool_resources("deposit", writes=["account:{account_id}"])
+    return caller, active
+
+def test_schedule_tool_calls_sync_parallel_and_serialized():
+    log, lock = [], threading.Lock()
+    caller, active = build_caller(log, lock)
+
+    tool_calls = [
+        make_tool_call('get_balance', {"account_id": 1}, id="c1"),
+        make_tool_call('get_balance', {"account_id": 2}, id="c2"),
+        make_tool_call('deposit', {"account_id": 1, "amount": 5}, id="c3"),
+        make_tool_call('deposit', {"account_id": 1, "amount": 7}, id="c4"),
+    ]
+    messages = []
+    process_tool_calls(make_response(tool_calls), messages, caller, model='fake',
+                       llm_call_fn=lambda **kwargs: make_response(), schedule_tool_calls=True)
+
+    # Mensagens na ordem emitida pelo modelo
+    assert [m['tool_call_id'] for m in messages if m.get('role') == 'tool'] == ["c1", "c2", "c3", "c4"]
+    assert active["max"] == 2
+    # O primeiro depósito só começa depois da leitura da conta 1, e o segundo depois do primeiro
+    assert log.index(("end", "get_balance", 1)) < log.index(("start", "deposit", 1))
+    deposits = [i for i, entry in enumerate(log) if entry[1] == "deposit"]
+    assert [log[i][0] for i in deposits] == ["start", "end", "start", "end"]
+
+def test_schedule_tool_calls_async_and_errors():
+    log, lock = [], threading.Lock()
+    caller, active = build_caller(log, lock)
+
+    @caller.async_tool
+    async def fetch(account_id):
+        await asyncio.sleep(0.05)
+        return account_id
+
+    caller.set_tool_resources("fetch", reads=["account:{account_id}"])
+
+    tool_calls = [
+        make_tool_call('fetch', {"account_id": 1}, id="c1"),
+        make_tool_call('get_balance', {"account_id": 2}, id="c2"),
+        make_tool_call('unknown_tool', {}, id="c3"),
+    ]
+
+    async def llm_call_fn(**kwargs):
+        return make_response()
+
+    messages = []
+    asyncio.run(process_tool_calls_async(make_response(tool_calls), messages, caller, model='fake',
+                                         llm_call_fn=llm_call_fn, schedule_tool_calls=True))
+    contents = [json.loads(m['content']) for m in messages if m.get('role') == 'tool']
+    assert contents[:2] == [1, "get_balance:2"]
+    assert "Error executing tool 'unknown_tool'" in contents[2]
+
+def test_priority_scheduler_orders_waiters_by_priority():
+    scheduler = PriorityScheduler(max_concurrency=1, aging_rate=0)
+    order = []
+
+    async def worker(name, priority):
+        async with scheduler.slot_async(priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await scheduler.acquire_async()
+        tasks = [asyncio.ensure_future(worker(name, priority)) for name, priority in [("low", 0), ("high", 10), ("mid", 5)]]
+        await asyncio.sleep(0.01)
+        assert scheduler.get_stats() == {"max_concurrency": 1, "active": 1, "waiting": 3}
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["high", "mid", "low"]
+    assert scheduler.get_stats()["active"] == 0
+
+def test_priority_scheduler_aging_and_threads():
+    # Com aging alto, uma chamada antiga de baixa prioridade passa à frente de uma nova de alta prioridade
+    scheduler = PriorityScheduler(max_concurrency=1, aging_rate=1000)
+    order = []
+    scheduler.acquire()
+
+    def worker(name, priority):
+        with scheduler.slot(priority):
+            order.append(name)
+
+    old = threading.Thread(target=worker, args=("old", 0))
+    old.start()
+    time.sleep(0.05)
+    new = threading.Thread(target=worker, args=("new", 10))
+    new.start()
+    time.sleep(0.05)
+    scheduler.release()
+    old.join()
+    new.join()
+    assert order == ["old", "new"]
+
+def test_priority_scheduler_cancelled_waiter_passes_slot():
+    scheduler = PriorityScheduler(max_concurrency=1)
+
+    async def main():
+        await scheduler.acquire_async()
+        cancelled = asyncio.ensure_future(scheduler.acquire_async(priority=5))
+        waiting = asyncio.ensure_future(scheduler.acquire_async())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.wait_for(waiting, 1)
+        assert scheduler.get_stats() == {"max_concurrency": 1, "active": 1, "waiting": 0}
+        scheduler.release()
+
+    asyncio.run(main())
+
+def test_process_tool_calls_uses_shared_scheduler():
+    manager = ToolCaller(scheduler=PriorityScheduler(max_concurrency=1))
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    @manager.tool
+    def slow(x: int) -> int:
+        """
+        Slow tool
+
+        Args:
+            x (int): value
+        Returns:
+            int: value
+        """
+        with lock:
+            running.append(x)
+            max_running.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(x)
+        return x
+
+    def run_session(i):
+        response = make_response([make_tool_call("slow", {"x": i}, id=f"id{i}")])
+        process_tool_calls(
+            response, [], manager, "model", lambda model, messages, tools: make_response(),
+            priority=i
+        )
+
+    threads = [threading.Thread(target=run_session, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(max_running) == 1
+    assert manager.get_scheduler().get_stats()["active"] == 0
+
+def test_async_session_sync_tool_waits_without_blocking_loop():
+    # Uma ferramenta síncrona esperando a vaga não pode bloquear o event loop em que a ferramenta
+    # assíncrona que ocupa a vaga precisa terminar
+    manager = ToolCaller(scheduler=PriorityScheduler(max_concurrency=1))
+    order = []
+
+    @manager.async_tool
+    async def slow_fetch(key: str) -> str:
+        """
+        Slow fetch
+
+        Args:
+            key (str): key
+        Returns:
+            str: value
+        """
+        await asyncio.sleep(0.2)
+        order.append("async")
+        return key
+
+    @manager.tool
+    def compute(x: int) -> int:
+        """
+        Compute
+
+        Args:
+            x (int): value
+        Returns:
+            int: result
+        """
+        order.append("sync")
+        return x * 2
+
+    async def llm_call_fn(model, messages, tools):
+        return make_response(content="done")
+
+    async def session(tool_call, delay):
+        await asyncio.sleep(delay)
+        return await process_tool_calls_async(
+            make_response([tool_call]), [], manager, "model", llm_call_fn, clean_messages=True
+        )
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(
+            session(make_tool_call("slow_fetch", {"key": "a"}), 0),
+            session(make_tool_call("compute", {"x": 2}), 0.05)
+        ), 2)
+
+    assert asyncio.run(main()) == ["done", "done"]
+    assert order == ["async", "sync"]
+    assert manager.get_scheduler().get_stats()["active"] == 0
@@ -35,4 +35,40 @@ def test__extract_docstring_no_docstring():
     assert doc['name'] == 'no_doc_func'
     assert doc['description'] == ''
     assert isinstance(doc['parameters']['properties'], dict)
-    assert len(doc['parameters']['properties']) == 0 
\ No newline at end of file
+    assert len(doc['parameters']['properties']) == 0 
+
+def test__run_async_tool_streams_async_generator():
+    import asyncio
+    from llm_tool_fusion._utils import _run_async_tool
+
+    async def report(parts: int):
+        for i in range(parts):
+            yield f"part{i};"
+
+    observed = []
+    result = asyncio.run(_run_async_tool(report, {"parts": 3}, "report",
+                                         on_tool_chunk=lambda name, chunk: observed.append((name, chunk))))
+    assert result == "part0;part1;part2;"
+    assert observed == [("report", "part0;"), ("report", "part1;"), ("report", "part2;")]
+
+def test__run_async_tool_stream_limits():
+    import asyncio
+    from llm_tool_fusion._utils import _run_async_tool
+
+    closed = []
+
+    async def endless():
+        try:
+            while True:
+                yield "abcd"
+                await asyncio.sleep(0.01)
+        finally:
+            closed.append(True)
+
+    result = asyncio.run(_run_async_tool(endless, {}, "endless", stream_max_chars=10))
+    assert result.startswith("abcdabcdab\n")
+    assert "size limit of 10 characters" in result
+
+    result = asyncio.run(_run_async_tool(endless, {}, "endless", stream_timeout=0.05))
+    assert "time limit of 0.05 seconds" in result
+    assert closed == [True, True]